@@ -11,8 +11,10 @@ import os
 from typing import List, Tuple
 from datetime import datetime
 from src.mountain_car_agent import MountainCarAgent
-from src.trajectory_manager import TrajectoryManager, Trajectory, TrajectoryStep
+from src.trajectory_manager import TrajectoryManager, Trajectory, TrajectoryStep, ColumnarMountainCarTrajectory
 from src.preference_interface import PreferenceInterface
+from src.preference_store import PreferenceStore
+from src.trajectory_ratings import TrajectoryRatings
 from src.visual_mountaincar_comparator import VisualMountainCarComparator, MountainCarTrajectory as VisualMCTraj
 
 
@@ -27,7 +29,7 @@ class MountainCarTrajectory(Trajectory):
 
 
 def collect_mountaincar_trajectory(env: gym.Env, agent: MountainCarAgent, 
-                                   episode_id: int) -> MountainCarTrajectory:
+                                   episode_id: int, columnar: bool = False) -> MountainCarTrajectory:
     """
     Collecte une trajectoire complète de MountainCar
     
@@ -35,10 +37,14 @@ def collect_mountaincar_trajectory(env: gym.Env, agent: MountainCarAgent,
         env: Environnement MountainCar
         agent: Agent entraîné
         episode_id: ID de l'épisode
+        columnar: Si True, stocke la trajectoire en colonnes (ColumnarMountainCarTrajectory)
         
     Returns:
         MountainCarTrajectory object
     """
+    if columnar:
+        return _collect_columnar_mountaincar_trajectory(env, agent, episode_id)
+    
     state, _ = env.reset()
     steps_list = []
     total_reward = 0
@@ -90,6 +96,49 @@ def collect_mountaincar_trajectory(env: gym.Env, agent: MountainCarAgent,
     return trajectory
 
 
+def _collect_columnar_mountaincar_trajectory(env: gym.Env, agent: MountainCarAgent,
+                                             episode_id: int,
+                                             max_steps: int = 200) -> ColumnarMountainCarTrajectory:
+    """Collecte une trajectoire MountainCar directement dans des tableaux préalloués"""
+    state, _ = env.reset()
+    observations = np.zeros((max_steps + 1, 2), dtype=np.float32)
+    actions = np.zeros(max_steps, dtype=np.int8)
+    rewards = np.zeros(max_steps, dtype=np.float64)
+    dones = np.zeros(max_steps, dtype=bool)
+    observations[0] = state
+    
+    n_steps = 0
+    while n_steps < max_steps:
+        action = agent.select_action(state, training=False)
+        next_state, reward, terminated, truncated, _ = env.step(action)
+        
+        actions[n_steps] = action
+        rewards[n_steps] = reward
+        dones[n_steps] = terminated or truncated
+        observations[n_steps + 1] = next_state
+        
+        state = next_state
+        n_steps += 1
+        
+        if terminated or truncated:
+            break
+    
+    # Discrétisation de toutes les observations en un seul appel (grille, même en codage en tuiles)
+    observations = observations[:n_steps + 1]
+    discrete_states = agent.discretizer.discretize_batch(observations)
+    
+    return ColumnarMountainCarTrajectory(
+        states=discrete_states[:-1],
+        actions=actions[:n_steps].copy(),
+        rewards=rewards[:n_steps].copy(),
+        next_states=discrete_states[1:],
+        dones=dones[:n_steps].copy(),
+        episode_id=episode_id,
+        continuous_states=observations[:-1],
+        continuous_next_states=observations[1:]
+    )
+
+
 def display_mountaincar_comparison(traj_a: MountainCarTrajectory, traj_b: MountainCarTrajectory):
     """
     Affiche une comparaison détaillée de deux trajectoires MountainCar
@@ -221,6 +270,24 @@ def select_interesting_trajectory_pairs(trajectories: List[MountainCarTrajectory
     return pairs[:n_pairs]
 
 
+def save_session_trajectories(filepath: str, trajectories: List[Trajectory]):
+    """
+    Ajoute les trajectoires d'une session au fichier pickle des collectes précédentes
+    
+    Args:
+        filepath: Fichier pickle (liste de trajectoires), créé s'il n'existe pas
+        trajectories: Trajectoires de la session (identifiants décalés par la base)
+    """
+    previous = []
+    if os.path.exists(filepath):
+        with open(filepath, 'rb') as f:
+            previous = pickle.load(f)
+    new_ids = {traj.episode_id for traj in trajectories}
+    previous = [traj for traj in previous if traj.episode_id not in new_ids]
+    with open(filepath, 'wb') as f:
+        pickle.dump(previous + list(trajectories), f)
+
+
 def main():
     """Script principal de collecte de préférences"""
     
@@ -253,13 +320,24 @@ def main():
     env = gym.make('MountainCar-v0')
     print("[OK] Environnement créé\n")
     
+    # Base SQLite persistante : chaque collecte y ajoute une session, et chaque
+    # préférence y est écrite dès sa saisie (aucune étiquette perdue en cas d'interruption)
+    store_path = os.path.join(results_dir, "mountaincar_preferences.sqlite")
+    store = PreferenceStore(store_path)
+    session_id = store.start_session('human', {'n_trajectories': N_TRAJECTORIES,
+                                               'n_preferences': N_PREFERENCES})
+    first_episode_id = store.trajectory_id_offset(session_id)
+    print(f"[OK] Base de préférences: {store_path} (session {session_id}, "
+          f"{store.count()} préférences existantes)\n")
+    
     # Génération de trajectoires
     print(f"[ACTION] GÉNÉRATION DE {N_TRAJECTORIES} TRAJECTOIRES")
     print("-" * 80)
     
     trajectories = []
     for i in range(N_TRAJECTORIES):
-        traj = collect_mountaincar_trajectory(env, agent, episode_id=i)
+        traj = collect_mountaincar_trajectory(env, agent, episode_id=first_episode_id + i,
+                                              columnar=True)
         trajectories.append(traj)
         
         if (i + 1) % 10 == 0:
@@ -290,6 +368,9 @@ def main():
     preferences = []
     visualizer = None
     
+    store.add_trajectories(trajectories)
+    ratings = TrajectoryRatings.load(store)
+    
     for idx, (traj_a, traj_b) in enumerate(pairs):
         print(f"\n{'='*80}")
         print(f"COMPARAISON {idx + 1}/{len(pairs)}")
@@ -375,13 +456,22 @@ def main():
         }
         preferences.append(preference_data)
         
-        # Sauvegarde intermédiaire
+        # Sauvegarde incrémentale (ajout d'une ligne, indépendant du nombre de préférences)
+        preference_id = store.add_preference(preference_data, session_id)
+        
+        # Classement mis à jour en O(1) et persisté avec la préférence
+        preference_data['preference_id'] = preference_id
+        preference_data['session_id'] = session_id
+        ratings.update_preference(preference_data)
+        ratings.save(store, preference_id=preference_id,
+                     trajectory_ids=[traj_a.episode_id, traj_b.episode_id])
         if (idx + 1) % 5 == 0:
-            temp_path = os.path.join(results_dir, f"mountaincar_preferences_temp.json")
-            with open(temp_path, 'w') as f:
-                json.dump(preferences, f, indent=2)
             print(f"[SAVE] Sauvegarde intermédiaire: {len(preferences)} préférences")
     
+    store.end_session(session_id)
+    all_preferences = store.preferences()
+    store.close()
+    
     # Fermer le visualiseur
     if visualizer:
         visualizer.close()
@@ -390,16 +480,15 @@ def main():
     
     # Sauvegarde finale
     if preferences:
-        # Sauvegarde des préférences
+        # Export JSON de toute la base (toutes sessions)
         preferences_path = os.path.join(results_dir, "mountaincar_preferences.json")
         with open(preferences_path, 'w') as f:
-            json.dump(preferences, f, indent=2)
-        print(f"\n[SAVE] Préférences sauvegardées: {preferences_path}")
+            json.dump(all_preferences, f, indent=2)
+        print(f"\n[SAVE] Préférences sauvegardées: {preferences_path} ({len(all_preferences)} au total)")
         
-        # Sauvegarde des trajectoires
+        # Trajectoires ajoutées à celles des sessions précédentes (identifiants disjoints)
         trajectories_path = os.path.join(results_dir, "mountaincar_trajectories.pkl")
-        with open(trajectories_path, 'wb') as f:
-            pickle.dump(trajectories, f)
+        save_session_trajectories(trajectories_path, trajectories)
         print(f"[SAVE] Trajectoires sauvegardées: {trajectories_path}")
         
         # Statistiques
@@ -5,12 +5,19 @@ Pour tester rapidement le workflow PBRL sans interaction manuelle
 
 import gymnasium as gym
 import numpy as np
-import pickle
 import json
 import os
 from datetime import datetime
+from typing import List, Tuple
 from src.mountain_car_agent import MountainCarAgent
-from collect_mountaincar_preferences import collect_mountaincar_trajectory, MountainCarTrajectory
+from src.trajectory_manager import ColumnarMountainCarTrajectory
+from src.parallel_collection import collect_trajectories_parallel
+from src.reward_model import BradleyTerryRewardModel
+from src.active_queries import select_model_queries
+from src.preference_oracle import trajectory_features, label_pairs
+from src.preference_store import PreferenceStore
+from src.trajectory_ratings import TrajectoryRatings
+from collect_mountaincar_preferences import MountainCarTrajectory, save_session_trajectories
 
 
 def auto_select_preference(traj_a: MountainCarTrajectory, traj_b: MountainCarTrajectory) -> int:
@@ -61,6 +68,101 @@ def auto_select_preference(traj_a: MountainCarTrajectory, traj_b: MountainCarTra
     return 0
 
 
+def select_contrasted_pairs(trajectories: List[MountainCarTrajectory],
+                            n_pairs: int) -> List[Tuple[MountainCarTrajectory, MountainCarTrajectory]]:
+    """
+    Sélection heuristique de paires à contraste maximum (tri par performance)
+    
+    Args:
+        trajectories: Trajectoires candidates
+        n_pairs: Nombre de paires à sélectionner
+    
+    Returns:
+        Liste de paires (traj_a, traj_b)
+    """
+    pairs = []
+    
+    # Tri par performance
+    sorted_trajs = sorted(trajectories, key=lambda t: (t.success, t.total_reward, -t.episode_length), reverse=True)
+    
+    # Séparer succès et échecs
+    success_trajs = [t for t in sorted_trajs if t.success]
+    fail_trajs = [t for t in sorted_trajs if not t.success]
+    
+    print(f"   Succès: {len(success_trajs)}, Échecs: {len(fail_trajs)}")
+    
+    # Stratégie 1: Paires succès vs échec (contraste maximum)
+    min_contrasted = min(len(success_trajs), len(fail_trajs), n_pairs // 2)
+    for i in range(min_contrasted):
+        pairs.append((success_trajs[i], fail_trajs[i]))
+    
+    # Stratégie 2: Paires au sein des succès (meilleur vs moins bon)
+    if len(success_trajs) >= 4:
+        for i in range(0, min(len(success_trajs) // 2, n_pairs // 4)):
+            if i * 2 + 1 < len(success_trajs):
+                pairs.append((success_trajs[i], success_trajs[len(success_trajs) - 1 - i]))
+    
+    # Stratégie 3: Paires au sein des échecs (haut vs bas)
+    if len(fail_trajs) >= 4:
+        fail_sorted = sorted(fail_trajs, key=lambda t: t.max_position, reverse=True)
+        for i in range(0, min(len(fail_sorted) // 2, n_pairs // 4)):
+            if i * 2 + 1 < len(fail_sorted):
+                pairs.append((fail_sorted[i], fail_sorted[len(fail_sorted) - 1 - i]))
+    
+    # Compléter avec paires adjacentes variées si nécessaire
+    remaining = n_pairs - len(pairs)
+    if remaining > 0 and len(sorted_trajs) >= 2:
+        step = max(2, len(sorted_trajs) // (remaining + 1))
+        for i in range(0, len(sorted_trajs) - step, step):
+            if len(pairs) >= n_pairs:
+                break
+            pairs.append((sorted_trajs[i], sorted_trajs[i + step]))
+    
+    return pairs[:n_pairs]
+
+
+def select_active_pairs(trajectories: List[MountainCarTrajectory], agent: MountainCarAgent,
+                        n_pairs: int, batch_size: int = 5,
+                        seed: int = 0) -> List[Tuple[MountainCarTrajectory, MountainCarTrajectory]]:
+    """
+    Sélection active : les paires sont choisies par lots selon le gain d'information
+    d'un ensemble de modèles de récompense, réajusté après chaque lot étiqueté
+    
+    Args:
+        trajectories: Trajectoires candidates (états discrets de l'agent)
+        agent: Agent dont la discrétisation définit les paires (s, a)
+        n_pairs: Nombre de paires à sélectionner
+        batch_size: Nombre de paires sélectionnées entre deux réajustements
+        seed: Graine de l'ensemble
+    
+    Returns:
+        Liste de paires (traj_a, traj_b)
+    """
+    model = BradleyTerryRewardModel(agent.n_states, agent.n_actions)
+    rows = [model.trajectory_row(traj, traj.states, traj.actions) for traj in trajectories]
+    features = trajectory_features(trajectories)
+    
+    pairs = []
+    while len(pairs) < n_pairs:
+        queries = select_model_queries(model, rows, min(batch_size, n_pairs - len(pairs)),
+                                       seed=seed + len(pairs))
+        if not queries:
+            break
+        
+        index_a = [i for i, _, _ in queries]
+        index_b = [j for _, j, _ in queries]
+        pairs.extend((trajectories[i], trajectories[j]) for i, j in zip(index_a, index_b))
+        
+        # Étiquetage du lot par l'oracle vectorisé (choix 1/2/0 -> label 1/0/0.5)
+        choices = label_pairs(features, index_a, index_b)
+        labels = np.array([0.5, 1.0, 0.0])[choices]
+        model.add_pairs([rows[i] for i in index_a], [rows[j] for j in index_b], labels)
+        model.fit()
+    
+    print(f"   Modèle de récompense: perte {model.loss_history[-1] if model.loss_history else 0.0:.4f}")
+    return pairs
+
+
 def main():
     """Collection automatique de préférences"""
     
@@ -71,21 +173,30 @@ def main():
     # Configuration
     N_TRAJECTORIES = 80  # Augmenté pour plus de diversité
     N_PREFERENCES = 40   # Augmenté pour plus d'apprentissage
+    N_WORKERS = None     # Processus de collecte (None = tous les cœurs)
+    SEED = 0             # Première graine des trajectoires
+    SELECTION = 'heuristic' # 'heuristic' (tri par performance) ou 'active' (gain d'information)
+    QUERY_BATCH = 5      # Paires choisies entre deux réajustements du modèle (mode actif)
     
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
     
     # Chargement de l'agent
     agent_path = os.path.join(results_dir, "mountain_car_agent_classical.pkl")
+    checkpoint_path = os.path.join(results_dir, "mountain_car_agent_classical.qtab")
     
-    if not os.path.exists(agent_path):
+    if not os.path.exists(agent_path) and not os.path.exists(checkpoint_path):
         print(f"[ERROR] Agent non trouvé: {agent_path}")
         print("[INFO] Exécutez d'abord: python train_mountaincar_classical.py")
         return
     
     print(f"[LOAD] Chargement de l'agent...")
     agent = MountainCarAgent()
-    agent.load_agent(agent_path)
+    if os.path.exists(checkpoint_path):
+        # Q-table projetée en mémoire : les rollouts greedy ne font que la lire
+        agent.load_checkpoint(checkpoint_path, mmap_mode='r')
+    else:
+        agent.load_agent(agent_path)
     print("[OK] Agent chargé\n")
     
     # Environnement
@@ -93,19 +204,24 @@ def main():
     env = gym.make('MountainCar-v0')
     print("[OK] Environnement créé\n")
     
+    # Base SQLite persistante : la collecte y ajoute une session (rien n'est effacé)
+    store_path = os.path.join(results_dir, "mountaincar_preferences.sqlite")
+    store = PreferenceStore(store_path)
+    session_id = store.start_session('auto', {'selection': SELECTION, 'seed': SEED})
+    
     # Génération de trajectoires
     print(f"[ACTION] GÉNÉRATION DE {N_TRAJECTORIES} TRAJECTOIRES")
     print("-" * 80)
     
-    trajectories = []
-    for i in range(N_TRAJECTORIES):
-        traj = collect_mountaincar_trajectory(env, agent, episode_id=i)
-        trajectories.append(traj)
-        
-        if (i + 1) % 10 == 0:
-            successes = sum(1 for t in trajectories if t.success)
-            print(f"  Trajectoire {i + 1}/{N_TRAJECTORIES} | "
-                  f"Succès: {successes}/{i + 1} ({successes/(i+1)*100:.1f}%)")
+    # Rollouts greedy répartis sur tous les cœurs ; graines et identifiants propres
+    # à la session (trajectoire i -> graine SEED + identifiant)
+    first_episode_id = store.trajectory_id_offset(session_id)
+    trajectories = collect_trajectories_parallel(
+        'MountainCar-v0', agent.q_table, N_TRAJECTORIES, seed=SEED + first_episode_id,
+        discretizer=agent.discretizer, n_workers=N_WORKERS,
+        first_episode_id=first_episode_id,
+        trajectory_class=ColumnarMountainCarTrajectory
+    )
     
     total_successes = sum(1 for t in trajectories if t.success)
     print(f"\n[OK] {N_TRAJECTORIES} trajectoires générées")
@@ -115,43 +231,10 @@ def main():
     print(f"[PLOT] SÉLECTION DE {N_PREFERENCES} PAIRES")
     print("-" * 80)
     
-    pairs = []
-    
-    # Tri par performance
-    sorted_trajs = sorted(trajectories, key=lambda t: (t.success, t.total_reward, -t.episode_length), reverse=True)
-    
-    # Séparer succès et échecs
-    success_trajs = [t for t in sorted_trajs if t.success]
-    fail_trajs = [t for t in sorted_trajs if not t.success]
-    
-    print(f"   Succès: {len(success_trajs)}, Échecs: {len(fail_trajs)}")
-    
-    # Stratégie 1: Paires succès vs échec (contraste maximum)
-    min_contrasted = min(len(success_trajs), len(fail_trajs), N_PREFERENCES // 2)
-    for i in range(min_contrasted):
-        pairs.append((success_trajs[i], fail_trajs[i]))
-    
-    # Stratégie 2: Paires au sein des succès (meilleur vs moins bon)
-    if len(success_trajs) >= 4:
-        for i in range(0, min(len(success_trajs) // 2, N_PREFERENCES // 4)):
-            if i * 2 + 1 < len(success_trajs):
-                pairs.append((success_trajs[i], success_trajs[len(success_trajs) - 1 - i]))
-    
-    # Stratégie 3: Paires au sein des échecs (haut vs bas)
-    if len(fail_trajs) >= 4:
-        fail_sorted = sorted(fail_trajs, key=lambda t: t.max_position, reverse=True)
-        for i in range(0, min(len(fail_sorted) // 2, N_PREFERENCES // 4)):
-            if i * 2 + 1 < len(fail_sorted):
-                pairs.append((fail_sorted[i], fail_sorted[len(fail_sorted) - 1 - i]))
-    
-    # Compléter avec paires adjacentes variées si nécessaire
-    remaining = N_PREFERENCES - len(pairs)
-    if remaining > 0 and len(sorted_trajs) >= 2:
-        step = max(2, len(sorted_trajs) // (remaining + 1))
-        for i in range(0, len(sorted_trajs) - step, step):
-            if len(pairs) >= N_PREFERENCES:
-                break
-            pairs.append((sorted_trajs[i], sorted_trajs[i + step]))
+    if SELECTION == 'active':
+        pairs = select_active_pairs(trajectories, agent, N_PREFERENCES, QUERY_BATCH, seed=SEED)
+    else:
+        pairs = select_contrasted_pairs(trajectories, N_PREFERENCES)
     
     pairs = pairs[:N_PREFERENCES]
     print(f"[OK] {len(pairs)} paires sélectionnées\n")
@@ -162,10 +245,13 @@ def main():
     
     preferences = []
     
-    for idx, (traj_a, traj_b) in enumerate(pairs):
-        # Sélection automatique
-        choice = auto_select_preference(traj_a, traj_b)
-        
+    # Tous les choix en une passe (mêmes critères que auto_select_preference)
+    position = {id(traj): i for i, traj in enumerate(trajectories)}
+    choices = label_pairs(trajectory_features(trajectories),
+                          [position[id(traj_a)] for traj_a, _ in pairs],
+                          [position[id(traj_b)] for _, traj_b in pairs])
+    
+    for idx, ((traj_a, traj_b), choice) in enumerate(zip(pairs, choices)):
         # Affichage
         if (idx + 1) % 5 == 0:
             print(f"  Préférence {idx + 1}/{len(pairs)} collectée")
@@ -196,16 +282,25 @@ def main():
     print(f"\n[SAVE] SAUVEGARDE DES DONNÉES")
     print("-" * 80)
     
-    # Préférences
+    # Base SQLite indexée : la session est ajoutée en une transaction
+    with store:
+        store.add_trajectories(trajectories)
+        store.add_preferences(preferences, session_id)
+        store.end_session(session_id)
+        ratings = TrajectoryRatings.load(store)  # Notes mises à jour puis persistées
+        all_preferences = store.preferences()
+        print(f"[OK] Base de préférences: {store_path} (session {session_id}, "
+              f"{store.count()} préférences, {len(ratings)} trajectoires notées)")
+    
+    # Export JSON de toute la base (toutes sessions)
     preferences_path = os.path.join(results_dir, "mountaincar_preferences.json")
     with open(preferences_path, 'w') as f:
-        json.dump(preferences, f, indent=2)
+        json.dump(all_preferences, f, indent=2)
     print(f"[OK] Préférences sauvegardées: {preferences_path}")
     
-    # Trajectoires
+    # Trajectoires ajoutées à celles des sessions précédentes (identifiants disjoints)
     trajectories_path = os.path.join(results_dir, "mountaincar_trajectories.pkl")
-    with open(trajectories_path, 'wb') as f:
-        pickle.dump(trajectories, f)
+    save_session_trajectories(trajectories_path, trajectories)
     print(f"[OK] Trajectoires sauvegardées: {trajectories_path}")
     
     # Statistiques
@@ -36,9 +36,8 @@ def main():
     trajectories = []
     
     print("Génération de 10 trajectoires...")
-    for i in range(10):
-        traj = trajectory_manager.collect_trajectory(env, agent, max_steps=200, render=False)
-        trajectories.append(traj)
+    trajectories = trajectory_manager.collect_trajectories_parallel("Taxi-v3", agent, 10, max_steps=200)
+    for i, traj in enumerate(trajectories):
         print(f"  Trajectoire {i+1}: Récompense = {traj.total_reward}, Longueur = {traj.episode_length}")
     
     # Sauvegarde des trajectoires
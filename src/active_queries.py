@@ -0,0 +1,146 @@
+"""
+Sélection active des paires de trajectoires à soumettre aux préférences
+Toutes les paires candidates (matrice N x N, traitée par blocs de lignes) sont
+évaluées à partir d'un ensemble d'estimations de récompense, puis les k paires
+les plus informatives sont retenues
+"""
+
+import numpy as np
+from typing import Iterable, List, Optional, Tuple
+
+QUERY_SCORES = ('information_gain', 'disagreement')
+
+
+def _binary_entropy(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, 1e-12, 1 - 1e-12)
+    return -(p * np.log(p) + (1 - p) * np.log(1 - p))
+
+
+def score_pair_block(returns: np.ndarray, rows: np.ndarray, method: str = 'information_gain',
+                     first_column: int = 0) -> np.ndarray:
+    """
+    Score des paires (i, j) pour un bloc de lignes i et les colonnes j >= first_column
+    
+    Chaque membre m de l'ensemble prédit P_m(i > j) = sigmoid(R_m[i] - R_m[j]).
+    
+    Args:
+        returns: Retours prédits par l'ensemble, de forme (n_members, N)
+        rows: Indices i du bloc
+        method: 'information_gain' (BALD : H(moyenne des P_m) - moyenne des H(P_m))
+                ou 'disagreement' (écart-type des P_m entre membres)
+        first_column: Première colonne évaluée
+    
+    Returns:
+        Scores de forme (len(rows), N - first_column)
+    """
+    # Marges bornées : au-delà de |50| la sigmoïde est saturée et l'entropie nulle
+    margins = np.clip(returns[:, rows, None] - returns[:, None, first_column:], -50.0, 50.0)
+    exp_neg_margins = np.exp(-margins)
+    probabilities = 1.0 / (1.0 + exp_neg_margins)
+    if method == 'disagreement':
+        return probabilities.std(axis=0)
+    if method == 'information_gain':
+        # H(sigmoid(d)) = softplus(d) - d * sigmoid(d) = log(1 + exp(-d)) + d * (1 - sigmoid(d))
+        member_entropy = np.log1p(exp_neg_margins) + margins * (1.0 - probabilities)
+        return _binary_entropy(probabilities.mean(axis=0)) - member_entropy.mean(axis=0)
+    raise ValueError(f"Score inconnu: {method} (attendu l'un de {QUERY_SCORES})")
+
+
+def select_top_pairs(returns: np.ndarray, k: int,
+                     method: str = 'information_gain',
+                     exclude: Optional[Iterable[Tuple[int, int]]] = None,
+                     max_block_elements: int = 2 ** 22) -> List[Tuple[int, int, float]]:
+    """
+    Retourne les k paires (i < j) de score maximal
+    
+    La matrice des scores n'est jamais matérialisée en entier : les lignes sont
+    traitées par blocs de taille bornée (n_members * taille du bloc * N éléments
+    au plus max_block_elements) et seuls les k meilleurs candidats de chaque bloc
+    sont conservés.
+    
+    Args:
+        returns: Retours prédits par l'ensemble, de forme (n_members, N)
+        k: Nombre de paires à retourner
+        method: Score utilisé (voir score_pair_block)
+        exclude: Paires déjà étiquetées à ignorer (dans un ordre quelconque)
+        max_block_elements: Taille maximale d'un bloc de probabilités
+    
+    Returns:
+        Liste de (i, j, score) triée par score décroissant
+    """
+    returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+    n_members, n_candidates = returns.shape
+    if n_candidates < 2 or k <= 0:
+        return []
+    
+    excluded = set()
+    for i, j in exclude or ():
+        excluded.add((min(i, j), max(i, j)))
+    excluded_rows = {}
+    for i, j in excluded:
+        excluded_rows.setdefault(i, []).append(j)
+    
+    block_size = max(1, max_block_elements // (n_members * n_candidates))
+    columns = np.arange(n_candidates)
+    best_scores = np.zeros(0)
+    best_pairs = np.zeros(0, dtype=np.int64)
+    
+    for start in range(0, n_candidates - 1, block_size):
+        rows = np.arange(start, min(start + block_size, n_candidates - 1))
+        first_column = start + 1
+        block_columns = columns[first_column:]
+        scores = score_pair_block(returns, rows, method, first_column)
+        
+        # Triangle supérieur uniquement (i < j), sans les paires déjà étiquetées
+        scores[block_columns[None, :] <= rows[:, None]] = -np.inf
+        for offset, i in enumerate(rows):
+            if i in excluded_rows:
+                scores[offset, np.asarray(excluded_rows[i]) - first_column] = -np.inf
+        
+        flat = scores.ravel()
+        n_keep = min(k, flat.size)
+        top = np.argpartition(flat, -n_keep)[-n_keep:]
+        top = top[np.isfinite(flat[top])]
+        width = len(block_columns)
+        best_scores = np.concatenate([best_scores, flat[top]])
+        best_pairs = np.concatenate([best_pairs, (rows[top // width] * n_candidates
+                                                  + block_columns[top % width])])
+        
+        if len(best_scores) > k:
+            keep = np.argpartition(best_scores, -k)[-k:]
+            best_scores, best_pairs = best_scores[keep], best_pairs[keep]
+    
+    order = np.argsort(-best_scores, kind='stable')
+    return [(int(best_pairs[o] // n_candidates), int(best_pairs[o] % n_candidates), float(best_scores[o]))
+            for o in order]
+
+
+def select_model_queries(reward_model, rows: List[int], k: int,
+                         method: str = 'information_gain',
+                         n_members: int = 8, n_iterations: int = 100,
+                         seed: Optional[int] = None) -> List[Tuple[int, int, float]]:
+    """
+    Sélectionne les k paires de candidats les plus informatives pour un modèle de récompense
+    
+    Args:
+        reward_model: BradleyTerryRewardModel où les candidats sont enregistrés
+        rows: Index des candidats dans le modèle (voir trajectory_row)
+        k: Nombre de paires à retourner
+        method: Score utilisé (voir score_pair_block)
+        n_members: Taille de l'ensemble bootstrap
+        n_iterations: Itérations d'Adam par membre
+        seed: Graine de l'ensemble
+    
+    Returns:
+        Liste de (position i, position j, score) dans la liste des candidats ;
+        les paires déjà présentes dans le modèle sont exclues
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    returns = reward_model.ensemble_returns(n_members, n_iterations, seed=seed)[:, rows]
+    
+    position = {int(row): pos for pos, row in enumerate(rows)}
+    labeled = [(position[a], position[b])
+               for a, b in zip(reward_model.index_a.tolist(), reward_model.index_b.tolist())
+               if a in position and b in position]
+    
+    return select_top_pairs(returns, k, method, exclude=labeled)
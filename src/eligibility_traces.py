@@ -0,0 +1,169 @@
+"""
+Traces d'éligibilité pour Q(lambda) de Watkins sur une Q-table
+Stockage dense (tableau de la forme de la Q-table) ou creux (ensemble actif
+de cellules), avec troncature des traces devenues négligeables
+"""
+
+import numpy as np
+from typing import Tuple
+
+
+class EligibilityTraces:
+    """
+    Traces e(s, a) d'une Q-table (n_states, n_actions)
+    
+    En mode 'sparse', seules les cellules de trace >= min_trace sont gardées
+    (cellules et valeurs dans des tableaux compacts, position de chaque cellule
+    dans un index) : décroissance et mise à jour de la Q-table coûtent
+    O(cellules actives), au plus ~log(min_trace) / log(gamma * lambda) cellules.
+    En mode 'dense', les mêmes opérations portent sur tout le tableau.
+    """
+    
+    def __init__(self, shape: Tuple[int, int], mode: str = 'sparse',
+                 min_trace: float = 1e-2, replacing: bool = True):
+        """
+        Args:
+            shape: Forme de la Q-table (n_states, n_actions)
+            mode: 'sparse' (ensemble actif) ou 'dense'
+            min_trace: Traces inférieures remises à zéro (troncature)
+            replacing: Traces de remplacement (e = 1) plutôt qu'accumulées (e += 1)
+        """
+        if mode not in ('sparse', 'dense'):
+            raise ValueError(f"Mode de traces inconnu: {mode}")
+        self.shape = shape
+        self.mode = mode
+        self.min_trace = min_trace
+        self.replacing = replacing
+        
+        n_cells = shape[0] * shape[1]
+        if mode == 'dense':
+            self.values = np.zeros(n_cells)
+        else:
+            self.cells = np.zeros(64, dtype=np.int64)
+            self.values = np.zeros(64)
+            self.slots = np.full(n_cells, -1, dtype=np.int64)
+        self.size = 0
+    
+    def __len__(self) -> int:
+        """Nombre de cellules de trace non nulle"""
+        if self.mode == 'dense':
+            return int(np.count_nonzero(self.values))
+        return self.size
+    
+    def reset(self):
+        """Efface toutes les traces (fin d'épisode ou action exploratoire)"""
+        if self.mode == 'dense':
+            self.values[:] = 0.0
+        else:
+            self.slots[self.cells[:self.size]] = -1
+            self.size = 0
+    
+    def visit(self, state: int, action: int):
+        """Marque la cellule (state, action) comme visitée"""
+        cell = state * self.shape[1] + action
+        if self.mode == 'dense':
+            self.values[cell] = 1.0 if self.replacing else self.values[cell] + 1.0
+            return
+        
+        slot = self.slots[cell]
+        if slot >= 0:
+            self.values[slot] = 1.0 if self.replacing else self.values[slot] + 1.0
+            return
+        if self.size == len(self.cells):
+            self.cells = np.concatenate([self.cells, np.zeros_like(self.cells)])
+            self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+        self.cells[self.size] = cell
+        self.values[self.size] = 1.0
+        self.slots[cell] = self.size
+        self.size += 1
+    
+    def apply(self, q_table: np.ndarray, step: float):
+        """Q += step * e sur toutes les cellules actives (step = lr * erreur TD)"""
+        flat = q_table.reshape(-1)
+        if self.mode == 'dense':
+            flat += step * self.values
+        else:
+            # Cellules distinctes : l'indexation avancée suffit (pas de np.add.at)
+            flat[self.cells[:self.size]] += step * self.values[:self.size]
+    
+    def decay(self, factor: float):
+        """e *= factor, puis troncature des traces < min_trace"""
+        if self.mode == 'dense':
+            self.values *= factor
+            self.values[self.values < self.min_trace] = 0.0
+            return
+        
+        n = self.size
+        values = self.values[:n]
+        values *= factor
+        keep = values >= self.min_trace
+        if keep.all():
+            return
+        self.slots[self.cells[:n][~keep]] = -1
+        kept = np.flatnonzero(keep)
+        self.size = len(kept)
+        self.cells[:self.size] = self.cells[kept]
+        self.values[:self.size] = values[kept]
+        self.slots[self.cells[:self.size]] = np.arange(self.size)
+
+
+def test_eligibility_traces():
+    """Vérifie l'équivalence des traces creuses et denses avec Q(lambda) de référence"""
+    from src.q_learning_agent import QLearningAgent
+    
+    print("🧪 TEST DES TRACES D'ÉLIGIBILITÉ\n")
+    
+    rng = np.random.default_rng(0)
+    n_states, n_actions, n_steps = 12, 3, 2000
+    states = rng.integers(0, n_states, n_steps)
+    actions = rng.integers(0, n_actions, n_steps)
+    rewards = rng.normal(size=n_steps)
+    next_states = rng.integers(0, n_states, n_steps)
+    dones = rng.random(n_steps) < 0.05
+    
+    def run(mode, min_trace, replacing):
+        agent = QLearningAgent(n_states, n_actions, learning_rate=0.1, discount_factor=0.9)
+        agent.enable_traces(0.8, mode, min_trace, replacing)
+        for transition in zip(states.tolist(), actions.tolist(), rewards.tolist(),
+                              next_states.tolist(), dones.tolist()):
+            agent.update_q_table(*transition)
+        return agent
+    
+    def reference(replacing):
+        # Q(lambda) de Watkins sur un tableau de traces complet, sans troncature
+        q_table = np.zeros((n_states, n_actions))
+        traces = np.zeros_like(q_table)
+        for s, a, r, s_next, done in zip(states, actions, rewards, next_states, dones):
+            if q_table[s, a] < q_table[s].max():
+                traces[:] = 0.0
+            target = r if done else r + 0.9 * q_table[s_next].max()
+            td_error = target - q_table[s, a]
+            traces[s, a] = 1.0 if replacing else traces[s, a] + 1.0
+            q_table += 0.1 * td_error * traces
+            traces = traces * 0.0 if done else traces * 0.9 * 0.8
+        return q_table
+    
+    for replacing in (True, False):
+        expected = reference(replacing)
+        for mode in ('sparse', 'dense'):
+            assert np.allclose(run(mode, 0.0, replacing).q_table, expected)
+        print(f"[OK] Traces {'de remplacement' if replacing else 'accumulées'} : "
+              f"creuses = denses = référence sans troncature")
+    
+    sparse = run('sparse', 1e-2, True)
+    dense = run('dense', 1e-2, True)
+    assert np.allclose(sparse.q_table, dense.q_table)
+    assert len(sparse.traces) == len(dense.traces)
+    print(f"[OK] Troncature identique en creux et en dense ({len(sparse.traces)} cellules actives)")
+    
+    try:
+        EligibilityTraces((2, 2), mode='csr')
+        assert False, "Mode inconnu accepté"
+    except ValueError:
+        print("[OK] Mode inconnu refusé")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_eligibility_traces()
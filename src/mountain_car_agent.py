@@ -2,11 +2,16 @@
 Agent Q-Learning adapté pour MountainCar-v0 avec discrétisation d'états
 """
 
+import time
 import numpy as np
 import gymnasium as gym
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Dict, Any
 from src.q_learning_agent import QLearningAgent
 from src.mountain_car_discretizer import MountainCarDiscretizer
+from src.vectorized_mountain_car import VectorizedMountainCarEnv
+from src.mountain_car_grid_model import MountainCarGridModel
+from src.value_iteration import solve_model
+from src.tile_coding import TileCoder
 
 
 class MountainCarAgent(QLearningAgent):
@@ -47,6 +52,11 @@ class MountainCarAgent(QLearningAgent):
             epsilon_min=epsilon_min
         )
         
+        # Q linéaire sur tuiles (désactivée par défaut, voir enable_tile_coding)
+        self.tile_coder: Optional[TileCoder] = None
+        self.tile_weights: Optional[np.ndarray] = None
+        self.tile_learning_rate = 0.0
+        
         print(f"🚗 MountainCarAgent initialisé:")
         print(f"   - États discrets: {n_states}")
         print(f"   - Actions: {n_actions} (0=gauche, 1=rien, 2=droite)")
@@ -61,10 +71,101 @@ class MountainCarAgent(QLearningAgent):
             continuous_state: État [position, vitesse]
             
         Returns:
-            État discret (index)
+            État discret (index), ou indices des tuiles actives en codage en tuiles
         """
+        if self.tile_coder is not None:
+            return self.tile_coder.encode(continuous_state)
         return self.discretizer.discretize(continuous_state)
     
+    def process_states(self, continuous_states: np.ndarray) -> np.ndarray:
+        """
+        Convertit un lot d'états continus en états discrets
+        
+        Args:
+            continuous_states: États [position, vitesse] de forme (N, 2)
+            
+        Returns:
+            États discrets (indices) de forme (N,), ou tuiles actives de forme
+            (N, n_tilings) en codage en tuiles
+        """
+        if self.tile_coder is not None:
+            return self.tile_coder.encode_batch(continuous_states)
+        return self.discretizer.discretize_batch(continuous_states)
+    
+    def enable_tile_coding(self, n_tilings: int = 8, n_tiles: int = 8,
+                           learning_rate: float = 0.5):
+        """
+        Remplace la Q-table par une Q linéaire sur un codage en tuiles
+        
+        Q(s, a) est la somme des poids (tuile, a) des n_tilings tuiles actives
+        de s : une mise à jour généralise aux états voisins, tandis que les
+        grilles décalées gardent une résolution de n_tilings x n_tiles par
+        dimension. Les poids partent de 0, valeur optimiste avec des
+        récompenses de -1, ce qui suffit à l'exploration.
+        
+        process_state(s) renvoie alors les indices des tuiles actives ; la
+        Q-table de la grille devient la projection de Q aux centres des
+        cellules, recalculée en fin d'entraînement (évaluation sur la grille,
+        visualisation et sauvegarde restent disponibles).
+        
+        Args:
+            n_tilings: Nombre de grilles décalées
+            n_tiles: Tuiles par dimension dans chaque grille
+            learning_rate: Pas d'une mise à jour, réparti entre les tuiles
+                           actives (learning_rate / n_tilings par poids)
+        """
+        if self.uses_planning or self.traces is not None:
+            raise ValueError("Le codage en tuiles n'est pas compatible avec les modèles "
+                             "tabulaires (Dyna-Q, balayage prioritaire, Q(lambda))")
+        discretizer = self.discretizer
+        self.tile_coder = TileCoder([discretizer.position_min, discretizer.velocity_min],
+                                    [discretizer.position_max, discretizer.velocity_max],
+                                    n_tilings, n_tiles)
+        self.tile_weights = np.zeros((self.tile_coder.n_features, self.n_actions))
+        self.tile_learning_rate = learning_rate / n_tilings
+        print(f"[OK] Codage en tuiles: {n_tilings} grilles de {n_tiles}x{n_tiles} tuiles, "
+              f"{self.tile_coder.n_features} poids par action")
+    
+    def disable_tile_coding(self):
+        """Revient à la Q-table de la grille (projection des tuiles si elles étaient actives)"""
+        if self.tile_coder is not None:
+            self.project_tiles()
+        self.tile_coder = None
+        self.tile_weights = None
+    
+    def _require_grid(self, feature: str):
+        """Refuse une méthode tabulaire (états = cellules de la grille) en codage en tuiles"""
+        if self.tile_coder is not None:
+            raise ValueError(f"{feature} suppose des états discrets : appeler disable_tile_coding() d'abord")
+    
+    def enable_traces(self, *args, **kwargs):
+        self._require_grid("Q(lambda)")
+        super().enable_traces(*args, **kwargs)
+    
+    def enable_dyna(self, *args, **kwargs):
+        self._require_grid("Dyna-Q")
+        super().enable_dyna(*args, **kwargs)
+    
+    def enable_sweeping(self, *args, **kwargs):
+        self._require_grid("Le balayage prioritaire")
+        super().enable_sweeping(*args, **kwargs)
+    
+    def fit_offline(self, *args, **kwargs) -> int:
+        self._require_grid("L'itération Q hors ligne")
+        return super().fit_offline(*args, **kwargs)
+    
+    def _q_values(self, states) -> np.ndarray:
+        """Valeurs Q(s, ·) d'états issus de process_state(s) (grille ou tuiles)"""
+        if self.tile_coder is None:
+            return self.q_table[states]
+        return self.tile_weights[states].sum(axis=-2)
+    
+    def project_tiles(self):
+        """Recalcule la Q-table de la grille : Q des tuiles aux centres des cellules"""
+        centers = np.array([self.discretizer.discrete_to_continuous(state)
+                            for state in range(self.n_states)])
+        self.q_table = self._q_values(self.tile_coder.encode_batch(centers))
+    
     def select_action(self, continuous_state: np.ndarray, training: bool = True) -> int:
         """
         Sélectionne une action pour un état continu
@@ -93,7 +194,60 @@ class MountainCarAgent(QLearningAgent):
         """
         state = self.process_state(continuous_state)
         next_state = self.process_state(continuous_next_state)
-        super().update_q_table(state, action, reward, next_state, done)
+        if self.tile_coder is None:
+            super().update_q_table(state, action, reward, next_state, done)
+            return
+        
+        target = reward if done else reward + self.gamma * np.max(self._q_values(next_state))
+        td_error = target - self.tile_weights[state, action].sum()
+        # Une tuile active par grille : indices distincts, += suffit
+        self.tile_weights[state, action] += self.tile_learning_rate * td_error
+    
+    def batch_update_q_table(self, states: np.ndarray, actions: np.ndarray,
+                             rewards: np.ndarray, next_states: np.ndarray,
+                             dones: np.ndarray, collision: str = 'sequential',
+                             weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Mise à jour par lot ; en codage en tuiles, states et next_states sont
+        les tuiles actives (N, n_tilings) et les poids (tuile, a) partagés par
+        plusieurs transitions du lot sont traités selon collision :
+            - 'sequential': comme apply_td_targets, mises à jour appliquées une
+              par une dans l'ordre du lot (cibles figées)
+            - 'mean': moyenne des incréments des transitions qui partagent le
+              poids (la somme ferait un pas multiplié par le nombre de
+              transitions voisines et diverge avec les environnements parallèles)
+            - 'sum': somme des incréments
+        """
+        if self.tile_coder is None:
+            return super().batch_update_q_table(states, actions, rewards, next_states,
+                                                dones, collision, weights)
+        
+        actions = np.asarray(actions, dtype=np.int64)
+        dones = np.asarray(dones, dtype=bool)
+        bootstrap = self._q_values(next_states).max(axis=1)
+        targets = np.asarray(rewards, dtype=np.float64) + self.gamma * bootstrap * ~dones
+        td_errors = targets - self.tile_weights[states, actions[:, None]].sum(axis=1)
+        
+        rates = np.full(len(actions), self.tile_learning_rate)
+        if weights is not None:
+            rates = rates * np.asarray(weights, dtype=np.float64)
+        
+        if collision == 'sequential':
+            # Chaque transition voit les poids déjà modifiés par les précédentes
+            for tiles, action, target, rate in zip(states, actions, targets, rates):
+                self.tile_weights[tiles, action] += rate * (target - self.tile_weights[tiles, action].sum())
+            return td_errors
+        if collision not in ('mean', 'sum'):
+            raise ValueError(f"Mode de collision inconnu: {collision}")
+        
+        flat_weights = self.tile_weights.reshape(-1)
+        cells = (states * self.n_actions + actions[:, None]).ravel()
+        increments = np.bincount(cells, weights=np.repeat(rates * td_errors, states.shape[1]),
+                                 minlength=flat_weights.size)
+        if collision == 'mean':
+            increments /= np.maximum(np.bincount(cells, minlength=flat_weights.size), 1)
+        flat_weights += increments
+        return td_errors
     
     def train(self, env: gym.Env, episodes: int = 10000, 
              max_steps: int = 200, verbose: bool = True) -> List[float]:
@@ -117,47 +271,61 @@ class MountainCarAgent(QLearningAgent):
             print(f"[START] ENTRAÎNEMENT MOUNTAINCAR - {episodes} épisodes")
             print(f"{'='*80}\n")
         
-        for episode in range(episodes):
-            continuous_state, _ = env.reset()
-            total_reward = 0
-            steps = 0
-            
-            for step in range(max_steps):
-                # Sélection et exécution de l'action
-                action = self.select_action(continuous_state, training=True)
-                next_continuous_state, reward, terminated, truncated, _ = env.step(action)
-                done = terminated or truncated
+        if isinstance(env, VectorizedMountainCarEnv):
+            episode_rewards, _, success_count = self._run_batched_episodes(
+                env, episodes, max_steps, training=True, report_every=500, verbose=verbose
+            )
+        elif isinstance(env, gym.vector.VectorEnv):
+            episode_rewards, _, success_count = self._run_vector_env_episodes(
+                env, episodes, report_every=500, verbose=verbose
+            )
+        else:
+            for episode in range(episodes):
+                continuous_state, _ = env.reset()
+                total_reward = 0
+                steps = 0
                 
-                # Mise à jour de la Q-table
-                self.update_q_table(continuous_state, action, reward, 
-                                   next_continuous_state, done)
+                for step in range(max_steps):
+                    # Sélection et exécution de l'action
+                    action = self.select_action(continuous_state, training=True)
+                    next_continuous_state, reward, terminated, truncated, _ = env.step(action)
+                    done = terminated or truncated
+                    
+                    # Mise à jour de la Q-table
+                    self.update_q_table(continuous_state, action, reward, 
+                                       next_continuous_state, done)
+                    if self.observes_transitions:
+                        self._observe_transitions([continuous_state], [action], [reward],
+                                                  [next_continuous_state], [terminated])
+                    
+                    continuous_state = next_continuous_state
+                    total_reward += reward
+                    steps += 1
+                    
+                    # Vérification de succès
+                    if continuous_state[0] >= 0.5:  # Position >= 0.5 = but atteint
+                        success_count += 1
+                    
+                    if done:
+                        break
                 
-                continuous_state = next_continuous_state
-                total_reward += reward
-                steps += 1
+                # Diminution d'epsilon
+                self.decay_epsilon()
                 
-                # Vérification de succès
-                if continuous_state[0] >= 0.5:  # Position >= 0.5 = but atteint
-                    success_count += 1
+                episode_rewards.append(total_reward)
                 
-                if done:
-                    break
-            
-            # Diminution d'epsilon
-            self.decay_epsilon()
-            
-            episode_rewards.append(total_reward)
-            
-            # Affichage des progrès
-            if verbose and (episode + 1) % 500 == 0:
-                avg_reward = np.mean(episode_rewards[-100:])
-                success_rate = (success_count / (episode + 1)) * 100
-                print(f"Épisode {episode + 1:5d}/{episodes} | "
-                      f"Récompense moy. (100 derniers): {avg_reward:7.2f} | "
-                      f"Epsilon: {self.epsilon:.3f} | "
-                      f"Succès: {success_rate:.1f}%")
+                # Affichage des progrès
+                if verbose and (episode + 1) % 500 == 0:
+                    avg_reward = np.mean(episode_rewards[-100:])
+                    success_rate = (success_count / (episode + 1)) * 100
+                    print(f"Épisode {episode + 1:5d}/{episodes} | "
+                          f"Récompense moy. (100 derniers): {avg_reward:7.2f} | "
+                          f"Epsilon: {self.epsilon:.3f} | "
+                          f"Succès: {success_rate:.1f}%")
         
         self.training_rewards = episode_rewards
+        if self.tile_coder is not None:
+            self.project_tiles()
         
         if verbose:
             final_success_rate = (success_count / episodes) * 100
@@ -167,6 +335,8 @@ class MountainCarAgent(QLearningAgent):
             print(f"Récompense moyenne finale (100 derniers): {np.mean(episode_rewards[-100:]):.2f}")
             print(f"Taux de succès: {final_success_rate:.1f}%")
             print(f"Epsilon final: {self.epsilon:.3f}")
+            if self.uses_planning:
+                print(self.planning_report())
             print(f"{'='*80}\n")
         
         return episode_rewards
@@ -189,27 +359,32 @@ class MountainCarAgent(QLearningAgent):
         episode_lengths = []
         success_count = 0
         
-        for episode in range(episodes):
-            continuous_state, _ = env.reset()
-            total_reward = 0
-            steps = 0
-            
-            while steps < 200:
-                action = self.select_action(continuous_state, training=False)
-                continuous_state, reward, terminated, truncated, _ = env.step(action)
-                done = terminated or truncated
+        if isinstance(env, VectorizedMountainCarEnv):
+            episode_rewards, episode_lengths, success_count = self._run_batched_episodes(
+                env, episodes, 200, training=False
+            )
+        else:
+            for episode in range(episodes):
+                continuous_state, _ = env.reset()
+                total_reward = 0
+                steps = 0
                 
-                total_reward += reward
-                steps += 1
+                while steps < 200:
+                    action = self.select_action(continuous_state, training=False)
+                    continuous_state, reward, terminated, truncated, _ = env.step(action)
+                    done = terminated or truncated
+                    
+                    total_reward += reward
+                    steps += 1
+                    
+                    if continuous_state[0] >= 0.5:
+                        success_count += 1
+                    
+                    if done:
+                        break
                 
-                if continuous_state[0] >= 0.5:
-                    success_count += 1
-                
-                if done:
-                    break
-            
-            episode_rewards.append(total_reward)
-            episode_lengths.append(steps)
+                episode_rewards.append(total_reward)
+                episode_lengths.append(steps)
         
         # Calcul des statistiques
         stats = {
@@ -235,6 +410,65 @@ class MountainCarAgent(QLearningAgent):
         
         return episode_rewards, stats
     
+    def warm_start_from_model(self, env=None, method: str = 'value', n_samples: int = 64,
+                              seed: Optional[int] = None) -> np.ndarray:
+        """
+        Résout la grille de l'agent à partir de la physique connue de MountainCar
+        et utilise la Q obtenue comme initialisation (l'apprentissage en ligne
+        ne sert plus qu'à corriger les erreurs de discrétisation)
+        
+        Args:
+            env: VectorizedMountainCarEnv fournissant la physique (MountainCar-v0 si None)
+            method: 'value' ou 'policy' (modèle déterministe, n_samples=1 uniquement)
+            n_samples: États simulés par cellule (1 : centres des cellules, modèle
+                       déterministe mais biaisé par les cellules qui bouclent sur elles-mêmes)
+            seed: Graine du tirage des états dans les cellules
+            
+        Returns:
+            Q calculée sur la grille
+        """
+        self._require_grid("L'initialisation par modèle")
+        engine = env if isinstance(env, VectorizedMountainCarEnv) else None
+        start = time.perf_counter()
+        model = MountainCarGridModel(self.discretizer, n_samples, engine, seed)
+        q_table = solve_model(model, self.gamma, method)
+        elapsed = time.perf_counter() - start
+        
+        self.warm_start(q_table)
+        print(f"[OK] Grille MountainCar résolue: {self.n_states} états x {self.n_actions} actions, "
+              f"{n_samples} échantillon(s) par cellule, {elapsed:.3f}s")
+        return q_table
+    
+    def _checkpoint_metadata(self) -> Dict[str, Any]:
+        """Ajoute les paramètres du discrétiseur aux métadonnées du checkpoint"""
+        metadata = super()._checkpoint_metadata()
+        metadata['discretizer_params'] = {
+            'n_position_bins': self.discretizer.n_position_bins,
+            'n_velocity_bins': self.discretizer.n_velocity_bins
+        }
+        return metadata
+    
+    def _restore_checkpoint_metadata(self, metadata: Dict[str, Any]):
+        """Reconstruit le discrétiseur si le checkpoint utilise une autre grille"""
+        super()._restore_checkpoint_metadata(metadata)
+        
+        params = metadata.get('discretizer_params')
+        if params and (params['n_position_bins'] != self.discretizer.n_position_bins or
+                       params['n_velocity_bins'] != self.discretizer.n_velocity_bins):
+            self.discretizer = MountainCarDiscretizer(params['n_position_bins'],
+                                                      params['n_velocity_bins'])
+            self.n_states = self.discretizer.n_states
+            self.q_table = np.zeros((self.n_states, self.n_actions))
+            if self.dyna_model is not None:
+                # Le modèle appris porte sur l'ancienne grille
+                self.enable_dyna(self.planning_steps, self.dyna_model.n_next_samples)
+            if self.traces is not None:
+                self.enable_traces(self.trace_lambda, self.traces.mode, self.traces.min_trace,
+                                   self.traces.replacing)
+            if self.sweeper is not None:
+                self.enable_sweeping(self.sweep_budget, self.sweep_batch_size, self.sweep_learning_rate,
+                                     self.sweeper.threshold, self.sweeper.model.n_next_samples)
+    
     def get_action_name(self, action: int) -> str:
         """Retourne le nom d'une action"""
         action_names = {
@@ -254,11 +488,11 @@ class MountainCarAgent(QLearningAgent):
         Returns:
             Dictionnaire d'analyses
         """
-        discrete_state = self.process_state(continuous_state)
+        discrete_state = self.discretizer.discretize(continuous_state)
         state_info = self.discretizer.get_state_info(continuous_state)
         
         # Valeurs Q pour cet état
-        q_values = self.q_table[discrete_state]
+        q_values = self._q_values(self.process_state(continuous_state))
         best_action = np.argmax(q_values)
         
         return {
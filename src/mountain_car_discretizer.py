@@ -3,10 +3,55 @@ Module de discrétisation pour l'environnement MountainCar-v0
 Convertit l'espace d'états continu en espace discret pour Q-Learning
 """
 
+import math
 import numpy as np
 from typing import Tuple, List
 
 
+def _scalar_bin_index(value: float, edges: List[float], low: float, inv_width: float) -> int:
+    """
+    Équivalent scalaire de np.digitize(value, edges) sur une grille uniforme
+    
+    L'index est calculé arithmétiquement puis corrigé d'au plus un bin
+    pour rester exact aux frontières malgré les arrondis de np.linspace.
+    """
+    n_edges = len(edges)
+    if value != value:  # NaN, classé après tous les bords comme np.digitize
+        return n_edges
+    
+    # Bornage avant floor : math.floor lève OverflowError sur ±inf
+    scaled = (value - low) * inv_width
+    if scaled < -1.0:
+        idx = 0
+    elif scaled > n_edges:
+        idx = n_edges
+    else:
+        idx = min(math.floor(scaled) + 1, n_edges)
+    
+    if idx > 0 and value < edges[idx - 1]:
+        idx -= 1
+    elif idx < n_edges and value >= edges[idx]:
+        idx += 1
+    
+    return idx
+
+
+def _batch_bin_indices(values: np.ndarray, edges: np.ndarray, low: float,
+                       inv_width: float) -> np.ndarray:
+    """Version vectorisée de _scalar_bin_index, identique à np.digitize(values, edges)"""
+    n_edges = len(edges)
+    with np.errstate(invalid='ignore', over='ignore'):
+        scaled = np.floor((values - low) * inv_width)
+    idx = np.clip(np.nan_to_num(scaled, nan=n_edges), -1, n_edges).astype(np.int64) + 1
+    np.minimum(idx, n_edges, out=idx)
+    
+    # Correction d'arrondi aux frontières
+    idx -= (idx > 0) & (values < edges[idx - 1])
+    idx += (idx < n_edges) & (values >= edges[np.minimum(idx, n_edges - 1)])
+    
+    return idx
+
+
 class MountainCarDiscretizer:
     """
     Discrétise l'espace d'états continu de MountainCar pour Q-Learning
@@ -46,6 +91,12 @@ class MountainCarDiscretizer:
             n_velocity_bins - 1
         )
         
+        # Paramètres du binning arithmétique (grille uniforme)
+        self._position_inv_width = (len(self.position_bins) - 1) / (self.position_max - self.position_min)
+        self._velocity_inv_width = (len(self.velocity_bins) - 1) / (self.velocity_max - self.velocity_min)
+        self._position_edges = self.position_bins.tolist()
+        self._velocity_edges = self.velocity_bins.tolist()
+        
         # Nombre total d'états discrets
         self.n_states = n_position_bins * n_velocity_bins
         
@@ -64,16 +115,31 @@ class MountainCarDiscretizer:
         Returns:
             État discret (index unique)
         """
-        position, velocity = state
-        
-        # Discrétisation de chaque dimension
-        pos_idx = np.digitize(position, self.position_bins)
-        vel_idx = np.digitize(velocity, self.velocity_bins)
+        pos_idx = _scalar_bin_index(float(state[0]), self._position_edges,
+                                    self.position_min, self._position_inv_width)
+        vel_idx = _scalar_bin_index(float(state[1]), self._velocity_edges,
+                                    self.velocity_min, self._velocity_inv_width)
         
         # Conversion en index unique
-        discrete_state = pos_idx * self.n_velocity_bins + vel_idx
+        return pos_idx * self.n_velocity_bins + vel_idx
+    
+    def discretize_batch(self, states: np.ndarray) -> np.ndarray:
+        """
+        Convertit un lot d'états continus en états discrets
+        
+        Args:
+            states: Tableau de forme (N, 2) [position, velocity]
+            
+        Returns:
+            États discrets de forme (N,)
+        """
+        states = np.asarray(states)
+        pos_idx = _batch_bin_indices(states[:, 0], self.position_bins,
+                                     self.position_min, self._position_inv_width)
+        vel_idx = _batch_bin_indices(states[:, 1], self.velocity_bins,
+                                     self.velocity_min, self._velocity_inv_width)
         
-        return discrete_state
+        return pos_idx * self.n_velocity_bins + vel_idx
     
     def continuous_to_discrete(self, state: np.ndarray) -> int:
         """Alias pour discretize()"""
@@ -119,10 +185,10 @@ class MountainCarDiscretizer:
         Returns:
             Tuple (pos_idx, vel_idx)
         """
-        position, velocity = state
-        
-        pos_idx = np.digitize(position, self.position_bins)
-        vel_idx = np.digitize(velocity, self.velocity_bins)
+        pos_idx = _scalar_bin_index(float(state[0]), self._position_edges,
+                                    self.position_min, self._position_inv_width)
+        vel_idx = _scalar_bin_index(float(state[1]), self._velocity_edges,
+                                    self.velocity_min, self._velocity_inv_width)
         
         return pos_idx, vel_idx
     
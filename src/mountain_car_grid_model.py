@@ -0,0 +1,136 @@
+"""
+Modèle tabulaire de MountainCar-v0 sur la grille d'un MountainCarDiscretizer
+La physique (connue et déterministe) est appliquée en un seul passage vectorisé
+aux centres des cellules ou à des états tirés dans chaque cellule ; la table
+obtenue se résout par itération sur les valeurs (voir value_iteration.solve_model)
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+from src.mountain_car_discretizer import MountainCarDiscretizer
+from src.vectorized_mountain_car import VectorizedMountainCarEnv
+
+
+def _bin_bounds(edges: np.ndarray, low: float, high: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bornes [bas, haut) de chaque bin de np.digitize(valeur, edges)
+    
+    Le premier et le dernier bin (hors de [low, high)) sont réduits aux bornes
+    low et high, seules valeurs que la physique y produit.
+    """
+    lows = np.concatenate([[low], edges])
+    highs = np.concatenate([[low], edges[1:], [high]])
+    return lows, np.maximum(highs, lows)
+
+
+class MountainCarGridModel:
+    """
+    Transitions (cellule, action) -> cellules suivantes de la grille MountainCar
+    
+    Expose next_states, rewards et terminals comme les autres modèles tabulaires :
+    avec n_samples=1 la cellule est représentée par son centre (modèle
+    déterministe, tables de forme (n_states, n_actions) comme VectorizedTaxiEnv),
+    sinon par n_samples états tirés uniformément dans la cellule, dont les
+    successeurs sont moyennés (tables de forme (n_states, n_actions, n_samples)).
+    """
+    
+    def __init__(self, discretizer: MountainCarDiscretizer, n_samples: int = 1,
+                 engine: Optional[VectorizedMountainCarEnv] = None,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            discretizer: Grille de l'agent
+            n_samples: États simulés par cellule (1 : centres des cellules)
+            engine: Moteur fournissant la physique (MountainCar-v0 par défaut)
+            seed: Graine du tirage des états dans les cellules
+        """
+        self.discretizer = discretizer
+        self.n_samples = n_samples
+        self.engine = engine if engine is not None else VectorizedMountainCarEnv(n_envs=1)
+        self.n_states = discretizer.n_states
+        self.n_actions = self.engine.n_actions
+        
+        positions, velocities = self.sample_states(n_samples, seed)
+        n_states, n_actions = self.n_states, self.n_actions
+        
+        # Un seul passage de la physique sur toutes les (cellule, action, échantillon)
+        shape = (n_states, n_actions, n_samples)
+        actions = np.broadcast_to(np.arange(n_actions)[None, :, None], shape)
+        next_positions, next_velocities, terminated = self.engine.dynamics(
+            np.broadcast_to(positions[:, None, :], shape).ravel(),
+            np.broadcast_to(velocities[:, None, :], shape).ravel(),
+            actions.ravel())
+        
+        next_observations = np.stack([next_positions, next_velocities], axis=1)
+        if n_samples == 1:
+            # Modèle déterministe : pas d'axe d'échantillons (itération sur les politiques possible)
+            shape = (n_states, n_actions)
+        self.next_states = discretizer.discretize_batch(next_observations).reshape(shape)
+        self.terminals = terminated.reshape(shape)
+        self.rewards = np.full((n_states, n_actions), -1.0)
+    
+    def sample_states(self, n_samples: int, seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        États continus représentant chaque cellule
+        
+        Returns:
+            (positions, vitesses) de forme (n_states, n_samples)
+        """
+        discretizer = self.discretizer
+        position_lows, position_highs = _bin_bounds(discretizer.position_bins,
+                                                    discretizer.position_min, discretizer.position_max)
+        velocity_lows, velocity_highs = _bin_bounds(discretizer.velocity_bins,
+                                                    discretizer.velocity_min, discretizer.velocity_max)
+        
+        if n_samples == 1:
+            offsets = np.full((self.n_states, 2, 1), 0.5)
+        else:
+            offsets = np.random.default_rng(seed).random((self.n_states, 2, n_samples))
+        
+        cells = np.arange(self.n_states)
+        position_bins = cells // discretizer.n_velocity_bins
+        velocity_bins = cells % discretizer.n_velocity_bins
+        positions = (position_lows[position_bins, None]
+                     + offsets[:, 0] * (position_highs - position_lows)[position_bins, None])
+        velocities = (velocity_lows[velocity_bins, None]
+                      + offsets[:, 1] * (velocity_highs - velocity_lows)[velocity_bins, None])
+        return positions, velocities
+
+
+def test_mountain_car_grid_model():
+    """Vérifie les deux méthodes de résolution de la grille MountainCar"""
+    from src.mountain_car_agent import MountainCarAgent
+    from src.value_iteration import solve_model
+    
+    print("🧪 TEST DU MODÈLE DE GRILLE MOUNTAINCAR\n")
+    
+    discretizer = MountainCarDiscretizer(n_position_bins=20, n_velocity_bins=20)
+    model = MountainCarGridModel(discretizer, n_samples=1)
+    assert model.next_states.shape == (discretizer.n_states, 3)
+    q_value = solve_model(model, 0.99, 'value')
+    q_policy = solve_model(model, 0.99, 'policy')
+    assert np.allclose(q_value, q_policy, atol=1e-6)
+    print(f"[OK] Modèle déterministe: itérations sur les valeurs et sur les politiques "
+          f"concordantes (écart max {np.abs(q_value - q_policy).max():.2e})")
+    
+    sampled = MountainCarGridModel(discretizer, n_samples=8, seed=0)
+    assert sampled.next_states.shape == (discretizer.n_states, 3, 8)
+    solve_model(sampled, 0.99, 'value')
+    try:
+        solve_model(sampled, 0.99, 'policy')
+    except ValueError:
+        print("[OK] Itération sur les politiques refusée pour le modèle échantillonné")
+    else:
+        raise AssertionError("l'itération sur les politiques suppose un modèle déterministe")
+    
+    for method in ('value', 'policy'):
+        agent = MountainCarAgent()
+        q_table = agent.warm_start_from_model(method=method, n_samples=1)
+        assert np.allclose(q_table, q_value, atol=1e-6)
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_mountain_car_grid_model()
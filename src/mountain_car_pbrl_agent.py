@@ -5,17 +5,27 @@ Combine Q-Learning avec discrétisation et apprentissage par préférences
 
 import numpy as np
 import gymnasium as gym
-from typing import List, Dict, Tuple, Any
+from typing import List, Dict, Tuple, Any, Optional
 from src.mountain_car_agent import MountainCarAgent
-from src.trajectory_manager import Trajectory
+from src.trajectory_manager import Trajectory, ColumnarTrajectory, as_columnar
+from src.preference_updates import PreparedTrajectory
+from src.preference_learning import PreferenceLearningMixin
+from src.vectorized_mountain_car import VectorizedMountainCarEnv
 
 
-class MountainCarPbRLAgent(MountainCarAgent):
+class MountainCarPbRLAgent(PreferenceLearningMixin, MountainCarAgent):
     """
     Agent PBRL spécialisé pour MountainCar avec gestion de la discrétisation
     Hérite de MountainCarAgent pour la discrétisation et étend avec PBRL
+    (logique de préférences commune dans PreferenceLearningMixin)
     """
     
+    # Bonus/malus AUGMENTÉS (x2 pour un impact plus fort, pénalité modérée) et
+    # learning rate OPTIMISÉ pour les préférences (0.7 au lieu de 0.5)
+    preference_bonus_scale = 2.0
+    preference_penalty_scale = 0.8
+    preference_lr_scale = 0.7
+    
     def __init__(self,
                  n_position_bins: int = 20,
                  n_velocity_bins: int = 20,
@@ -41,105 +51,97 @@ class MountainCarPbRLAgent(MountainCarAgent):
             epsilon_min=epsilon_min
         )
         
-        self.preference_weight = preference_weight
-        self.preference_updates = 0
-        self.preference_learning_history = []
+        self._init_preference_learning(preference_weight)
         
         print(f"[TARGET] MountainCarPbRLAgent initialisé:")
         print(f"   - Preference weight: {preference_weight}")
     
-    def update_from_preferences(self, 
-                               preferred_trajectory: Trajectory,
-                               less_preferred_trajectory: Trajectory,
-                               preference_strength: float = 1.0):
+    def _prepare_trajectory(self, trajectory: Trajectory) -> PreparedTrajectory:
         """
-        Met à jour la Q-table en fonction d'une préférence entre deux trajectoires
-        OPTIMISÉ: Bonus/malus plus importants et ciblés
+        Discrétise une trajectoire en une seule fois et calcule ses poids de position
         
-        Args:
-            preferred_trajectory: Trajectoire préférée
-            less_preferred_trajectory: Trajectoire moins préférée
-            preference_strength: Force de la préférence
+        Position weight OPTIMISÉ: emphase sur le début (actions critiques, x1.5)
+        et sur la fin (résultat, x1.3). Les pas sans états continus sont ignorés.
         """
-        # Calcul du bonus/malus AUGMENTÉS
-        reward_bonus = preference_strength * self.preference_weight * 2.0  # x2 pour impact plus fort
-        reward_penalty = -preference_strength * self.preference_weight * 0.8  # Pénalité modérée
-        
-        # Mise à jour des trajectoires
-        self._update_trajectory_values(preferred_trajectory, reward_bonus, is_preferred=True)
-        self._update_trajectory_values(less_preferred_trajectory, reward_penalty, is_preferred=False)
+        n_steps = trajectory.episode_length if isinstance(trajectory, ColumnarTrajectory) \
+            else len(trajectory.steps)
+        progress = np.arange(n_steps) / max(n_steps, 1)
+        position_weights = np.where(progress < 0.3, 1.5, np.where(progress > 0.7, 1.3, 1.0))
         
-        self.preference_updates += 1
+        if isinstance(trajectory, ColumnarTrajectory) and trajectory.continuous_states is not None:
+            columns = trajectory
+            kept = np.arange(n_steps)
+            continuous_states = trajectory.continuous_states
+            continuous_next_states = trajectory.continuous_next_states
+        else:
+            # Ancien format: états continus dans des attributs ajoutés aux pas
+            # (ou directement dans state/next_state s'ils sont déjà continus)
+            columns = as_columnar(trajectory)
+            kept, continuous_states, continuous_next_states = [], [], []
+            for i, step in enumerate(trajectory.steps):
+                if hasattr(step, 'continuous_state') and hasattr(step, 'continuous_next_state'):
+                    continuous_states.append(step.continuous_state)
+                    continuous_next_states.append(step.continuous_next_state)
+                elif isinstance(step.state, (tuple, list)) and len(step.state) == 2:
+                    continuous_states.append(step.state)
+                    continuous_next_states.append(step.next_state)
+                else:
+                    continue
+                kept.append(i)
+            kept = np.asarray(kept, dtype=np.int64)
+            continuous_states = np.asarray(continuous_states, dtype=np.float64).reshape(-1, 2)
+            continuous_next_states = np.asarray(continuous_next_states, dtype=np.float64).reshape(-1, 2)
         
-        # Enregistrement
-        self.preference_learning_history.append({
-            'preferred_reward': preferred_trajectory.total_reward,
-            'less_preferred_reward': less_preferred_trajectory.total_reward,
-            'preference_strength': preference_strength,
-            'reward_bonus': reward_bonus,
-            'reward_penalty': reward_penalty
-        })
+        # États de la grille, y compris en codage en tuiles (Q-table et r̂ sont définis sur la grille)
+        return PreparedTrajectory(
+            states=self.discretizer.discretize_batch(continuous_states),
+            actions=columns.actions[kept].astype(np.int64),
+            next_states=self.discretizer.discretize_batch(continuous_next_states),
+            dones=columns.dones[kept],
+            rewards=columns.rewards[kept],
+            position_weights=position_weights[kept]
+        )
     
-    def _update_trajectory_values(self, trajectory: Trajectory, 
-                                 reward_modifier: float,
-                                 is_preferred: bool):
+    def _heuristic_strength(self, pref: Dict[str, Any], preferred: Trajectory,
+                            less_preferred: Trajectory) -> float:
+        """Force adaptative basée sur l'écart de récompense totale"""
+        reward_diff = abs(preferred.total_reward - less_preferred.total_reward)
+        return 1.0 + min(reward_diff / 50.0, 1.0)
+    
+    def apply_preferences(self, preferences: List[Tuple[Trajectory, Trajectory, float]],
+                          mode: str = 'sequential'):
         """
-        Met à jour les valeurs Q pour toutes les transitions d'une trajectoire
-        OPTIMISÉ: Pondération adaptative selon la position dans la trajectoire
-        
-        Args:
-            trajectory: Trajectoire à mettre à jour
-            reward_modifier: Modification de récompense
-            is_preferred: True si trajectoire préférée
+        Balayage de la Q-table de la grille : refusé en codage en tuiles, où la
+        politique lit les poids des tuiles (utiliser preference_mode='reward_model')
         """
-        for i, step in enumerate(trajectory.steps):
-            # Position weight OPTIMISÉ: emphase sur début et fin
-            progress = i / max(len(trajectory.steps), 1)
-            
-            # Bonus pour les premières actions (critiques) et actions finales (résultat)
-            if progress < 0.3:  # Début crucial
-                position_weight = 1.5
-            elif progress > 0.7:  # Fin importante
-                position_weight = 1.3
-            else:  # Milieu
-                position_weight = 1.0
-            
-            final_reward = (step.reward + reward_modifier) * position_weight
-            
-            # Récupération des états continus stockés dans les attributs custom
-            if hasattr(step, 'continuous_state') and hasattr(step, 'continuous_next_state'):
-                continuous_state = np.array(step.continuous_state)
-                continuous_next_state = np.array(step.continuous_next_state)
-            else:
-                # Fallback: utiliser state/next_state directement s'ils sont déjà continus
-                # (pour compatibilité future)
-                if isinstance(step.state, (tuple, list)) and len(step.state) == 2:
-                    continuous_state = np.array(step.state)
-                    continuous_next_state = np.array(step.next_state)
-                else:
-                    # Skip ce step si on ne peut pas récupérer les états
-                    continue
-            
-            # Conversion des états continus en discrets
-            discrete_state = self.process_state(continuous_state)
-            discrete_next_state = self.process_state(continuous_next_state)
-            
-            # Calcul de la target
-            if step.done:
-                target = final_reward
-            else:
-                target = final_reward + self.gamma * np.max(self.q_table[discrete_next_state])
-            
-            # Mise à jour avec learning rate OPTIMISÉ
-            preference_lr = self.lr * 0.7  # Augmenté de 0.5 à 0.7
-            self.q_table[discrete_state, step.action] += preference_lr * \
-                (target - self.q_table[discrete_state, step.action])
+        self._require_grid("L'application des préférences à la Q-table")
+        super().apply_preferences(preferences, mode)
+    
+    def update_q_table(self, continuous_state: np.ndarray, action: int,
+                      reward: float, continuous_next_state: np.ndarray, done: bool):
+        """Mise à jour Q-Learning avec la récompense complétée par r̂(s, a)"""
+        if self.reward_table is not None:
+            # r̂ est défini sur la grille, y compris en codage en tuiles
+            state = self.discretizer.discretize(continuous_state)
+            reward = reward + self.preference_weight * self.reward_table[state, action]
+        super().update_q_table(continuous_state, action, reward, continuous_next_state, done)
+    
+    def _augment_rewards(self, states: np.ndarray, actions: np.ndarray,
+                         rewards: np.ndarray) -> np.ndarray:
+        """r̂ étant défini sur la grille, refusé pour des lots de tuiles (rejeu, environnements parallèles)"""
+        if self.reward_table is not None and self.tile_coder is not None:
+            raise ValueError("r̂ est défini sur la grille : les mises à jour par lot en codage "
+                             "en tuiles (rejeu, environnements parallèles) ne peuvent pas l'utiliser")
+        return super()._augment_rewards(states, actions, rewards)
     
     def train_with_preferences(self,
                               env: gym.Env,
                               trajectories: List[Trajectory],
                               preferences: List[Dict[str, Any]],
-                              episodes: int = 5000) -> List[float]:
+                              episodes: int = 5000,
+                              preference_mode: str = 'sequential',
+                              incremental: bool = False,
+                              max_derived: Optional[int] = None) -> List[float]:
         """
         Entraîne l'agent en combinant exploration et apprentissage par préférences
         
@@ -148,6 +150,13 @@ class MountainCarPbRLAgent(MountainCarAgent):
             trajectories: Liste de trajectoires pour les préférences
             preferences: Liste des préférences collectées
             episodes: Nombre d'épisodes d'entraînement
+            preference_mode: Mode d'application des préférences ('sequential', 'jacobi'
+                             ou 'reward_model' pour apprendre r̂ au lieu de modifier la Q-table)
+            incremental: Si True, n'applique que les préférences postérieures au
+                         filigrane (voir apply_new_preferences)
+            max_derived: None pour appliquer la liste brute ; sinon les préférences
+                         sont consolidées en graphe (doublons fusionnés) et au plus
+                         max_derived préférences impliquées par transitivité sont ajoutées
             
         Returns:
             Liste des récompenses par épisode
@@ -163,47 +172,58 @@ class MountainCarPbRLAgent(MountainCarAgent):
         
         # Phase 1: Application des préférences existantes
         print("Phase 1: Application des préférences...")
-        self._apply_existing_preferences(trajectories, preferences)
+        self._apply_preference_phase(trajectories, preferences, preference_mode, incremental, max_derived)
         
         # Phase 2: Entraînement avec Q-table modifiée
         print("Phase 2: Entraînement avec exploration...")
         success_count = 0
         
-        for episode in range(episodes):
-            state, _ = env.reset()
-            total_reward = 0
-            steps = 0
-            max_steps = 200
-            
-            while steps < max_steps:
-                action = self.select_action(state, training=True)
-                next_state, reward, terminated, truncated, _ = env.step(action)
-                done = terminated or truncated
-                
-                # Mise à jour Q-table
-                self.update_q_table(state, action, float(reward), next_state, done)
+        if isinstance(env, VectorizedMountainCarEnv):
+            episode_rewards, _, success_count = self._run_batched_episodes(
+                env, episodes, 200, training=True, report_every=500
+            )
+        elif isinstance(env, gym.vector.VectorEnv):
+            episode_rewards, _, success_count = self._run_vector_env_episodes(
+                env, episodes, report_every=500
+            )
+        else:
+            for episode in range(episodes):
+                state, _ = env.reset()
+                total_reward = 0
+                steps = 0
+                max_steps = 200
+                    
+                while steps < max_steps:
+                    action = self.select_action(state, training=True)
+                    next_state, reward, terminated, truncated, _ = env.step(action)
+                    done = terminated or truncated
+                    
+                    # Mise à jour Q-table
+                    self.update_q_table(state, action, float(reward), next_state, done)
+                    if self.observes_transitions:
+                        self._observe_transitions([state], [action], [reward], [next_state], [terminated])
+                    
+                    state = next_state
+                    total_reward += float(reward)
+                    steps += 1
+                    
+                    if state[0] >= 0.5:
+                        success_count += 1
+                    
+                    if done:
+                        break
                 
-                state = next_state
-                total_reward += float(reward)
-                steps += 1
+                self.decay_epsilon()
+                episode_rewards.append(total_reward)
                 
-                if state[0] >= 0.5:
-                    success_count += 1
-                
-                if done:
-                    break
-            
-            self.decay_epsilon()
-            episode_rewards.append(total_reward)
-            
-            # Affichage progrès
-            if (episode + 1) % 500 == 0:
-                avg_reward = np.mean(episode_rewards[-100:])
-                success_rate = (success_count / (episode + 1)) * 100
-                print(f"Épisode {episode + 1:5d}/{episodes} | "
-                      f"Récompense moy. (100 derniers): {avg_reward:7.2f} | "
-                      f"Epsilon: {self.epsilon:.3f} | "
-                      f"Succès: {success_rate:.1f}%")
+                # Affichage progrès
+                if (episode + 1) % 500 == 0:
+                    avg_reward = np.mean(episode_rewards[-100:])
+                    success_rate = (success_count / (episode + 1)) * 100
+                    print(f"Épisode {episode + 1:5d}/{episodes} | "
+                          f"Récompense moy. (100 derniers): {avg_reward:7.2f} | "
+                          f"Epsilon: {self.epsilon:.3f} | "
+                          f"Succès: {success_rate:.1f}%")
         
         self.training_rewards = episode_rewards
         
@@ -217,49 +237,6 @@ class MountainCarPbRLAgent(MountainCarAgent):
         
         return episode_rewards
     
-    def _apply_existing_preferences(self,
-                                   trajectories: List[Trajectory],
-                                   preferences: List[Dict[str, Any]]):
-        """
-        Applique les préférences existantes pour initialiser la Q-table
-        """
-        # Créer mapping des trajectoires
-        traj_dict = {traj.episode_id: traj for traj in trajectories}
-        
-        applied = 0
-        for pref in preferences:
-            if pref['choice'] == 0:  # Égalité
-                continue
-            
-            traj_a_id = pref['trajectory_a_id']
-            traj_b_id = pref['trajectory_b_id']
-            
-            if traj_a_id not in traj_dict or traj_b_id not in traj_dict:
-                continue
-            
-            traj_a = traj_dict[traj_a_id]
-            traj_b = traj_dict[traj_b_id]
-            
-            # Déterminer trajectoire préférée
-            if pref['choice'] == 1:  # A préférée
-                preferred = traj_a
-                less_preferred = traj_b
-            else:  # B préférée
-                preferred = traj_b
-                less_preferred = traj_a
-            
-            # Calculer force de préférence
-            reward_diff = abs(preferred.total_reward - less_preferred.total_reward)
-            
-            # Force adaptative
-            strength = 1.0 + min(reward_diff / 50.0, 1.0)
-            
-            # Appliquer préférence
-            self.update_from_preferences(preferred, less_preferred, strength)
-            applied += 1
-        
-        print(f"[OK] {applied} préférences appliquées (sur {len(preferences)})")
-    
     def get_preference_learning_summary(self) -> Dict[str, Any]:
         """Retourne un résumé de l'apprentissage par préférences"""
         if not self.preference_learning_history:
@@ -285,6 +262,8 @@ class MountainCarPbRLAgent(MountainCarAgent):
             'training_rewards': self.training_rewards,
             'preference_updates': self.preference_updates,
             'preference_learning_history': self.preference_learning_history,
+            'preference_watermark': self.preference_watermark.to_dict(),
+            'applied_strengths': self.applied_strengths,
             'discretizer_params': {
                 'n_position_bins': self.discretizer.n_position_bins,
                 'n_velocity_bins': self.discretizer.n_velocity_bins
@@ -331,5 +310,43 @@ def test_pbrl_agent():
     print("[OK] Test terminé!")
 
 
+def test_pbrl_tile_coding():
+    """Test rapide de l'apprentissage par préférences en codage en tuiles"""
+    print("🧪 TEST PBRL MOUNTAINCAR EN CODAGE EN TUILES\n")
+    from src.trajectory_manager import TrajectoryManager
+    
+    env = gym.make('MountainCar-v0')
+    env.reset(seed=0)
+    agent = MountainCarPbRLAgent(preference_weight=0.5)
+    agent.enable_tile_coding()
+    agent.train(env, episodes=20, verbose=False)
+    
+    # Trajectoires collectées sur la grille, pas en indices de tuiles
+    manager = TrajectoryManager()
+    trajectories = [manager.collect_trajectory(env, agent, columnar=True) for _ in range(6)]
+    assert all(np.ndim(traj.states) == 1 for traj in trajectories)
+    preferences = [{'trajectory_a_id': trajectories[i].episode_id,
+                    'trajectory_b_id': trajectories[i + 1].episode_id,
+                    'choice': 1 + i % 2}
+                   for i in range(len(trajectories) - 1)]
+    
+    # Le balayage de la Q-table est refusé, r̂ reste disponible
+    try:
+        agent.train_with_preferences(env, trajectories, preferences, episodes=5)
+    except ValueError as error:
+        print(f"[OK] Balayage refusé: {error}")
+    else:
+        raise AssertionError("le balayage de la Q-table doit être refusé en codage en tuiles")
+    
+    rewards = agent.train_with_preferences(env, trajectories, preferences, episodes=5,
+                                           preference_mode='reward_model')
+    assert agent.reward_table.shape == (agent.n_states, agent.n_actions)
+    assert len(rewards) == 5
+    
+    env.close()
+    print("[OK] Test terminé!")
+
+
 if __name__ == "__main__":
     test_pbrl_agent()
+    test_pbrl_tile_coding()
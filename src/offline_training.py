@@ -0,0 +1,214 @@
+"""
+Entraînement hors ligne par itération Q ajustée (fitted Q-iteration) tabulaire
+Les trajectoires déjà collectées (TrajectoryManager.save_trajectories, collecteurs
+MountainCar) sont chargées en tableaux, agrégées en modèle empirique, puis
+l'itération Q est appliquée en vectoriel jusqu'à convergence
+"""
+
+import pickle
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+from src.trajectory_manager import Trajectory, as_columnar
+
+
+class TransitionDataset:
+    """
+    Jeu de transitions (s, a, r, s', fin) issu de trajectoires, en tableaux contigus
+    
+    Les trajectoires stockent done = terminated or truncated : une fin atteinte
+    au pas time_limit est considérée comme une troncature (pas d'état terminal,
+    la valeur de s' reste amorcée), les autres comme de vraies fins d'épisode.
+    """
+    
+    def __init__(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                 next_states: np.ndarray, terminals: np.ndarray, episode_ids: np.ndarray):
+        self.states = np.asarray(states, dtype=np.int64)
+        self.actions = np.asarray(actions, dtype=np.int64)
+        self.rewards = np.asarray(rewards, dtype=np.float64)
+        self.next_states = np.asarray(next_states, dtype=np.int64)
+        self.terminals = np.asarray(terminals, dtype=bool)
+        self.episode_ids = np.asarray(episode_ids, dtype=np.int64)
+    
+    def __len__(self) -> int:
+        return len(self.actions)
+    
+    @property
+    def n_episodes(self) -> int:
+        return len(np.unique(self.episode_ids))
+    
+    @classmethod
+    def from_trajectories(cls, trajectories: List[Trajectory],
+                          process_states: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+                          time_limit: Optional[int] = 200) -> 'TransitionDataset':
+        """
+        Concatène des trajectoires (format liste ou colonnes)
+        
+        Args:
+            trajectories: Trajectoires collectées
+            process_states: Discrétisation appliquée aux observations continues
+                            quand la trajectoire en contient (ex: agent.process_states,
+                            pour réutiliser un jeu collecté sur une autre grille)
+            time_limit: Longueur maximale d'épisode de l'environnement (None : toute
+                        fin d'épisode est terminale)
+        
+        Returns:
+            TransitionDataset
+        """
+        columns = {name: [] for name in ('states', 'actions', 'rewards', 'next_states',
+                                         'terminals', 'episode_ids')}
+        for trajectory in trajectories:
+            trajectory = as_columnar(trajectory)
+            n_steps = trajectory.episode_length
+            if n_steps == 0:
+                continue
+            if process_states is not None and trajectory.continuous_states is not None:
+                states = process_states(trajectory.continuous_states)
+                next_states = process_states(trajectory.continuous_next_states)
+            else:
+                states, next_states = trajectory.states, trajectory.next_states
+            
+            terminals = trajectory.dones.copy()
+            if time_limit is not None and n_steps >= time_limit:
+                terminals[time_limit - 1:] = False
+            
+            columns['states'].append(states)
+            columns['actions'].append(trajectory.actions)
+            columns['rewards'].append(trajectory.rewards)
+            columns['next_states'].append(next_states)
+            columns['terminals'].append(terminals)
+            columns['episode_ids'].append(np.full(n_steps, trajectory.episode_id))
+        
+        if not columns['actions']:
+            return cls(*(np.zeros(0) for _ in columns))
+        return cls(*(np.concatenate(columns[name]) for name in columns))
+    
+    @classmethod
+    def load(cls, filepath: str, process_states: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+             time_limit: Optional[int] = 200) -> 'TransitionDataset':
+        """Charge un fichier pickle de trajectoires (voir from_trajectories)"""
+        with open(filepath, 'rb') as f:
+            trajectories = pickle.load(f)
+        return cls.from_trajectories(trajectories, process_states, time_limit)
+
+
+def fitted_q_iteration(dataset: TransitionDataset, n_states: int, n_actions: int,
+                       gamma: float, reward_bonus: Optional[np.ndarray] = None,
+                       q_init: Optional[np.ndarray] = None, tol: float = 1e-6,
+                       max_iterations: int = 1000) -> Tuple[np.ndarray, int]:
+    """
+    Itération Q sur le modèle empirique d'un jeu de transitions
+    
+    Q(s, a) <- r̄(s, a) + bonus(s, a) + gamma * moyenne_{s' observés} (1 - fin) * V(s'),
+    V(s') étant le maximum sur les seules actions observées en s' (contrainte au
+    support du jeu : une action jamais essayée ne peut pas sembler meilleure).
+    Les transitions identiques sont regroupées avant d'itérer : le coût d'une
+    itération est proportionnel au nombre de transitions distinctes.
+    
+    Args:
+        dataset: Transitions hors ligne
+        n_states: Nombre d'états discrets
+        n_actions: Nombre d'actions
+        gamma: Facteur de réduction
+        reward_bonus: Récompense additionnelle (n_states, n_actions), ex:
+                      preference_weight * r̂ d'un modèle de préférences
+        q_init: Q-table de départ ; donne aussi la valeur des états jamais visités
+        tol: Critère d'arrêt sur la variation maximale de Q
+        max_iterations: Nombre maximum d'itérations
+    
+    Returns:
+        Tuple (Q-table, nombre d'itérations). Les actions non observées d'un état
+        visité reçoivent la plus petite valeur observée dans cet état.
+    """
+    q_table = (np.zeros((n_states, n_actions)) if q_init is None
+               else np.array(q_init, dtype=np.float64))
+    if len(dataset) == 0:
+        return q_table, 0
+    
+    n_cells = n_states * n_actions
+    cells = dataset.states * n_actions + dataset.actions
+    cell_counts = np.bincount(cells, minlength=n_cells)
+    observed = (cell_counts > 0).reshape(n_states, n_actions)
+    visited = observed.any(axis=1)
+    
+    mean_rewards = np.bincount(cells, weights=dataset.rewards, minlength=n_cells) / np.maximum(cell_counts, 1)
+    if reward_bonus is not None:
+        mean_rewards = mean_rewards + np.asarray(reward_bonus, dtype=np.float64).reshape(-1)
+    
+    # Transitions non terminales distinctes (cellule, s') et leur fréquence dans la cellule
+    continuing = ~dataset.terminals
+    edges, edge_counts = np.unique(cells[continuing] * n_states + dataset.next_states[continuing],
+                                   return_counts=True)
+    edge_cells = edges // n_states
+    edge_next_states = edges % n_states
+    edge_weights = gamma * edge_counts / cell_counts[edge_cells]
+    
+    observed_cells = np.flatnonzero(observed.reshape(-1))
+    flat_q = q_table.reshape(-1)
+    fallback_values = q_table.max(axis=1)
+    for iteration in range(1, max_iterations + 1):
+        values = np.where(visited, np.where(observed, q_table, -np.inf).max(axis=1), fallback_values)
+        bootstrap = np.bincount(edge_cells, weights=edge_weights * values[edge_next_states],
+                                minlength=n_cells)
+        new_values = mean_rewards[observed_cells] + bootstrap[observed_cells]
+        delta = np.abs(new_values - flat_q[observed_cells]).max()
+        flat_q[observed_cells] = new_values
+        if delta < tol:
+            break
+    
+    floor = np.where(observed, q_table, np.inf).min(axis=1)
+    q_table[visited] = np.where(observed[visited], q_table[visited], floor[visited, None])
+    return q_table, iteration
+
+
+def test_fitted_q_iteration():
+    """Vérifie fitted_q_iteration contre l'itération sur les valeurs d'un modèle déterministe"""
+    from src.trajectory_manager import TrajectoryStep
+    from src.value_iteration import value_iteration
+    
+    print("🧪 TEST DE L'ITÉRATION Q AJUSTÉE\n")
+    
+    # Chaîne déterministe : gauche / droite, le bout droit est terminal
+    n_chain, gamma = 8, 0.9
+    chain_next = np.stack([np.maximum(np.arange(n_chain) - 1, 0),
+                           np.minimum(np.arange(n_chain) + 1, n_chain - 1)], axis=1)
+    chain_rewards = np.where(chain_next == n_chain - 1, 1.0, -0.1)
+    chain_terminals = chain_next == n_chain - 1
+    q_star, _ = value_iteration(chain_next, chain_rewards, chain_terminals, gamma)
+    
+    # Un épisode d'un pas par cellule (s, a), en double, au format liste
+    trajectories = []
+    for state in range(n_chain):
+        for action in range(2):
+            step = TrajectoryStep(state, action, float(chain_rewards[state, action]),
+                                  int(chain_next[state, action]), bool(chain_terminals[state, action]), 0)
+            trajectories.append(Trajectory([step, step], 2 * step.reward, 2, len(trajectories)))
+    dataset = TransitionDataset.from_trajectories(trajectories, time_limit=None)
+    assert len(dataset) == 4 * n_chain and dataset.n_episodes == 2 * n_chain
+    
+    q_table, iterations = fitted_q_iteration(dataset, n_chain, 2, gamma, tol=1e-10)
+    assert np.allclose(q_table, q_star, atol=1e-8)
+    print(f"[OK] Q = Q* de l'itération sur les valeurs ({iterations} itérations)")
+    
+    # Fin au pas time_limit : seul le dernier pas devient une troncature
+    truncated = TransitionDataset.from_trajectories(trajectories, time_limit=2)
+    assert dataset.terminals.sum() == 4
+    assert np.array_equal(truncated.terminals, dataset.terminals & (np.arange(len(dataset)) % 2 == 0))
+    print("[OK] Fin au pas time_limit traitée comme une troncature")
+    
+    # Support du jeu : l'action jamais observée reçoit la plus petite valeur de l'état
+    partial = TransitionDataset(dataset.states[dataset.actions == 1], np.ones(2 * n_chain),
+                                dataset.rewards[dataset.actions == 1],
+                                dataset.next_states[dataset.actions == 1],
+                                dataset.terminals[dataset.actions == 1],
+                                dataset.episode_ids[dataset.actions == 1])
+    q_partial, _ = fitted_q_iteration(partial, n_chain, 2, gamma, tol=1e-10)
+    assert np.allclose(q_partial[:, 1], q_star[:, 1], atol=1e-8)
+    assert np.array_equal(q_partial[:, 0], q_partial[:, 1])
+    print("[OK] Actions hors support bornées par la plus petite valeur observée")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_fitted_q_iteration()
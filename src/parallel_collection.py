@@ -0,0 +1,158 @@
+"""
+Collecte parallèle de trajectoires greedy sur un pool de processus
+Chaque worker possède son propre environnement et une copie figée de la Q-table
+"""
+
+import os
+import numpy as np
+import gymnasium as gym
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Type
+
+from src.trajectory_manager import ColumnarTrajectory
+
+# État propre à chaque processus worker (initialisé une seule fois par worker)
+_worker_env: Optional[gym.Env] = None
+_worker_q_table: Optional[np.ndarray] = None
+_worker_discretizer = None
+
+
+def _init_worker(env_id: str, q_table: np.ndarray, discretizer):
+    """Crée l'environnement du worker et mémorise la politique figée"""
+    global _worker_env, _worker_q_table, _worker_discretizer
+    _worker_env = gym.make(env_id)
+    _worker_q_table = q_table
+    _worker_discretizer = discretizer
+
+
+def rollout_greedy(env: gym.Env, q_table: np.ndarray, seed: int, episode_id: int,
+                   discretizer=None, max_steps: int = 200,
+                   trajectory_class: Type[ColumnarTrajectory] = ColumnarTrajectory) -> ColumnarTrajectory:
+    """
+    Joue un épisode greedy avec une Q-table figée
+    
+    Args:
+        env: Environnement Gymnasium
+        q_table: Q-table (lecture seule)
+        seed: Graine passée à env.reset
+        episode_id: Identifiant de la trajectoire
+        discretizer: Discrétiseur pour les observations continues (None si discrètes)
+        max_steps: Nombre maximum de pas
+        trajectory_class: Classe de trajectoire en colonnes à construire
+    
+    Returns:
+        Trajectoire en colonnes
+    """
+    state, _ = env.reset(seed=seed)
+    continuous = discretizer is not None
+    
+    actions = np.zeros(max_steps, dtype=np.int8)
+    rewards = np.zeros(max_steps, dtype=np.float64)
+    dones = np.zeros(max_steps, dtype=bool)
+    discrete_states = np.zeros(max_steps + 1, dtype=np.int32)
+    if continuous:
+        observations = np.zeros((max_steps + 1, np.size(state)), dtype=np.float32)
+        observations[0] = state
+        discrete_states[0] = discretizer.discretize(state)
+    else:
+        discrete_states[0] = state
+    
+    n_steps = 0
+    while n_steps < max_steps:
+        action = int(np.argmax(q_table[discrete_states[n_steps]]))
+        next_state, reward, terminated, truncated, _ = env.step(action)
+        
+        actions[n_steps] = action
+        rewards[n_steps] = reward
+        dones[n_steps] = terminated or truncated
+        if continuous:
+            observations[n_steps + 1] = next_state
+            discrete_states[n_steps + 1] = discretizer.discretize(next_state)
+        else:
+            discrete_states[n_steps + 1] = next_state
+        
+        n_steps += 1
+        if terminated or truncated:
+            break
+    
+    columns = dict(
+        states=discrete_states[:n_steps],
+        actions=actions[:n_steps].copy(),
+        rewards=rewards[:n_steps].copy(),
+        next_states=discrete_states[1:n_steps + 1],
+        dones=dones[:n_steps].copy(),
+        episode_id=episode_id
+    )
+    if continuous:
+        observations = observations[:n_steps + 1]
+        columns['continuous_states'] = observations[:-1]
+        columns['continuous_next_states'] = observations[1:]
+    
+    return trajectory_class(**columns)
+
+
+def _collect_chunk(seeds: List[int], episode_ids: List[int], max_steps: int,
+                   trajectory_class: Type[ColumnarTrajectory]) -> List[ColumnarTrajectory]:
+    """Tâche exécutée dans un worker : joue un bloc d'épisodes"""
+    return [rollout_greedy(_worker_env, _worker_q_table, seed, episode_id,
+                           _worker_discretizer, max_steps, trajectory_class)
+            for seed, episode_id in zip(seeds, episode_ids)]
+
+
+def collect_trajectories_parallel(env_id: str, q_table: np.ndarray, n_trajectories: int,
+                                  seed: int = 0, discretizer=None,
+                                  n_workers: Optional[int] = None,
+                                  max_steps: int = 200,
+                                  first_episode_id: int = 0,
+                                  trajectory_class: Type[ColumnarTrajectory] = ColumnarTrajectory,
+                                  chunks_per_worker: int = 4) -> List[ColumnarTrajectory]:
+    """
+    Collecte n_trajectories épisodes greedy répartis sur un pool de processus
+    
+    La trajectoire i utilise la graine seed + i et l'identifiant first_episode_id + i :
+    le résultat est identique quel que soit le nombre de workers.
+    
+    Args:
+        env_id: Identifiant Gymnasium de l'environnement (ex: 'Taxi-v3')
+        q_table: Q-table figée utilisée par tous les workers
+        n_trajectories: Nombre de trajectoires à collecter
+        seed: Première graine de la plage
+        discretizer: Discrétiseur pour les environnements continus (ex: MountainCar)
+        n_workers: Nombre de processus (os.cpu_count() si None, 1 = sans pool)
+        max_steps: Nombre maximum de pas par épisode
+        first_episode_id: Identifiant de la première trajectoire
+        trajectory_class: Classe de trajectoire en colonnes à construire
+        chunks_per_worker: Nombre de blocs par worker (équilibrage de charge)
+    
+    Returns:
+        Liste des trajectoires, ordonnées par identifiant
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, n_trajectories))
+    
+    seeds = [seed + i for i in range(n_trajectories)]
+    episode_ids = [first_episode_id + i for i in range(n_trajectories)]
+    q_table = np.asarray(q_table)
+    
+    if n_workers == 1:
+        env = gym.make(env_id)
+        try:
+            return [rollout_greedy(env, q_table, s, episode_id, discretizer, max_steps, trajectory_class)
+                    for s, episode_id in zip(seeds, episode_ids)]
+        finally:
+            env.close()
+    
+    n_chunks = min(n_trajectories, n_workers * chunks_per_worker)
+    bounds = np.linspace(0, n_trajectories, n_chunks + 1).astype(int)
+    
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(env_id, q_table, discretizer)) as executor:
+        futures = [executor.submit(_collect_chunk, seeds[start:end], episode_ids[start:end],
+                                   max_steps, trajectory_class)
+                   for start, end in zip(bounds[:-1], bounds[1:])]
+        trajectories = []
+        for future in futures:
+            trajectories.extend(future.result())
+    
+    return trajectories
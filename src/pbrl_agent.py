@@ -1,16 +1,26 @@
 import numpy as np
-from typing import List, Dict, Tuple, Any
+import gymnasium as gym
+from typing import List, Dict, Tuple, Any, Optional
 from src.q_learning_agent import QLearningAgent
-from src.trajectory_manager import Trajectory, TrajectoryStep
+from src.vectorized_taxi import VectorizedTaxiEnv
+from src.trajectory_manager import Trajectory, TrajectoryStep, as_columnar
+from src.preference_updates import PreparedTrajectory
+from src.preference_learning import PreferenceLearningMixin
 from src.preference_interface import PreferenceInterface
 import copy
 
-class PreferenceBasedQLearning(QLearningAgent):
+class PreferenceBasedQLearning(PreferenceLearningMixin, QLearningAgent):
     """
     Agent Q-Learning modifié pour apprendre à partir des préférences humaines
     Implémente une version simplifiée du Preference-based Reinforcement Learning
+    (logique de préférences commune dans PreferenceLearningMixin)
     """
     
+    # Pénalité moins forte que le bonus, taux d'apprentissage réduit (plus conservateur)
+    preference_bonus_scale = 1.0
+    preference_penalty_scale = 0.5
+    preference_lr_scale = 0.5
+    
     def __init__(self, n_states: int, n_actions: int, 
                  learning_rate: float = 0.1, 
                  discount_factor: float = 0.95,
@@ -27,82 +37,48 @@ class PreferenceBasedQLearning(QLearningAgent):
         super().__init__(n_states, n_actions, learning_rate, discount_factor,
                         epsilon, epsilon_decay, epsilon_min)
         
-        self.preference_weight = preference_weight
+        self._init_preference_learning(preference_weight)
         self.preference_rewards = {}  # Cache des récompenses calculées à partir des préférences
         self.trajectory_values = {}   # Valeurs apprises pour les trajectoires complètes
-        
-        # Statistiques pour le suivi
-        self.preference_updates = 0
-        self.preference_learning_history = []
     
-    def update_from_preferences(self, preferred_trajectory: Trajectory, 
-                              less_preferred_trajectory: Trajectory,
-                              preference_strength: float = 1.0):
+    def _prepare_trajectory(self, trajectory: Trajectory) -> PreparedTrajectory:
         """
-        Met à jour la Q-table en fonction d'une préférence entre deux trajectoires
+        Convertit une trajectoire en tableaux
         
-        Args:
-            preferred_trajectory: Trajectoire préférée
-            less_preferred_trajectory: Trajectoire moins préférée  
-            preference_strength: Force de la préférence (0.5 = légère, 1.0 = forte, 2.0 = très forte)
+        Les dernières actions sont moins importantes : poids décroissant
+        linéairement de 1.0 à 0.7 sur la trajectoire.
         """
-        
-        # Calcul du bonus/malus basé sur la préférence
-        reward_bonus = preference_strength * self.preference_weight
-        reward_penalty = -preference_strength * self.preference_weight * 0.5  # Pénalité moins forte
-        
-        # Mise à jour pour la trajectoire préférée (bonus)
-        self._update_trajectory_values(preferred_trajectory, reward_bonus, is_preferred=True)
-        
-        # Mise à jour pour la trajectoire moins préférée (pénalité)
-        self._update_trajectory_values(less_preferred_trajectory, reward_penalty, is_preferred=False)
-        
-        self.preference_updates += 1
-        
-        # Enregistrement pour analyse
-        self.preference_learning_history.append({
-            'preferred_reward': preferred_trajectory.total_reward,
-            'less_preferred_reward': less_preferred_trajectory.total_reward,
-            'preference_strength': preference_strength,
-            'reward_bonus': reward_bonus,
-            'reward_penalty': reward_penalty
-        })
+        columns = as_columnar(trajectory)
+        n_steps = columns.episode_length
+        return PreparedTrajectory(
+            states=columns.states.astype(np.int64),
+            actions=columns.actions.astype(np.int64),
+            next_states=columns.next_states.astype(np.int64),
+            dones=columns.dones,
+            rewards=columns.rewards,
+            position_weights=1.0 - (np.arange(n_steps) / max(n_steps, 1)) * 0.3
+        )
     
-    def _update_trajectory_values(self, trajectory: Trajectory, reward_modifier: float, 
-                                is_preferred: bool):
-        """
-        Met à jour les valeurs Q pour toutes les transitions d'une trajectoire
-        
-        Args:
-            trajectory: Trajectoire à mettre à jour
-            reward_modifier: Modification de récompense à appliquer
-            is_preferred: True si c'est la trajectoire préférée
-        """
-        
-        # Mise à jour de chaque transition dans la trajectoire
-        for i, step in enumerate(trajectory.steps):
-            # Récompense modifiée basée sur la préférence
-            modified_reward = step.reward + reward_modifier
-            
-            # Facteur de diminution pour les actions en fin de trajectoire
-            # (les dernières actions sont moins importantes)
-            position_weight = 1.0 - (i / len(trajectory.steps)) * 0.3
-            final_reward = modified_reward * position_weight
-            
-            # Mise à jour Q-Learning standard avec la récompense modifiée
-            if step.done:
-                target = final_reward
-            else:
-                target = final_reward + self.gamma * np.max(self.q_table[step.next_state])
-            
-            # Mise à jour avec un taux d'apprentissage réduit pour les préférences
-            preference_lr = self.lr * 0.5  # Apprentissage plus conservateur
-            self.q_table[step.state, step.action] += preference_lr * \
-                (target - self.q_table[step.state, step.action])
+    def _heuristic_strength(self, pref: Dict[str, Any], preferred: Trajectory,
+                            less_preferred: Trajectory) -> float:
+        """Force adaptative basée sur les différences de récompense et d'efficacité"""
+        reward_diff = abs(preferred.total_reward - less_preferred.total_reward)
+        efficiency_diff = abs(pref['trajectory_a_efficiency'] - pref['trajectory_b_efficiency'])
+        return 1.0 + min(reward_diff / 10.0, 1.0) + min(efficiency_diff, 0.5)
+    
+    def update_q_table(self, state: int, action: int, reward: float,
+                      next_state: int, done: bool):
+        """Mise à jour Q-Learning avec la récompense complétée par r̂(s, a)"""
+        if self.reward_table is not None:
+            reward = reward + self.preference_weight * self.reward_table[state, action]
+        super().update_q_table(state, action, reward, next_state, done)
     
     def train_with_preferences(self, env, trajectories: List[Trajectory], 
                              preferences: List[Dict[str, Any]], 
-                             episodes: int = 5000) -> List[float]:
+                             episodes: int = 5000,
+                             preference_mode: str = 'sequential',
+                             incremental: bool = False,
+                             max_derived: Optional[int] = None) -> List[float]:
         """
         Entraîne l'agent en combinant exploration normale et apprentissage par préférences
         
@@ -111,6 +87,13 @@ class PreferenceBasedQLearning(QLearningAgent):
             trajectories: Liste des trajectoires pour les préférences
             preferences: Liste des préférences collectées
             episodes: Nombre d'épisodes d'entraînement
+            preference_mode: Mode d'application des préférences ('sequential', 'jacobi'
+                             ou 'reward_model' pour apprendre r̂ au lieu de modifier la Q-table)
+            incremental: Si True, n'applique que les préférences postérieures au
+                         filigrane (voir apply_new_preferences)
+            max_derived: None pour appliquer la liste brute ; sinon les préférences
+                         sont consolidées en graphe (doublons fusionnés) et au plus
+                         max_derived préférences impliquées par transitivité sont ajoutées
             
         Returns:
             Liste des récompenses par épisode
@@ -121,92 +104,60 @@ class PreferenceBasedQLearning(QLearningAgent):
         
         # Phase 1: Apprentissage initial par préférences
         print("Phase 1: Application des préférences existantes...")
-        self._apply_existing_preferences(trajectories, preferences)
+        self._apply_preference_phase(trajectories, preferences, preference_mode, incremental, max_derived)
         
         # Phase 2: Entraînement normal avec Q-table modifiée
         print("Phase 2: Entraînement avec exploration...")
-        for episode in range(episodes):
-            state, _ = env.reset()
-            total_reward = 0
-            steps = 0
-            max_steps = 200
-            
-            while steps < max_steps:
-                # Sélection et exécution de l'action
-                action = self.select_action(state, training=True)
-                next_state, reward, terminated, truncated, _ = env.step(action)
-                done = terminated or truncated
+        if isinstance(env, VectorizedTaxiEnv):
+            episode_rewards, _, _ = self._run_batched_episodes(
+                env, episodes, 200, training=True, report_every=1000
+            )
+        elif isinstance(env, gym.vector.VectorEnv):
+            episode_rewards, _, _ = self._run_vector_env_episodes(env, episodes, report_every=1000)
+        else:
+            for episode in range(episodes):
+                state, _ = env.reset()
+                total_reward = 0
+                steps = 0
+                max_steps = 200
                 
-                # Mise à jour normale de la Q-table
-                self.update_q_table(state, action, reward, next_state, done)
+                while steps < max_steps:
+                    # Sélection et exécution de l'action
+                    action = self.select_action(state, training=True)
+                    next_state, reward, terminated, truncated, _ = env.step(action)
+                    done = terminated or truncated
+                    
+                    # Mise à jour normale de la Q-table
+                    self.update_q_table(state, action, reward, next_state, done)
+                    if self.observes_transitions:
+                        self._observe_transitions([state], [action], [reward], [next_state], [terminated])
+                    
+                    state = next_state
+                    total_reward += reward
+                    steps += 1
+                    
+                    if done:
+                        break
                 
-                state = next_state
-                total_reward += reward
-                steps += 1
+                # Mise à jour d'epsilon
+                self.decay_epsilon()
                 
-                if done:
-                    break
-            
-            # Mise à jour d'epsilon
-            self.decay_epsilon()
-            
-            episode_rewards.append(total_reward)
-            
-            # Affichage du progrès
-            if (episode + 1) % 1000 == 0:
-                avg_reward = np.mean(episode_rewards[-100:])
-                print(f"Épisode {episode + 1}/{episodes}, "
-                      f"Récompense moyenne (100 derniers): {avg_reward:.2f}, "
-                      f"Epsilon: {self.epsilon:.3f}")
+                episode_rewards.append(total_reward)
+                
+                # Affichage du progrès
+                if (episode + 1) % 1000 == 0:
+                    avg_reward = np.mean(episode_rewards[-100:])
+                    print(f"Épisode {episode + 1}/{episodes}, "
+                          f"Récompense moyenne (100 derniers): {avg_reward:.2f}, "
+                          f"Epsilon: {self.epsilon:.3f}")
         
         self.training_rewards = episode_rewards
         return episode_rewards
     
-    def _apply_existing_preferences(self, trajectories: List[Trajectory], 
-                                  preferences: List[Dict[str, Any]]):
-        """
-        Applique les préférences existantes pour initialiser la Q-table
-        """
-        
-        # Créer un mapping des trajectoires par ID
-        traj_dict = {traj.episode_id: traj for traj in trajectories}
-        
-        for pref in preferences:
-            if pref['choice'] == 0:  # Égalité, on ignore
-                continue
-            
-            traj_a_id = pref['trajectory_a_id']
-            traj_b_id = pref['trajectory_b_id']
-            
-            if traj_a_id not in traj_dict or traj_b_id not in traj_dict:
-                continue
-            
-            traj_a = traj_dict[traj_a_id]
-            traj_b = traj_dict[traj_b_id]
-            
-            # Déterminer quelle trajectoire est préférée
-            if pref['choice'] == 1:  # Trajectoire A préférée
-                preferred = traj_a
-                less_preferred = traj_b
-            else:  # Trajectoire B préférée
-                preferred = traj_b
-                less_preferred = traj_a
-            
-            # Calculer la force de préférence basée sur la différence de performance
-            reward_diff = abs(preferred.total_reward - less_preferred.total_reward)
-            efficiency_diff = abs(pref['trajectory_a_efficiency'] - pref['trajectory_b_efficiency'])
-            
-            # Force adaptative basée sur les différences
-            strength = 1.0 + min(reward_diff / 10.0, 1.0) + min(efficiency_diff, 0.5)
-            
-            # Appliquer la préférence
-            self.update_from_preferences(preferred, less_preferred, strength)
-        
-        print(f"[OK] {len([p for p in preferences if p['choice'] != 0])} préférences appliquées")
-    
     def interactive_training_loop(self, env, preference_interface: PreferenceInterface,
                                 trajectory_manager, episodes_per_iteration: int = 1000,
-                                max_iterations: int = 5, trajectories_per_comparison: int = 5):
+                                max_iterations: int = 5, trajectories_per_comparison: int = 5,
+                                pair_selection: str = 'heuristic'):
         """
         Boucle d'entraînement interactive avec collecte de préférences en temps réel
         
@@ -217,6 +168,9 @@ class PreferenceBasedQLearning(QLearningAgent):
             episodes_per_iteration: Épisodes entre chaque collecte de préférences
             max_iterations: Nombre maximum d'itérations
             trajectories_per_comparison: Nombre de trajectoires à générer pour comparaison
+            pair_selection: 'heuristic' (meilleure/pire et efficacités voisines) ou une
+                            méthode de select_query_pairs ('information_gain',
+                            'disagreement', 'rating') pour la sélection active
         """
         
         print(f"[START] ENTRAÎNEMENT INTERACTIF PbRL")
@@ -242,7 +196,7 @@ class PreferenceBasedQLearning(QLearningAgent):
             
             # 3. Sélection de paires intéressantes
             print("3 Sélection de paires pour comparaison...")
-            pairs = self._select_interesting_pairs(test_trajectories)
+            pairs = self._select_interesting_pairs(test_trajectories, method=pair_selection)
             
             if not pairs:
                 print("[WARN] Aucune paire intéressante trouvée, passage à l'itération suivante")
@@ -276,11 +230,23 @@ class PreferenceBasedQLearning(QLearningAgent):
         
         return all_rewards, iteration_summaries
     
-    def _select_interesting_pairs(self, trajectories: List[Trajectory]) -> List[Tuple[Trajectory, Trajectory]]:
-        """Sélectionne des paires intéressantes pour la comparaison"""
+    def _select_interesting_pairs(self, trajectories: List[Trajectory], n_pairs: int = 2,
+                                  method: str = 'heuristic') -> List[Tuple[Trajectory, Trajectory]]:
+        """
+        Sélectionne des paires intéressantes pour la comparaison
+        
+        Args:
+            trajectories: Trajectoires candidates
+            n_pairs: Nombre de paires en sélection active
+            method: 'heuristic' (contrastes par tri de performance) ou une méthode
+                    de select_query_pairs
+        """
         if len(trajectories) < 2:
             return []
         
+        if method != 'heuristic':
+            return self.select_query_pairs(trajectories, n_pairs, method=method)
+        
         # Tri par performance pour créer des contrastes
         sorted_trajs = sorted(trajectories, key=lambda t: t.total_reward, reverse=True)
         
@@ -310,13 +276,32 @@ class PreferenceBasedQLearning(QLearningAgent):
                              preferences: List[int]):
         """Applique les nouvelles préférences collectées"""
         
+        if self.reward_table is not None:
+            # Mode modèle de récompense: réajustement à partir des paramètres courants
+            first_id = self.reward_model.n_pairs
+            records = [{'preference_id': f"interactive_{first_id + i}",
+                        'trajectory_a_id': traj1.episode_id,
+                        'trajectory_b_id': traj2.episode_id,
+                        'choice': preference}
+                       for i, ((traj1, traj2), preference) in enumerate(zip(pairs, preferences))]
+            self.fit_reward_model([traj for pair in pairs for traj in pair], records)
+            return
+        
+        batch = []
         for (traj1, traj2), preference in zip(pairs, preferences):
+            if self.ratings is not None:
+                # Mise à jour en ligne du classement (O(1) par préférence)
+                self.ratings.update_preference({'trajectory_a_id': traj1.episode_id,
+                                                'trajectory_b_id': traj2.episode_id,
+                                                'choice': preference})
             if preference == 0:  # Égalité
                 continue
             elif preference == 1:  # Préfère traj1
-                self.update_from_preferences(traj1, traj2, preference_strength=1.0)
+                batch.append((traj1, traj2, self._rated_strength(traj1, traj2)))
             elif preference == 2:  # Préfère traj2
-                self.update_from_preferences(traj2, traj1, preference_strength=1.0)
+                batch.append((traj2, traj1, self._rated_strength(traj2, traj1)))
+        
+        self.apply_preferences(batch)
     
     def get_preference_learning_summary(self) -> Dict[str, Any]:
         """Retourne un résumé de l'apprentissage par préférences"""
@@ -343,6 +328,8 @@ class PreferenceBasedQLearning(QLearningAgent):
             'preference_updates': self.preference_updates,
             'preference_learning_history': self.preference_learning_history,
             'preference_weight': self.preference_weight,
+            'preference_watermark': self.preference_watermark.to_dict(),
+            'applied_strengths': self.applied_strengths,
             'hyperparameters': {
                 'lr': self.lr,
                 'gamma': self.gamma,
@@ -0,0 +1,387 @@
+"""
+Graphe de préférences sur tableaux d'adjacence creux (CSR)
+Fusionne les jugements répétés sur une même paire, détecte les cycles
+(étiquettes incohérentes) et dérive les préférences impliquées par transitivité
+(A > B et B > C donnent A > C), avec un plafond sur le nombre de dérivations
+"""
+
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class PreferenceGraph:
+    """
+    Graphe orienté gagnant -> perdant construit à partir d'une liste de préférences
+    
+    Chaque paire non ordonnée de trajectoires donne au plus une arête : les votes
+    des préférences répétées sont additionnés (A > B compte +1, B > A compte -1)
+    et la direction majoritaire est conservée avec un poids égal au solde des votes.
+    Les égalités et les paires sans majorité ne produisent pas d'arête.
+    
+    Toutes les opérations sont en O((N + E) log E) sauf la fermeture transitive,
+    bornée par le plafond de dérivations.
+    """
+    
+    def __init__(self, preferences: List[Dict[str, Any]]):
+        """
+        Args:
+            preferences: Préférences (trajectory_a_id, trajectory_b_id, choice)
+        """
+        self.preferences = preferences
+        self.n_preferences = len(preferences)
+        
+        ids_a = np.array([pref['trajectory_a_id'] for pref in preferences])
+        ids_b = np.array([pref['trajectory_b_id'] for pref in preferences])
+        choices = np.array([pref['choice'] for pref in preferences], dtype=np.int64)
+        
+        # Identifiants de trajectoires -> index denses
+        self.node_ids, inverse = np.unique(np.concatenate([ids_a, ids_b]), return_inverse=True)
+        self.n_nodes = len(self.node_ids)
+        node_a = inverse[:self.n_preferences].astype(np.int64)
+        node_b = inverse[self.n_preferences:].astype(np.int64)
+        
+        # Paire canonique (petit index, grand index) et vote +1 si le petit index gagne
+        low = np.minimum(node_a, node_b)
+        high = np.maximum(node_a, node_b)
+        low_is_a = node_a == low
+        votes = np.where(choices == 1, 1, np.where(choices == 2, -1, 0))
+        votes = np.where(low_is_a, votes, -votes)
+        
+        pair_keys, first_index, pair_inverse = np.unique(low * max(self.n_nodes, 1) + high,
+                                                         return_index=True, return_inverse=True)
+        net_votes = np.bincount(pair_inverse, weights=votes, minlength=len(pair_keys))
+        votes_low = np.bincount(pair_inverse, weights=votes > 0, minlength=len(pair_keys))
+        votes_high = np.bincount(pair_inverse, weights=votes < 0, minlength=len(pair_keys))
+        self.n_pairs = len(pair_keys)
+        self.n_duplicates = self.n_preferences - self.n_pairs
+        self.n_ties = int(np.count_nonzero((votes_low == 0) & (votes_high == 0)))
+        self.n_conflicting_pairs = int(np.count_nonzero((votes_low > 0) & (votes_high > 0)))
+        
+        decided = net_votes != 0
+        pair_low = pair_keys[decided] // max(self.n_nodes, 1)
+        pair_high = pair_keys[decided] % max(self.n_nodes, 1)
+        low_wins = net_votes[decided] > 0
+        self.winners = np.where(low_wins, pair_low, pair_high)
+        self.losers = np.where(low_wins, pair_high, pair_low)
+        self.weights = np.abs(net_votes[decided])
+        # Première préférence de chaque paire (conserve ses métadonnées)
+        self.representatives = first_index[decided]
+        
+        # Adjacence CSR : successeurs (perdants) de chaque gagnant
+        order = np.argsort(self.winners, kind='stable')
+        self.indices = self.losers[order]
+        self.edge_order = order
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(self.winners, minlength=self.n_nodes))])
+        
+        self._components = None
+    
+    @property
+    def n_edges(self) -> int:
+        return len(self.winners)
+    
+    def strongly_connected_components(self) -> np.ndarray:
+        """
+        Composantes fortement connexes (Tarjan itératif, O(N + E))
+        
+        Returns:
+            Numéro de composante de chaque nœud
+        """
+        if self._components is not None:
+            return self._components
+        
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        index = [-1] * self.n_nodes
+        lowlink = [0] * self.n_nodes
+        on_stack = [False] * self.n_nodes
+        components = [-1] * self.n_nodes
+        stack = []
+        counter = 0
+        n_components = 0
+        
+        for root in range(self.n_nodes):
+            if index[root] != -1:
+                continue
+            # Pile d'appels explicite : (nœud, prochaine arête à explorer)
+            work = [(root, indptr[root])]
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            
+            while work:
+                node, edge = work[-1]
+                if edge < indptr[node + 1]:
+                    work[-1] = (node, edge + 1)
+                    successor = indices[edge]
+                    if index[successor] == -1:
+                        index[successor] = lowlink[successor] = counter
+                        counter += 1
+                        stack.append(successor)
+                        on_stack[successor] = True
+                        work.append((successor, indptr[successor]))
+                    elif on_stack[successor]:
+                        lowlink[node] = min(lowlink[node], index[successor])
+                    continue
+                
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        components[member] = n_components
+                        if member == node:
+                            break
+                    n_components += 1
+        
+        self._components = np.array(components, dtype=np.int64)
+        return self._components
+    
+    def cycles(self) -> List[List[Any]]:
+        """
+        Groupes de trajectoires liées par des préférences cycliques (A > B > ... > A)
+        
+        Returns:
+            Liste des composantes de plus d'une trajectoire (identifiants)
+        """
+        components = self.strongly_connected_components()
+        sizes = np.bincount(components, minlength=1)
+        return [self.node_ids[components == c].tolist() for c in np.flatnonzero(sizes > 1)]
+    
+    def consistent_edges(self) -> np.ndarray:
+        """Masque des arêtes hors cycle (extrémités dans deux composantes différentes)"""
+        components = self.strongly_connected_components()
+        return components[self.winners] != components[self.losers]
+    
+    def transitive_closure(self, max_derived: int,
+                           max_depth: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Préférences impliquées par transitivité, chemins courts d'abord
+        
+        Le parcours en largeur progresse niveau par niveau pour toutes les sources
+        à la fois : toutes les dérivations de longueur 2 sont produites avant
+        celles de longueur 3, etc. Les arêtes appartenant à un cycle sont ignorées.
+        
+        Args:
+            max_derived: Nombre maximal de préférences dérivées
+            max_depth: Longueur maximale des chemins (illimitée si None)
+        
+        Returns:
+            (gagnants, perdants, longueur du chemin) en index de nœuds
+        """
+        derived_winners, derived_losers, depths = [], [], []
+        if max_derived <= 0 or self.n_edges == 0:
+            return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        
+        # Adjacence réduite aux arêtes cohérentes
+        consistent = self.consistent_edges()[self.edge_order]
+        counts = np.bincount(self.winners[self.edge_order][consistent], minlength=self.n_nodes)
+        indptr = np.concatenate([[0], np.cumsum(counts)]).tolist()
+        indices = self.indices[consistent].tolist()
+        
+        # Frontière et ensemble visité par source (successeurs directs au niveau 1)
+        frontiers = {}
+        visited = {}
+        for source in range(self.n_nodes):
+            successors = indices[indptr[source]:indptr[source + 1]]
+            if successors:
+                frontiers[source] = successors
+                visited[source] = set(successors)
+        
+        depth = 1
+        while frontiers and len(depths) < max_derived and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontiers = {}
+            for source, frontier in frontiers.items():
+                seen = visited[source]
+                next_frontier = []
+                for node in frontier:
+                    for successor in indices[indptr[node]:indptr[node + 1]]:
+                        if successor in seen:
+                            continue
+                        seen.add(successor)
+                        next_frontier.append(successor)
+                        derived_winners.append(source)
+                        derived_losers.append(successor)
+                        depths.append(depth)
+                        if len(depths) >= max_derived:
+                            break
+                    if len(depths) >= max_derived:
+                        break
+                if next_frontier:
+                    next_frontiers[source] = next_frontier
+                if len(depths) >= max_derived:
+                    break
+            frontiers = next_frontiers
+        
+        return (np.array(derived_winners, dtype=np.int64), np.array(derived_losers, dtype=np.int64),
+                np.array(depths, dtype=np.int64))
+    
+    def to_preferences(self, max_derived: int = 0, max_depth: Optional[int] = None,
+                       decay: float = 0.5) -> List[Dict[str, Any]]:
+        """
+        Liste de préférences consolidée : une par paire, plus les préférences dérivées
+        
+        Chaque préférence porte un champ 'weight' qui multiplie sa force
+        d'application : solde des votes pour une paire fusionnée,
+        decay ** (longueur - 1) pour une préférence dérivée.
+        
+        Args:
+            max_derived: Nombre maximal de préférences dérivées (0 : fusion seule)
+            max_depth: Longueur maximale des chemins de dérivation
+            decay: Atténuation par pas de chemin supplémentaire
+        
+        Returns:
+            Liste de préférences (format de PreferenceInterface)
+        """
+        trajectory_fields = self._trajectory_fields()
+        consolidated = []
+        
+        for winner, loser, weight, representative in zip(self.winners.tolist(), self.losers.tolist(),
+                                                         self.weights.tolist(), self.representatives.tolist()):
+            pref = dict(self.preferences[representative])
+            winner_id = self.node_ids[winner].item()
+            pref['choice'] = 1 if pref['trajectory_a_id'] == winner_id else 2
+            pref['weight'] = weight
+            consolidated.append(pref)
+        
+        winners, losers, depths = self.transitive_closure(max_derived, max_depth)
+        for winner, loser, depth in zip(winners.tolist(), losers.tolist(), depths.tolist()):
+            winner_id = self.node_ids[winner].item()
+            loser_id = self.node_ids[loser].item()
+            pref = {
+                'preference_id': f"derived:{winner_id}>{loser_id}",
+                'trajectory_a_id': winner_id,
+                'trajectory_b_id': loser_id,
+                'choice': 1,
+                'weight': decay ** (depth - 1),
+                'derived': True,
+                'path_length': depth
+            }
+            for side, trajectory_id in (('a', winner_id), ('b', loser_id)):
+                for field, value in trajectory_fields.get(trajectory_id, {}).items():
+                    pref[f"trajectory_{side}_{field}"] = value
+            consolidated.append(pref)
+        
+        return consolidated
+    
+    def _trajectory_fields(self) -> Dict[Any, Dict[str, Any]]:
+        """Caractéristiques par trajectoire (trajectory_a_reward, ...) relevées dans les préférences"""
+        fields = {}
+        for pref in self.preferences:
+            for side in ('a', 'b'):
+                prefix = f"trajectory_{side}_"
+                values = fields.setdefault(pref[f"{prefix}id"], {})
+                for key, value in pref.items():
+                    if key.startswith(prefix) and key != f"{prefix}id":
+                        values[key[len(prefix):]] = value
+        return fields
+    
+    def summary(self) -> Dict[str, Any]:
+        """Statistiques du graphe"""
+        cycles = self.cycles()
+        return {
+            'preferences': self.n_preferences,
+            'trajectories': self.n_nodes,
+            'pairs': self.n_pairs,
+            'duplicates': self.n_duplicates,
+            'ties': self.n_ties,
+            'conflicting_pairs': self.n_conflicting_pairs,
+            'edges': self.n_edges,
+            'cycles': len(cycles),
+            'trajectories_in_cycles': int(sum(len(cycle) for cycle in cycles))
+        }
+
+
+def consolidate_preferences(preferences: List[Dict[str, Any]], max_derived: int = 0,
+                            max_depth: Optional[int] = None, decay: float = 0.5,
+                            verbose: bool = True) -> List[Dict[str, Any]]:
+    """
+    Fusionne les préférences répétées et ajoute au plus max_derived préférences impliquées
+    
+    Args:
+        preferences: Préférences brutes
+        max_derived: Nombre maximal de préférences dérivées (0 : fusion seule)
+        max_depth: Longueur maximale des chemins de dérivation
+        decay: Atténuation du poids par pas de chemin supplémentaire
+        verbose: Affiche un résumé (doublons, cycles, dérivations)
+    
+    Returns:
+        Préférences consolidées (voir PreferenceGraph.to_preferences)
+    """
+    if not preferences:
+        return []
+    
+    graph = PreferenceGraph(preferences)
+    consolidated = graph.to_preferences(max_derived, max_depth, decay)
+    
+    if verbose:
+        summary = graph.summary()
+        n_derived = len(consolidated) - graph.n_edges
+        print(f"[INFO] Graphe de préférences: {summary['pairs']} paires "
+              f"({summary['duplicates']} doublons fusionnés, {summary['ties']} égalités), "
+              f"{n_derived} préférences dérivées")
+        if summary['cycles']:
+            print(f"[WARN] {summary['cycles']} cycles de préférences incohérentes "
+                  f"({summary['trajectories_in_cycles']} trajectoires, "
+                  f"{summary['conflicting_pairs']} paires contradictoires)")
+    
+    return consolidated
+
+
+def test_preference_graph():
+    """Vérifie fusion des doublons, détection de cycle et dérivation transitive"""
+    print("🧪 TEST DU GRAPHE DE PRÉFÉRENCES\n")
+    
+    def pref(a, b, choice):
+        return {'trajectory_a_id': a, 'trajectory_b_id': b, 'choice': choice}
+    
+    preferences = [
+        # Chaîne 1 > 2 > 3 > 4 > 10, orientations A/B mélangées
+        pref(1, 2, 1), pref(3, 2, 2), pref(3, 4, 1), pref(10, 4, 2),
+        # Doublons : 1 > 2 confirmé, puis contredit une fois (solde +1)
+        pref(2, 1, 2), pref(2, 1, 1),
+        # Égalité sans arête
+        pref(5, 6, 0),
+        # Cycle incohérent 10 > 11 > 12 > 10
+        pref(10, 11, 1), pref(11, 12, 1), pref(12, 10, 1),
+    ]
+    graph = PreferenceGraph(preferences)
+    
+    assert graph.n_pairs == 8 and graph.n_duplicates == 2
+    assert graph.n_ties == 1 and graph.n_conflicting_pairs == 1
+    assert graph.n_edges == 7
+    assert [sorted(cycle) for cycle in graph.cycles()] == [[10, 11, 12]]
+    print(f"[OK] {graph.summary()}")
+    
+    # Dérivations attendues : chemins de la chaîne, arêtes du cycle ignorées
+    expected = {(1, 3): 2, (2, 4): 2, (3, 10): 2, (1, 4): 3, (2, 10): 3, (1, 10): 4}
+    winners, losers, depths = graph.transitive_closure(max_derived=100)
+    derived = {(graph.node_ids[w].item(), graph.node_ids[l].item()): d
+               for w, l, d in zip(winners.tolist(), losers.tolist(), depths.tolist())}
+    assert derived == expected, derived
+    
+    # Plafond : les chemins les plus courts d'abord
+    _, _, capped_depths = graph.transitive_closure(max_derived=3)
+    assert capped_depths.tolist() == [2, 2, 2]
+    _, _, shallow = graph.transitive_closure(max_derived=100, max_depth=3)
+    assert shallow.max() == 3 and len(shallow) == 5
+    print(f"[OK] {len(derived)} préférences dérivées par transitivité, plus courtes d'abord")
+    
+    consolidated = graph.to_preferences(max_derived=100, decay=0.5)
+    weights = {(p['trajectory_a_id'], p['trajectory_b_id']): p['weight']
+               for p in consolidated if p.get('derived')}
+    assert weights == {pair: 0.5 ** (depth - 1) for pair, depth in expected.items()}
+    direct = [p for p in consolidated if not p.get('derived')]
+    assert len(direct) == graph.n_edges
+    assert all(p['weight'] == 1 for p in direct)
+    print("[OK] Préférences consolidées : une par paire, poids atténués pour les dérivées")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_preference_graph()
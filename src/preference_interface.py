@@ -1,18 +1,32 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 import json
 import os
+import uuid
 from datetime import datetime
 from src.trajectory_manager import Trajectory, TrajectoryManager
 from src.visual_trajectory_comparator import VisualTrajectoryComparator
+from src.preference_store import PreferenceStore
+from src.trajectory_ratings import TrajectoryRatings
 
 class PreferenceInterface:
     """
     Interface pour collecter les préférences entre trajectoires
     """
     
-    def __init__(self):
+    def __init__(self, store: Optional[PreferenceStore] = None, labeler: str = 'human'):
+        """
+        Args:
+            store: Base SQLite où chaque préférence est ajoutée dès sa collecte (optionnelle)
+            labeler: Auteur des étiquettes enregistré avec la session
+        """
         self.preferences: List[Dict[str, Any]] = []
         self.preference_counter = 0
+        self.store = store
+        self.labeler = labeler
+        self.session_id = None
+        
+        # Classement des trajectoires mis à jour à chaque préférence (persisté dans la base)
+        self.ratings = TrajectoryRatings.load(store) if store is not None else TrajectoryRatings()
     
     def collect_preference_interactive(self, traj1: Trajectory, traj2: Trajectory, 
                                      trajectory_manager: TrajectoryManager,
@@ -135,6 +149,9 @@ class PreferenceInterface:
                     break
         
         self._save_session_summary(preferences, total_pairs)
+        if self.store is not None and self.session_id is not None:
+            self.store.end_session(self.session_id)
+            self.session_id = None
         return preferences
     
     def _display_help(self):
@@ -191,6 +208,22 @@ class PreferenceInterface:
             'trajectory_b_efficiency': traj2.total_reward / traj2.episode_length if traj2.episode_length > 0 else 0
         }
         
+        if self.store is not None:
+            # Ajout incrémental : la base attribue l'identifiant définitif
+            if self.session_id is None:
+                self.session_id = self.store.start_session(self.labeler)
+            preference['preference_id'] = self.store.add_preference(preference, self.session_id)
+            preference['session_id'] = self.session_id
+        else:
+            # Sans base, le compteur local repart de 0 à chaque interface (ignoré par le
+            # filigrane, voir store_preference_id) : clé unique par enregistrement
+            preference['preference_uid'] = uuid.uuid4().hex
+        
+        self.ratings.update_preference(preference)
+        if self.store is not None:
+            self.ratings.save(self.store, preference_id=preference['preference_id'],
+                              trajectory_ids=[traj1.episode_id, traj2.episode_id])
+        
         self.preferences.append(preference)
         self.preference_counter += 1
         
@@ -262,7 +295,8 @@ class PreferenceInterface:
                 'equal': (choice_counts[0] / total_prefs * 100) if total_prefs > 0 else 0
             },
             'reward_preference_tendency': sum(reward_preferences) / len(reward_preferences) * 100 if reward_preferences else 0,
-            'efficiency_preference_tendency': sum(efficiency_preferences) / len(efficiency_preferences) * 100 if efficiency_preferences else 0
+            'efficiency_preference_tendency': sum(efficiency_preferences) / len(efficiency_preferences) * 100 if efficiency_preferences else 0,
+            'ratings': self.ratings.summary()
         }
         
         return stats
@@ -293,6 +327,10 @@ class PreferenceInterface:
         self.preferences = data['preferences']
         self.preference_counter = len(self.preferences)
         
+        # Pas de notes persistées avec le JSON : réajustement par lot sur tout l'historique
+        self.ratings = TrajectoryRatings()
+        self.ratings.refit(self.preferences)
+        
         print(f"Préférences chargées: {filepath}")
         
     def display_preferences_summary(self):
@@ -314,4 +352,10 @@ class PreferenceInterface:
         print(f"\n[TARGET] TENDANCES DÉTECTÉES:")
         print(f"Préférence pour récompenses élevées: {stats['reward_preference_tendency']:.1f}%")
         print(f"Préférence pour efficacité élevée: {stats['efficiency_preference_tendency']:.1f}%")
+        
+        ratings = stats['ratings']
+        if ratings['rated_trajectories'] > 0:
+            print(f"\n[LIST] CLASSEMENT DES TRAJECTOIRES ({ratings['rated_trajectories']} notées):")
+            for trajectory_id, rating, sigma in ratings['top_trajectories']:
+                print(f"Trajectoire {trajectory_id}: {rating:.0f} ± {sigma:.0f}")
         print("="*60)
\ No newline at end of file
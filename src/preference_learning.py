@@ -0,0 +1,422 @@
+"""
+Apprentissage par préférences commun aux agents PbRL (Taxi, MountainCar)
+Application des préférences à la Q-table, modèle de récompense de Bradley-Terry,
+sélection active des requêtes, mode incrémental (filigrane) et repondération ;
+chaque agent ne fournit que la préparation de ses trajectoires
+"""
+
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.trajectory_manager import Trajectory
+from src.preference_updates import (PreparedTrajectory, PreparedTrajectoryCache, PreferenceWatermark,
+                                     apply_preference_sweep, preference_key)
+from src.reward_model import BradleyTerryRewardModel
+from src.preference_graph import consolidate_preferences
+from src.trajectory_ratings import TrajectoryRatings
+from src.active_queries import select_model_queries
+
+
+class PreferenceLearningMixin(ABC):
+    """
+    Logique de préférences partagée, à placer avant l'agent Q-Learning dans les bases
+    
+    La classe concrète fournit (méthodes abstraites) :
+    - _prepare_trajectory(trajectoire) -> PreparedTrajectory (états discrets,
+      actions et poids de position propres à l'environnement) ;
+    - _heuristic_strength(préférence, préférée, moins préférée) : force d'une
+      préférence quand le classement des trajectoires ne les connaît pas.
+    
+    Les attributs de classe fixent l'amplitude des mises à jour : bonus de la
+    trajectoire préférée, malus de l'autre (multiples de force * preference_weight)
+    et taux d'apprentissage des préférences (multiple de lr).
+    """
+    
+    preference_bonus_scale = 1.0
+    preference_penalty_scale = 0.5
+    preference_lr_scale = 0.5
+    
+    def _init_preference_learning(self, preference_weight: float):
+        """Initialise l'état des préférences (à appeler depuis __init__ de l'agent)"""
+        self.preference_weight = preference_weight
+        self.preference_updates = 0
+        self.preference_learning_history = []
+        self.prepared_trajectories = PreparedTrajectoryCache()
+        
+        # Modèle de récompense appris (mode 'reward_model') et sa table r̂(s, a)
+        self.reward_model = None
+        self.reward_table = None
+        
+        # Mode incrémental: dernières préférences appliquées et force appliquée par préférence
+        self.preference_watermark = PreferenceWatermark()
+        self.applied_strengths: Dict[str, float] = {}
+        
+        # Classement des trajectoires (optionnel) : remplace la force heuristique
+        self.ratings: Optional[TrajectoryRatings] = None
+    
+    def update_from_preferences(self, preferred_trajectory: Trajectory,
+                                less_preferred_trajectory: Trajectory,
+                                preference_strength: float = 1.0):
+        """
+        Met à jour la Q-table en fonction d'une préférence entre deux trajectoires
+        
+        Args:
+            preferred_trajectory: Trajectoire préférée
+            less_preferred_trajectory: Trajectoire moins préférée
+            preference_strength: Force de la préférence (0.5 = légère, 1.0 = forte, 2.0 = très forte)
+        """
+        self.apply_preferences([(preferred_trajectory, less_preferred_trajectory, preference_strength)])
+    
+    def apply_preferences(self, preferences: List[Tuple[Trajectory, Trajectory, float]],
+                          mode: str = 'sequential'):
+        """
+        Applique un lot de préférences en un seul balayage (voir preference_updates)
+        
+        Args:
+            preferences: Liste de (trajectoire préférée, trajectoire moins préférée, force)
+            mode: 'sequential' (sémantique historique, préférence par préférence)
+                  ou 'jacobi' (toutes les cibles calculées sur la Q-table initiale)
+        """
+        updates = []
+        for preferred, less_preferred, strength in preferences:
+            # Calcul du bonus/malus basé sur la préférence
+            reward_bonus = strength * self.preference_weight * self.preference_bonus_scale
+            reward_penalty = -strength * self.preference_weight * self.preference_penalty_scale
+            
+            updates.append((self._prepared_trajectory(preferred), reward_bonus))
+            updates.append((self._prepared_trajectory(less_preferred), reward_penalty))
+            
+            self.preference_updates += 1
+            
+            # Enregistrement pour analyse
+            self.preference_learning_history.append({
+                'preferred_reward': preferred.total_reward,
+                'less_preferred_reward': less_preferred.total_reward,
+                'preference_strength': strength,
+                'reward_bonus': reward_bonus,
+                'reward_penalty': reward_penalty
+            })
+        
+        apply_preference_sweep(self.q_table, updates, self.lr * self.preference_lr_scale,
+                               self.gamma, mode)
+    
+    def _update_trajectory_values(self, trajectory: Trajectory, reward_modifier: float,
+                                  is_preferred: bool):
+        """
+        Met à jour les valeurs Q pour toutes les transitions d'une trajectoire
+        
+        Args:
+            trajectory: Trajectoire à mettre à jour
+            reward_modifier: Modification de récompense à appliquer
+            is_preferred: True si c'est la trajectoire préférée
+        """
+        apply_preference_sweep(self.q_table, [(self._prepared_trajectory(trajectory), reward_modifier)],
+                               self.lr * self.preference_lr_scale, self.gamma)
+    
+    def _prepared_trajectory(self, trajectory: Trajectory) -> PreparedTrajectory:
+        """Tableaux de la trajectoire pour les mises à jour par préférences (mis en cache)"""
+        return self.prepared_trajectories.get(trajectory, self._prepare_trajectory)
+    
+    @abstractmethod
+    def _prepare_trajectory(self, trajectory: Trajectory) -> PreparedTrajectory:
+        """Convertit une trajectoire en tableaux (états discrets, poids de position) ; propre à l'agent"""
+    
+    def fit_reward_model(self, trajectories: List[Trajectory],
+                         preferences: List[Dict[str, Any]],
+                         n_iterations: int = None) -> float:
+        """
+        Ajuste le modèle de récompense Bradley-Terry sur les préférences
+        
+        r̂ est défini sur les états discrets ; les nouvelles préférences s'ajoutent
+        aux précédentes et l'ajustement repart des paramètres courants. Les mises
+        à jour de la Q-table utilisent ensuite r + preference_weight * r̂(s, a).
+        
+        Args:
+            trajectories: Trajectoires référencées par les préférences
+            preferences: Préférences (format PreferenceInterface)
+            n_iterations: Nombre d'itérations d'Adam (défaut du modèle si None)
+        
+        Returns:
+            Perte finale (log-vraisemblance négative moyenne)
+        """
+        rows = self._reward_model_rows(trajectories)
+        trajectory_index = {traj.episode_id: row for traj, row in zip(trajectories, rows)}
+        
+        n_new = self.reward_model.add_preferences(preferences, trajectory_index)
+        loss = self.reward_model.fit(n_iterations)
+        self.reward_table = self.reward_model.reward_table
+        
+        print(f"[OK] Modèle de récompense ajusté: {self.reward_model.n_pairs} paires "
+              f"(+{n_new}), perte {loss:.4f}")
+        return loss
+    
+    def _reward_model_rows(self, trajectories: List[Trajectory]) -> List[int]:
+        """Enregistre les trajectoires dans le modèle de récompense (créé si besoin)"""
+        if self.reward_model is None:
+            self.reward_model = BradleyTerryRewardModel(self.n_states, self.n_actions)
+        
+        rows = []
+        for traj in trajectories:
+            prepared = self._prepared_trajectory(traj)
+            rows.append(self.reward_model.trajectory_row(traj, prepared.states, prepared.actions))
+        return rows
+    
+    def select_query_pairs(self, trajectories: List[Trajectory], n_pairs: int,
+                           method: str = 'information_gain',
+                           n_members: int = 8, seed: int = None) -> List[Tuple[Trajectory, Trajectory]]:
+        """
+        Sélectionne les paires dont l'étiquette apporterait le plus d'information
+        
+        Un ensemble bootstrap du modèle de récompense estime le retour de chaque
+        trajectoire ; toutes les paires candidates sont notées (gain d'information
+        ou désaccord de l'ensemble) et les n_pairs meilleures sont retournées.
+        Les paires déjà étiquetées sont exclues. La méthode 'rating' utilise
+        le classement des trajectoires (voir TrajectoryRatings.select_pairs).
+        
+        Args:
+            trajectories: Trajectoires candidates
+            n_pairs: Nombre de paires à retourner
+            method: 'information_gain', 'disagreement' ou 'rating'
+            n_members: Taille de l'ensemble
+            seed: Graine de l'ensemble
+        
+        Returns:
+            Liste de paires (traj_a, traj_b), de la plus informative à la moins informative
+        """
+        if method == 'rating':
+            by_id = {traj.episode_id: traj for traj in trajectories}
+            pairs = self.ratings.select_pairs(list(by_id), n_pairs)
+            return [(by_id[a], by_id[b]) for a, b, _ in pairs]
+        
+        rows = self._reward_model_rows(trajectories)
+        queries = select_model_queries(self.reward_model, rows, n_pairs, method,
+                                       n_members=n_members, seed=seed)
+        return [(trajectories[i], trajectories[j]) for i, j, _ in queries]
+    
+    def batch_update_q_table(self, states: np.ndarray, actions: np.ndarray,
+                             rewards: np.ndarray, next_states: np.ndarray,
+                             dones: np.ndarray, collision: str = 'sequential',
+                             weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """Mise à jour par lot (états discrets) avec les récompenses complétées par r̂(s, a)"""
+        rewards = self._augment_rewards(states, actions, rewards)
+        return super().batch_update_q_table(states, actions, rewards, next_states, dones, collision, weights)
+    
+    def _augment_rewards(self, states: np.ndarray, actions: np.ndarray,
+                         rewards: np.ndarray) -> np.ndarray:
+        """Récompenses complétées par preference_weight * r̂(s, a) si un modèle est appris"""
+        if self.reward_table is None:
+            return rewards
+        return rewards + self.preference_weight * self.reward_table[states, actions]
+    
+    def _apply_preference_phase(self, trajectories: List[Trajectory],
+                                preferences: List[Dict[str, Any]], mode: str,
+                                incremental: bool, max_derived: Optional[int]):
+        """Phase 1 de train_with_preferences (paramètres identiques, voir train_with_preferences)"""
+        if incremental:
+            self.apply_new_preferences(trajectories, preferences, mode, max_derived)
+        else:
+            self._apply_existing_preferences(trajectories, preferences, mode, max_derived)
+            self.preference_watermark.advance(preferences)
+    
+    def _apply_existing_preferences(self, trajectories: List[Trajectory],
+                                    preferences: List[Dict[str, Any]],
+                                    mode: str = 'sequential',
+                                    max_derived: Optional[int] = None):
+        """
+        Applique les préférences existantes pour initialiser la Q-table
+        (ou ajuste le modèle de récompense en mode 'reward_model')
+        
+        Args:
+            trajectories: Trajectoires référencées par les préférences
+            preferences: Préférences à appliquer
+            mode: Mode d'application (voir train_with_preferences)
+            max_derived: Consolidation en graphe (voir train_with_preferences)
+        """
+        if mode == 'reward_model':
+            self.fit_reward_model(trajectories, preferences)
+            return
+        
+        # Graphe de préférences : fusion des doublons et préférences dérivées
+        # (inutile pour le modèle de Bradley-Terry, transitif par construction)
+        if max_derived is not None:
+            preferences = consolidate_preferences(preferences, max_derived)
+        
+        # Créer un mapping des trajectoires par ID
+        traj_dict = {traj.episode_id: traj for traj in trajectories}
+        
+        batch = []
+        keys = []
+        for pref in preferences:
+            pair = self._preference_pair(pref, traj_dict)
+            if pair is None:
+                continue
+            batch.append(pair)
+            keys.append(preference_key(pref))
+        
+        # Application de toutes les préférences en un seul balayage
+        self.apply_preferences(batch, mode)
+        for key, (_, _, strength) in zip(keys, batch):
+            self.applied_strengths[key] = self.applied_strengths.get(key, 0.0) + strength
+        
+        print(f"[OK] {len(batch)} préférences appliquées (sur {len(preferences)})")
+    
+    def _preference_pair(self, pref: Dict[str, Any],
+                         traj_dict: Dict[int, Trajectory]) -> Optional[Tuple[Trajectory, Trajectory, float]]:
+        """
+        Convertit une préférence en (trajectoire préférée, moins préférée, force)
+        
+        Returns:
+            None pour une égalité ou une trajectoire inconnue
+        
+        La force vient du classement des trajectoires (self.ratings) quand il
+        connaît les deux trajectoires, sinon de _heuristic_strength.
+        """
+        if pref['choice'] == 0:  # Égalité, on ignore
+            return None
+        
+        traj_a_id = pref['trajectory_a_id']
+        traj_b_id = pref['trajectory_b_id']
+        
+        if traj_a_id not in traj_dict or traj_b_id not in traj_dict:
+            return None
+        
+        traj_a = traj_dict[traj_a_id]
+        traj_b = traj_dict[traj_b_id]
+        
+        # Déterminer quelle trajectoire est préférée
+        if pref['choice'] == 1:  # Trajectoire A préférée
+            preferred = traj_a
+            less_preferred = traj_b
+        else:  # Trajectoire B préférée
+            preferred = traj_b
+            less_preferred = traj_a
+        
+        if self._rated(preferred, less_preferred):
+            strength = self.ratings.preference_strength(preferred.episode_id, less_preferred.episode_id)
+        else:
+            strength = self._heuristic_strength(pref, preferred, less_preferred)
+        # Poids de fusion ou de dérivation (voir preference_graph)
+        strength *= pref.get('weight', 1.0)
+        
+        return preferred, less_preferred, strength
+    
+    @abstractmethod
+    def _heuristic_strength(self, pref: Dict[str, Any], preferred: Trajectory,
+                            less_preferred: Trajectory) -> float:
+        """Force d'une préférence entre trajectoires non classées ; propre à l'agent"""
+    
+    def _rated_strength(self, preferred: Trajectory, less_preferred: Trajectory) -> float:
+        """Force déduite du classement, 1.0 sans classement"""
+        if not self._rated(preferred, less_preferred):
+            return 1.0
+        return self.ratings.preference_strength(preferred.episode_id, less_preferred.episode_id)
+    
+    def _rated(self, *trajectories: Trajectory) -> bool:
+        """True si le classement des trajectoires connaît toutes ces trajectoires"""
+        return self.ratings is not None and all(traj.episode_id in self.ratings for traj in trajectories)
+    
+    def apply_new_preferences(self, trajectories: List[Trajectory],
+                              preferences: List[Dict[str, Any]],
+                              mode: str = 'sequential',
+                              max_derived: Optional[int] = None) -> int:
+        """
+        Applique uniquement les préférences postérieures au filigrane, puis l'avance
+        
+        Le coût dépend du nombre de nouvelles préférences, pas de l'historique.
+        En mode 'reward_model' sans modèle en mémoire (ex: agent rechargé depuis
+        un checkpoint), toutes les préférences sont utilisées pour le reconstruire.
+        
+        Args:
+            trajectories: Trajectoires référencées par les préférences
+            preferences: Préférences (anciennes et nouvelles)
+            mode: Mode d'application (voir train_with_preferences)
+            max_derived: Consolidation en graphe des nouvelles préférences
+                         (voir train_with_preferences)
+        
+        Returns:
+            Nombre de préférences nouvelles
+        """
+        if mode == 'reward_model' and self.reward_model is None:
+            new_preferences = preferences
+        else:
+            new_preferences = self.preference_watermark.new_preferences(preferences)
+        print(f"[INFO] Mode incrémental: {len(new_preferences)} nouvelles préférences "
+              f"(sur {len(preferences)})")
+        
+        if new_preferences:
+            self._apply_existing_preferences(trajectories, new_preferences, mode, max_derived)
+            self.preference_watermark.advance(new_preferences)
+        return len(new_preferences)
+    
+    def reweight_preferences(self, trajectories: List[Trajectory],
+                             preferences: List[Dict[str, Any]], weights,
+                             mode: str = 'sequential') -> int:
+        """
+        Change le poids de préférences déjà appliquées sans rejouer l'historique
+        
+        Avec le modèle de récompense, les poids des paires changent dans la
+        vraisemblance puis r̂ est réajusté à chaud (exact). Sinon, seule la
+        différence entre la nouvelle force (force de base * poids) et la force
+        déjà appliquée est propagée, par un balayage limité à ces préférences :
+        correction du premier ordre (un poids 0 retire approximativement la préférence).
+        
+        Args:
+            trajectories: Trajectoires référencées par les préférences
+            preferences: Préférences à repondérer
+            weights: Nouveau poids (scalaire ou un par préférence)
+            mode: Mode du balayage de correction ('sequential' ou 'jacobi')
+        
+        Returns:
+            Nombre de préférences repondérées
+        """
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), (len(preferences),))
+        
+        if self.reward_table is not None:
+            updated = self.reward_model.set_preference_weights(preferences, weights)
+            loss = self.reward_model.fit()
+            self.reward_table = self.reward_model.reward_table
+            print(f"[OK] {updated} préférences repondérées (modèle de récompense, perte {loss:.4f})")
+            return updated
+        
+        traj_dict = {traj.episode_id: traj for traj in trajectories}
+        batch = []
+        targets = []
+        for pref, weight in zip(preferences, weights):
+            pair = self._preference_pair(pref, traj_dict)
+            if pair is None:
+                continue
+            preferred, less_preferred, strength = pair
+            key = preference_key(pref)
+            target = strength * float(weight)
+            delta = target - self.applied_strengths.get(key, 0.0)
+            if delta != 0.0:
+                batch.append((preferred, less_preferred, delta))
+                targets.append((key, target))
+        
+        self.apply_preferences(batch, mode)
+        self.applied_strengths.update(targets)
+        print(f"[OK] {len(batch)} préférences repondérées")
+        return len(batch)
+    
+    def _checkpoint_metadata(self) -> Dict[str, Any]:
+        """Ajoute les paramètres PbRL aux métadonnées du checkpoint"""
+        metadata = super()._checkpoint_metadata()
+        metadata['hyperparameters']['preference_weight'] = self.preference_weight
+        metadata['preference_updates'] = self.preference_updates
+        metadata['preference_watermark'] = self.preference_watermark.to_dict()
+        metadata['applied_strengths'] = self.applied_strengths
+        return metadata
+    
+    def _restore_checkpoint_metadata(self, metadata: Dict[str, Any]):
+        """Restaure les paramètres PbRL d'un checkpoint"""
+        super()._restore_checkpoint_metadata(metadata)
+        self.prepared_trajectories.clear()  # La discrétisation a pu changer
+        if self.reward_model is not None and self.reward_model.n_states != self.n_states:
+            self.reward_model = None
+            self.reward_table = None
+        self.preference_weight = metadata.get('hyperparameters', {}).get(
+            'preference_weight', self.preference_weight)
+        self.preference_updates = metadata.get('preference_updates', self.preference_updates)
+        self.preference_watermark = PreferenceWatermark.from_dict(metadata.get('preference_watermark'))
+        self.applied_strengths = dict(metadata.get('applied_strengths', {}))
@@ -0,0 +1,175 @@
+"""
+Oracle vectorisé de préférences synthétiques pour MountainCar
+Mêmes critères hiérarchiques que auto_select_preference, évalués en une passe
+NumPy sur un tableau de paires ou sur la matrice N x N complète
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+
+FEATURE_NAMES = ('success', 'episode_length', 'max_position', 'total_reward', 'efficiency')
+
+
+def trajectory_features(trajectories: List) -> Dict[str, np.ndarray]:
+    """
+    Extrait les caractéristiques utilisées par l'oracle
+    
+    Args:
+        trajectories: Trajectoires MountainCar (success, episode_length,
+                      max_position, total_reward)
+    
+    Returns:
+        Dict de tableaux de longueur N (voir FEATURE_NAMES)
+    """
+    episode_length = np.array([t.episode_length for t in trajectories], dtype=np.int64)
+    total_reward = np.array([t.total_reward for t in trajectories], dtype=np.float64)
+    return {
+        'success': np.array([bool(t.success) for t in trajectories], dtype=bool),
+        'episode_length': episode_length,
+        'max_position': np.array([t.max_position for t in trajectories], dtype=np.float64),
+        'total_reward': total_reward,
+        'efficiency': total_reward / np.maximum(episode_length, 1)
+    }
+
+
+def _hierarchical_choices(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Critères de auto_select_preference, diffusés (broadcast) entre a et b
+    
+    Le premier critère décisif l'emporte : les critères sont appliqués du moins
+    prioritaire au plus prioritaire, chacun écrasant les précédents là où il décide.
+        1. succès contre échec
+        2. deux succès : épisode plus court (écart > 3 pas)
+        3. deux échecs : position max plus haute (écart > 0.1), ou écart > 0.03
+           confirmé par la récompense (écart > 3)
+        4. récompense totale (écart > 10)
+        5. efficacité récompense / longueur (écart > 0.15)
+    
+    Returns:
+        Choix (1 = A, 2 = B, 0 = égalité) en int8
+    """
+    both_success = a['success'] & b['success']
+    both_fail = ~a['success'] & ~b['success']
+    position_diff = np.abs(a['max_position'] - b['max_position'])
+    reward_diff = np.abs(a['total_reward'] - b['total_reward'])
+    
+    conditions = [
+        a['success'] != b['success'],
+        both_success & (np.abs(a['episode_length'] - b['episode_length']) > 3),
+        both_fail & (position_diff > 0.1),
+        both_fail & (position_diff > 0.03) & (reward_diff > 3),
+        reward_diff > 10,
+        np.abs(a['efficiency'] - b['efficiency']) > 0.15
+    ]
+    a_wins = [
+        a['success'],
+        a['episode_length'] < b['episode_length'],
+        a['max_position'] > b['max_position'],
+        a['total_reward'] > b['total_reward'],
+        a['total_reward'] > b['total_reward'],
+        a['efficiency'] > b['efficiency']
+    ]
+    choices = np.zeros(np.broadcast(*conditions).shape, dtype=np.int8)
+    for condition, wins in zip(reversed(conditions), reversed(a_wins)):
+        # 2 - wins : 1 si A l'emporte, 2 sinon
+        np.copyto(choices, 2 - np.asarray(wins, dtype=np.int8), where=condition)
+    return choices
+
+
+def _as_features(features: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Valide les caractéristiques et calcule l'efficacité si elle est absente"""
+    missing = [name for name in FEATURE_NAMES[:4] if name not in features]
+    if missing:
+        raise ValueError(f"Caractéristiques manquantes: {missing}")
+    
+    arrays = {name: np.asarray(features[name]) for name in FEATURE_NAMES if name in features}
+    arrays['success'] = arrays['success'].astype(bool)
+    if 'efficiency' not in arrays:
+        arrays['efficiency'] = arrays['total_reward'] / np.maximum(arrays['episode_length'], 1)
+    return arrays
+
+
+def label_pairs(features: Dict[str, np.ndarray], index_a: np.ndarray, index_b: np.ndarray) -> np.ndarray:
+    """
+    Étiquette un tableau arbitraire de paires
+    
+    Args:
+        features: Caractéristiques des N trajectoires (voir trajectory_features)
+        index_a: Index des trajectoires A
+        index_b: Index des trajectoires B
+    
+    Returns:
+        Choix (1 = A, 2 = B, 0 = égalité), un par paire
+    """
+    features = _as_features(features)
+    index_a = np.asarray(index_a, dtype=np.int64)
+    index_b = np.asarray(index_b, dtype=np.int64)
+    return _hierarchical_choices({name: values[index_a] for name, values in features.items()},
+                                 {name: values[index_b] for name, values in features.items()})
+
+
+def label_matrix(features: Dict[str, np.ndarray], block_size: Optional[int] = None) -> np.ndarray:
+    """
+    Matrice N x N de tous les choix (choices[i, j] compare i (A) à j (B))
+    
+    Args:
+        features: Caractéristiques des N trajectoires (voir trajectory_features)
+        block_size: Lignes traitées par bloc (limite la mémoire des tableaux
+                    intermédiaires ; automatique si None)
+    
+    Returns:
+        Matrice des choix en int8 (diagonale à 0)
+    """
+    features = _as_features(features)
+    n_trajectories = len(features['success'])
+    if block_size is None:
+        block_size = max(1, 2 ** 22 // max(n_trajectories, 1))
+    
+    columns = {name: values[None, :] for name, values in features.items()}
+    choices = np.empty((n_trajectories, n_trajectories), dtype=np.int8)
+    for start in range(0, n_trajectories, block_size):
+        rows = slice(start, min(start + block_size, n_trajectories))
+        choices[rows] = _hierarchical_choices({name: values[rows, None] for name, values in features.items()},
+                                              columns)
+    return choices
+
+
+def test_preference_oracle():
+    """Vérifie l'oracle vectorisé contre auto_select_preference, paire par paire"""
+    from types import SimpleNamespace
+    from collect_mountaincar_preferences_auto import auto_select_preference
+    
+    print("🧪 TEST DE L'ORACLE DE PRÉFÉRENCES\n")
+    
+    # Valeurs discrètes : de nombreuses paires tombent exactement sur les seuils
+    rng = np.random.default_rng(0)
+    trajectories = []
+    for _ in range(150):
+        success = bool(rng.random() < 0.4)
+        length = int(rng.integers(80, 200)) if success else 200
+        trajectories.append(SimpleNamespace(
+            success=success,
+            episode_length=length,
+            max_position=0.5 if success else float(rng.integers(-60, 50)) / 100,
+            total_reward=float(-length + rng.choice([0, 0, 3, 4, 10, 11, 40]))
+        ))
+    
+    expected = np.array([[auto_select_preference(a, b) if a is not b else 0 for b in trajectories]
+                         for a in trajectories], dtype=np.int8)
+    features = trajectory_features(trajectories)
+    assert np.array_equal(label_matrix(features, block_size=17), expected)
+    
+    index_a = rng.integers(0, len(trajectories), 500)
+    index_b = rng.integers(0, len(trajectories), 500)
+    choices = label_pairs(features, index_a, index_b)
+    assert all(choice == auto_select_preference(trajectories[a], trajectories[b])
+               for choice, a, b in zip(choices, index_a, index_b))
+    
+    counts = np.bincount(expected.ravel(), minlength=3)
+    print(f"[OK] {expected.size} paires identiques à auto_select_preference "
+          f"(égalités {counts[0]}, A {counts[1]}, B {counts[2]})")
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_preference_oracle()
@@ -0,0 +1,379 @@
+"""
+Stockage persistant et indexé des préférences (SQLite, module standard sqlite3)
+Ajouts incrémentaux et transactionnels : le coût d'une insertion ou d'une requête
+ne dépend pas de la taille totale de la campagne d'étiquetage
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    labeler TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    ended_at TEXT,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS trajectories (
+    trajectory_id INTEGER PRIMARY KEY,
+    total_reward REAL,
+    episode_length INTEGER,
+    efficiency REAL,
+    success INTEGER,
+    max_position REAL
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    pair_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trajectory_a_id INTEGER NOT NULL REFERENCES trajectories(trajectory_id),
+    trajectory_b_id INTEGER NOT NULL REFERENCES trajectories(trajectory_id),
+    UNIQUE (trajectory_a_id, trajectory_b_id)
+);
+CREATE INDEX IF NOT EXISTS idx_pairs_b ON pairs(trajectory_b_id);
+CREATE TABLE IF NOT EXISTS choices (
+    preference_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    pair_id INTEGER NOT NULL REFERENCES pairs(pair_id),
+    session_id INTEGER REFERENCES sessions(session_id),
+    choice INTEGER NOT NULL CHECK (choice IN (0, 1, 2)),
+    reasoning TEXT,
+    timestamp TEXT NOT NULL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_choices_pair ON choices(pair_id);
+CREATE INDEX IF NOT EXISTS idx_choices_session ON choices(session_id);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT PRIMARY KEY,
+    preference_id INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    name TEXT NOT NULL,
+    trajectory_id INTEGER NOT NULL REFERENCES trajectories(trajectory_id),
+    rating REAL NOT NULL,
+    variance REAL NOT NULL,
+    n_comparisons INTEGER NOT NULL,
+    PRIMARY KEY (name, trajectory_id)
+);
+"""
+
+# Plage d'identifiants de trajectoire réservée à chaque session (voir trajectory_id_offset)
+TRAJECTORY_IDS_PER_SESSION = 1_000_000
+
+# Champs par trajectoire des enregistrements de préférence (trajectory_a_<champ>, trajectory_b_<champ>)
+TRAJECTORY_FIELDS = ('reward', 'length', 'efficiency', 'success', 'max_position')
+_TRAJECTORY_COLUMNS = ('total_reward', 'episode_length', 'efficiency', 'success', 'max_position')
+
+# Champs stockés dans des colonnes dédiées (le reste va dans `extra`, en JSON)
+_RECORD_FIELDS = {'preference_id', 'timestamp', 'trajectory_a_id', 'trajectory_b_id', 'choice',
+                  'reasoning', 'session_id'} | {f"trajectory_{side}_{field}"
+                                               for side in 'ab' for field in TRAJECTORY_FIELDS}
+
+_SELECT_PREFERENCES = """
+SELECT c.preference_id, c.session_id, c.choice, c.reasoning, c.timestamp, c.extra,
+       p.trajectory_a_id, p.trajectory_b_id,
+       ta.total_reward, ta.episode_length, ta.efficiency, ta.success, ta.max_position,
+       tb.total_reward, tb.episode_length, tb.efficiency, tb.success, tb.max_position
+FROM choices c
+JOIN pairs p ON p.pair_id = c.pair_id
+JOIN trajectories ta ON ta.trajectory_id = p.trajectory_a_id
+JOIN trajectories tb ON tb.trajectory_id = p.trajectory_b_id
+"""
+
+
+class PreferenceStore:
+    """
+    Base de préférences SQLite (trajectoires, paires, choix, sessions d'étiquetage)
+    
+    Les enregistrements lus et écrits ont le format des dictionnaires de
+    PreferenceInterface (trajectory_a_id, trajectory_b_id, choice,
+    trajectory_a_reward, ...). Les identifiants de trajectoire sont les
+    episode_id : ils doivent être uniques au sein d'une même base. Une
+    collecte qui numérote ses épisodes à partir de 0 les décale de
+    trajectory_id_offset(session_id) pour ajouter à une base existante.
+    Des points de contrôle nommés (filigranes sur preference_id) permettent
+    de ne relire que les préférences arrivées depuis un entraînement donné.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path: Chemin du fichier SQLite (créé si absent, ':memory:' accepté)
+        """
+        directory = os.path.dirname(db_path)
+        if directory and db_path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+        
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        if db_path != ':memory:':
+            # Journal WAL : écritures en ajout, lectures concurrentes possibles
+            self.connection.execute("PRAGMA journal_mode = WAL")
+            self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(SCHEMA)
+    
+    def close(self):
+        self.connection.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def start_session(self, labeler: str = 'human', metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Ouvre une session d'étiquetage
+        
+        Args:
+            labeler: Auteur des étiquettes (ex: 'human', 'auto')
+            metadata: Informations libres (sérialisables JSON)
+        
+        Returns:
+            Identifiant de la session
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO sessions (labeler, started_at, metadata) VALUES (?, ?, ?)",
+                (labeler, datetime.now().isoformat(), json.dumps(metadata or {}, ensure_ascii=False)))
+        return cursor.lastrowid
+    
+    def trajectory_id_offset(self, session_id: int) -> int:
+        """
+        Premier identifiant de trajectoire réservé à une session
+        
+        Les episode_id des collectes repartent de 0 : décalés de cette valeur,
+        ceux de sessions différentes ne se confondent pas dans la base.
+        """
+        return int(session_id) * TRAJECTORY_IDS_PER_SESSION
+    
+    def end_session(self, session_id: int):
+        """Marque la fin d'une session d'étiquetage"""
+        with self.connection:
+            self.connection.execute("UPDATE sessions SET ended_at = ? WHERE session_id = ?",
+                                    (datetime.now().isoformat(), session_id))
+    
+    def add_trajectories(self, trajectories: Iterable):
+        """
+        Enregistre (ou met à jour) les caractéristiques de trajectoires
+        
+        Args:
+            trajectories: Objets trajectoire (episode_id, total_reward, episode_length,
+                          et success / max_position s'ils existent)
+        """
+        rows = []
+        for traj in trajectories:
+            length = int(traj.episode_length)
+            reward = float(traj.total_reward)
+            success = getattr(traj, 'success', None)
+            max_position = getattr(traj, 'max_position', None)
+            rows.append((int(traj.episode_id), reward, length, reward / length if length > 0 else 0.0,
+                         None if success is None else int(bool(success)),
+                         None if max_position is None else float(max_position)))
+        with self.connection:
+            self._upsert_trajectories(rows)
+    
+    def add_preference(self, preference: Dict[str, Any], session_id: Optional[int] = None) -> int:
+        """Ajoute une préférence (voir add_preferences) et retourne son identifiant"""
+        return self.add_preferences([preference], session_id)[0]
+    
+    def add_preferences(self, preferences: List[Dict[str, Any]],
+                        session_id: Optional[int] = None) -> List[int]:
+        """
+        Ajoute un lot de préférences en une seule transaction
+        
+        Les caractéristiques de trajectoire présentes dans les enregistrements
+        (trajectory_a_reward, ...) complètent la table des trajectoires. Le champ
+        preference_id éventuel est ignoré : la base attribue ses propres identifiants.
+        
+        Args:
+            preferences: Enregistrements au format PreferenceInterface
+            session_id: Session d'étiquetage (celle de l'enregistrement si None)
+        
+        Returns:
+            Identifiants attribués, dans l'ordre du lot
+        """
+        trajectory_rows = []
+        pair_keys = []
+        for pref in preferences:
+            for side in 'ab':
+                values = [pref.get(f"trajectory_{side}_{field}") for field in TRAJECTORY_FIELDS]
+                if values[3] is not None:
+                    values[3] = int(bool(values[3]))
+                trajectory_rows.append((int(pref[f"trajectory_{side}_id"]), *values))
+            pair_keys.append((int(pref['trajectory_a_id']), int(pref['trajectory_b_id'])))
+        
+        preference_ids = []
+        with self.connection:
+            self._upsert_trajectories(trajectory_rows)
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO pairs (trajectory_a_id, trajectory_b_id) VALUES (?, ?)", pair_keys)
+            for pref, (a, b) in zip(preferences, pair_keys):
+                extra = {key: value for key, value in pref.items() if key not in _RECORD_FIELDS}
+                cursor = self.connection.execute(
+                    """INSERT INTO choices (pair_id, session_id, choice, reasoning, timestamp, extra)
+                       SELECT pair_id, ?, ?, ?, ?, ? FROM pairs
+                       WHERE trajectory_a_id = ? AND trajectory_b_id = ?""",
+                    (session_id if session_id is not None else pref.get('session_id'),
+                     int(pref['choice']), pref.get('reasoning'),
+                     pref.get('timestamp') or datetime.now().isoformat(),
+                     json.dumps(extra, ensure_ascii=False) if extra else None, a, b))
+                preference_ids.append(cursor.lastrowid)
+        return preference_ids
+    
+    def _upsert_trajectories(self, rows: List[tuple]):
+        """Insère les trajectoires ; les valeurs connues ne sont pas écrasées par des NULL"""
+        updates = ", ".join(f"{column} = COALESCE(excluded.{column}, {column})"
+                            for column in _TRAJECTORY_COLUMNS)
+        self.connection.executemany(
+            f"""INSERT INTO trajectories (trajectory_id, {', '.join(_TRAJECTORY_COLUMNS)})
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(trajectory_id) DO UPDATE SET {updates}""", rows)
+    
+    def last_preference_id(self) -> int:
+        """Identifiant de la dernière préférence enregistrée (0 si aucune)"""
+        (last,) = self.connection.execute("SELECT COALESCE(MAX(preference_id), 0) FROM choices").fetchone()
+        return last
+    
+    def mark_checkpoint(self, name: str, preference_id: Optional[int] = None) -> int:
+        """
+        Enregistre un point de contrôle nommé
+        
+        Args:
+            name: Nom du point de contrôle (ex: chemin du checkpoint de l'agent)
+            preference_id: Dernière préférence prise en compte (la plus récente si None)
+        
+        Returns:
+            Filigrane enregistré
+        """
+        if preference_id is None:
+            preference_id = self.last_preference_id()
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, preference_id, created_at) VALUES (?, ?, ?)",
+                (name, int(preference_id), datetime.now().isoformat()))
+        return int(preference_id)
+    
+    def checkpoint(self, name: str) -> Optional[int]:
+        """Filigrane d'un point de contrôle (None s'il n'existe pas)"""
+        row = self.connection.execute("SELECT preference_id FROM checkpoints WHERE name = ?",
+                                      (name,)).fetchone()
+        return None if row is None else row[0]
+    
+    def save_ratings(self, name: str, rows: List[tuple], preference_id: Optional[int] = None):
+        """
+        Enregistre des notes de trajectoires et leur point de contrôle en une transaction
+        
+        Args:
+            name: Nom du système de notes (aussi nom du point de contrôle)
+            rows: Lignes (trajectory_id, note, variance, comparaisons)
+            preference_id: Dernière préférence prise en compte (la plus récente si None)
+        """
+        if preference_id is None:
+            preference_id = self.last_preference_id()
+        with self.connection:
+            self.connection.executemany(
+                """INSERT OR REPLACE INTO ratings (name, trajectory_id, rating, variance, n_comparisons)
+                   VALUES (?, ?, ?, ?, ?)""", [(name, *row) for row in rows])
+            self.connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, preference_id, created_at) VALUES (?, ?, ?)",
+                (name, int(preference_id), datetime.now().isoformat()))
+    
+    def load_ratings(self, name: str) -> List[tuple]:
+        """Notes enregistrées : lignes (trajectory_id, note, variance, comparaisons)"""
+        return self.connection.execute(
+            "SELECT trajectory_id, rating, variance, n_comparisons FROM ratings WHERE name = ?",
+            (name,)).fetchall()
+    
+    def preferences(self, since: Optional[int] = None,
+                    session_id: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Préférences au format PreferenceInterface, par identifiant croissant
+        
+        Args:
+            since: Ne retourne que les préférences d'identifiant strictement supérieur
+            session_id: Restreint à une session d'étiquetage
+            limit: Nombre maximum de préférences
+        
+        Returns:
+            Liste d'enregistrements
+        """
+        conditions, parameters = [], []
+        if since is not None:
+            conditions.append("c.preference_id > ?")
+            parameters.append(int(since))
+        if session_id is not None:
+            conditions.append("c.session_id = ?")
+            parameters.append(int(session_id))
+        return self._query(conditions, parameters, limit)
+    
+    def preferences_for_trajectory(self, trajectory_id: int) -> List[Dict[str, Any]]:
+        """Toutes les préférences où la trajectoire apparaît (en A ou en B)"""
+        # Deux sous-requêtes indexées (UNIQUE sur a, index sur b) plutôt qu'un OR
+        query = _SELECT_PREFERENCES + """
+            WHERE c.pair_id IN (SELECT pair_id FROM pairs WHERE trajectory_a_id = ?
+                                UNION SELECT pair_id FROM pairs WHERE trajectory_b_id = ?)
+            ORDER BY c.preference_id"""
+        rows = self.connection.execute(query, (int(trajectory_id), int(trajectory_id))).fetchall()
+        return [self._record(row) for row in rows]
+    
+    def unapplied(self, checkpoint_name: str) -> List[Dict[str, Any]]:
+        """Préférences arrivées depuis un point de contrôle (toutes s'il n'existe pas)"""
+        return self.preferences(since=self.checkpoint(checkpoint_name))
+    
+    def count(self) -> int:
+        (total,) = self.connection.execute("SELECT COUNT(*) FROM choices").fetchone()
+        return total
+    
+    def statistics(self) -> Dict[str, Any]:
+        """Répartition des choix, calculée par agrégation SQL"""
+        counts = {0: 0, 1: 0, 2: 0}
+        for choice, n in self.connection.execute("SELECT choice, COUNT(*) FROM choices GROUP BY choice"):
+            counts[choice] = n
+        (n_trajectories,) = self.connection.execute("SELECT COUNT(*) FROM trajectories").fetchone()
+        (n_sessions,) = self.connection.execute("SELECT COUNT(*) FROM sessions").fetchone()
+        return {
+            'total_preferences': sum(counts.values()),
+            'choice_distribution': {
+                'trajectory_a': counts[1],
+                'trajectory_b': counts[2],
+                'equal': counts[0]
+            },
+            'total_trajectories': n_trajectories,
+            'total_sessions': n_sessions
+        }
+    
+    def _query(self, conditions: List[str], parameters: List[Any],
+               limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        query = _SELECT_PREFERENCES
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY c.preference_id"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters = parameters + [int(limit)]
+        return [self._record(row) for row in self.connection.execute(query, parameters)]
+    
+    @staticmethod
+    def _record(row: tuple) -> Dict[str, Any]:
+        preference_id, session_id, choice, reasoning, timestamp, extra, a_id, b_id = row[:8]
+        record = json.loads(extra) if extra else {}
+        record.update({
+            'preference_id': preference_id,
+            'session_id': session_id,
+            'timestamp': timestamp,
+            'trajectory_a_id': a_id,
+            'trajectory_b_id': b_id,
+            'choice': choice
+        })
+        if reasoning is not None:
+            record['reasoning'] = reasoning
+        for side, values in (('a', row[8:13]), ('b', row[13:18])):
+            for field, value in zip(TRAJECTORY_FIELDS, values):
+                if value is not None:
+                    record[f"trajectory_{side}_{field}"] = bool(value) if field == 'success' else value
+        return record
@@ -0,0 +1,200 @@
+"""
+Moteur d'application des préférences par lots
+Les trajectoires sont converties une seule fois en tableaux (états discrets,
+actions, poids de position) puis les préférences sont appliquées en un balayage
+"""
+
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.q_learning_agent import apply_td_targets
+
+PREFERENCE_MODES = ('sequential', 'jacobi')
+
+
+@dataclass
+class PreparedTrajectory:
+    """Transitions d'une trajectoire pré-calculées pour les mises à jour par préférences"""
+    states: np.ndarray
+    actions: np.ndarray
+    next_states: np.ndarray
+    dones: np.ndarray
+    rewards: np.ndarray
+    position_weights: np.ndarray
+    
+    def final_rewards(self, reward_modifier: float) -> np.ndarray:
+        """Récompenses modifiées par la préférence puis pondérées par la position"""
+        return (self.rewards + reward_modifier) * self.position_weights
+
+
+def store_preference_id(preference: Dict[str, Any]) -> Optional[int]:
+    """
+    Identifiant attribué par la PreferenceStore, None sinon
+    
+    Seuls les identifiants de la base (accompagnés de leur session_id) croissent
+    d'une session à l'autre ; le compteur local d'une interface sans base repart
+    de 0 et ne peut servir ni au filigrane ni à la déduplication.
+    """
+    preference_id = preference.get('preference_id')
+    if isinstance(preference_id, int) and preference.get('session_id') is not None:
+        return preference_id
+    return None
+
+
+def preference_key(preference: Dict[str, Any]) -> str:
+    """
+    Clé stable d'une préférence (registre des forces appliquées)
+    
+    Par ordre de priorité : identifiant unique de l'enregistrement (preference_uid),
+    identifiant attribué par la base, identifiant symbolique (préférences dérivées,
+    interactives), sinon le couple de trajectoires et l'horodatage.
+    """
+    if preference.get('preference_uid') is not None:
+        return f"uid:{preference['preference_uid']}"
+    preference_id = store_preference_id(preference)
+    if preference_id is not None:
+        return f"id:{preference_id}"
+    preference_id = preference.get('preference_id')
+    if preference_id is not None and not isinstance(preference_id, int):
+        return f"id:{preference_id}"
+    return (f"{preference['trajectory_a_id']}-{preference['trajectory_b_id']}"
+            f"@{preference.get('timestamp', '')}")
+
+
+@dataclass
+class PreferenceWatermark:
+    """
+    Filigrane des préférences déjà appliquées (identifiant ou horodatage)
+    
+    Une préférence est nouvelle si son identifiant attribué par la base dépasse le
+    dernier identifiant appliqué ; sinon (pas de base, ou compteur local d'une
+    interface) l'horodatage ISO est comparé au dernier horodatage.
+    Une préférence sans identifiant ni horodatage est toujours considérée comme nouvelle.
+    """
+    preference_id: Optional[int] = None
+    timestamp: Optional[str] = None
+    
+    def is_new(self, preference: Dict[str, Any]) -> bool:
+        preference_id = store_preference_id(preference)
+        if preference_id is not None:
+            return self.preference_id is None or preference_id > self.preference_id
+        timestamp = preference.get('timestamp')
+        if timestamp:
+            return self.timestamp is None or timestamp > self.timestamp
+        return True
+    
+    def new_preferences(self, preferences: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Préférences arrivées après le filigrane"""
+        return [pref for pref in preferences if self.is_new(pref)]
+    
+    def advance(self, preferences: List[Dict[str, Any]]):
+        """Avance le filigrane après application des préférences"""
+        for pref in preferences:
+            preference_id = store_preference_id(pref)
+            if preference_id is not None and (self.preference_id is None or preference_id > self.preference_id):
+                self.preference_id = preference_id
+            timestamp = pref.get('timestamp')
+            if timestamp and (self.timestamp is None or timestamp > self.timestamp):
+                self.timestamp = timestamp
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'preference_id': self.preference_id, 'timestamp': self.timestamp}
+    
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'PreferenceWatermark':
+        data = data or {}
+        return cls(data.get('preference_id'), data.get('timestamp'))
+
+
+class PreparedTrajectoryCache:
+    """
+    Cache des PreparedTrajectory indexé par identité de trajectoire
+    
+    Une trajectoire comparée dans plusieurs préférences n'est discrétisée
+    et pondérée qu'une seule fois.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[int, Tuple[object, PreparedTrajectory]] = {}
+    
+    def get(self, trajectory, prepare: Callable[[object], PreparedTrajectory]) -> PreparedTrajectory:
+        """
+        Retourne la version préparée d'une trajectoire (calculée au premier appel)
+        
+        Args:
+            trajectory: Trajectoire (liste de pas ou colonnes)
+            prepare: Fonction de préparation propre à l'agent
+        
+        Returns:
+            PreparedTrajectory
+        """
+        entry = self._entries.get(id(trajectory))
+        if entry is None or entry[0] is not trajectory:
+            entry = (trajectory, prepare(trajectory))
+            self._entries[id(trajectory)] = entry
+        return entry[1]
+    
+    def clear(self):
+        """Vide le cache (ex: après un changement de discrétisation)"""
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def apply_preference_sweep(q_table: np.ndarray,
+                           updates: List[Tuple[PreparedTrajectory, float]],
+                           learning_rate: float, gamma: float,
+                           mode: str = 'sequential'):
+    """
+    Applique un lot de mises à jour par préférences à la Q-table (en place)
+    
+    Modes:
+        'sequential': sémantique historique, transition par transition dans l'ordre
+                      des mises à jour ; chaque cible lit la Q-table déjà modifiée
+                      par les transitions précédentes. Exécuté sur des listes Python
+                      (sans surcoût NumPy par élément) limitées aux lignes touchées
+                      par le lot : le coût ne dépend pas de la taille de la Q-table.
+        'jacobi': mise à jour simultanée ; toutes les cibles sont calculées sur la
+                  Q-table d'avant le balayage, puis appliquées en vectoriel. Les
+                  mises à jour d'une même case se composent comme des pas successifs
+                  vers leurs cibles respectives (voir apply_td_targets).
+    
+    Args:
+        q_table: Q-table à modifier
+        updates: Liste de (trajectoire préparée, modificateur de récompense)
+        learning_rate: Taux d'apprentissage des préférences
+        gamma: Facteur de réduction
+        mode: 'sequential' ou 'jacobi'
+    """
+    if mode not in PREFERENCE_MODES:
+        raise ValueError(f"Mode inconnu: {mode} (attendu l'un de {PREFERENCE_MODES})")
+    if not updates:
+        return
+    
+    states = np.concatenate([prepared.states for prepared, _ in updates])
+    actions = np.concatenate([prepared.actions for prepared, _ in updates])
+    next_states = np.concatenate([prepared.next_states for prepared, _ in updates])
+    dones = np.concatenate([prepared.dones for prepared, _ in updates])
+    final_rewards = np.concatenate([prepared.final_rewards(modifier) for prepared, modifier in updates])
+    
+    if mode == 'jacobi':
+        bootstrap = np.where(dones, 0.0, gamma * q_table.max(axis=1)[next_states])
+        apply_td_targets(q_table, states, actions, final_rewards + bootstrap, learning_rate)
+        return
+    
+    # Seules les lignes lues ou écrites par le lot sont copiées (indices locaux)
+    touched = np.unique(np.concatenate([states, next_states]))
+    q_values = q_table[touched].tolist()
+    for state, action, next_state, final_reward, done in zip(
+            np.searchsorted(touched, states).tolist(), actions.tolist(),
+            np.searchsorted(touched, next_states).tolist(),
+            final_rewards.tolist(), dones.tolist()):
+        if done:
+            target = final_reward
+        else:
+            target = final_reward + gamma * max(q_values[next_state])
+        row = q_values[state]
+        row[action] += learning_rate * (target - row[action])
+    q_table[touched] = q_values
@@ -0,0 +1,168 @@
+"""
+Balayage prioritaire (prioritized sweeping, Moore & Atkeson 1993) pour agents tabulaires
+Tas de cellules (s, a) classées par erreur de Bellman et index des prédécesseurs
+construit à partir des transitions observées : les changements de valeur sont
+propagés vers l'arrière, dans un budget de mises à jour fixé par pas réel
+"""
+
+import heapq
+import numpy as np
+from typing import Dict, List, Optional, Set
+
+from src.tabular_model import TabularModel
+
+
+class PrioritizedSweeping:
+    """
+    Moteur de balayage prioritaire sur un TabularModel
+    
+    Les sauvegardes sont des espérances sur le modèle :
+    Q(s, a) <- Q(s, a) + lr * (r̄ + gamma * (1 - P(fin)) * moyenne_s' max Q(s') - Q(s, a)),
+    la moyenne portant sur la fenêtre d'états suivants du modèle. Après la mise
+    à jour d'un lot de cellules, les prédécesseurs des états modifiés sont
+    (re)classés par leur nouvelle erreur de Bellman.
+    
+    Le tas est à suppression paresseuse : une cellule peut y figurer plusieurs
+    fois, seule l'entrée portant sa priorité courante est valide.
+    """
+    
+    def __init__(self, n_states: int, n_actions: int, threshold: float = 1e-4,
+                 n_next_samples: int = 16, seed: Optional[int] = None):
+        """
+        Args:
+            n_states: Nombre d'états discrets
+            n_actions: Nombre d'actions
+            threshold: Erreur de Bellman minimale pour entrer dans le tas
+            n_next_samples: États suivants mémorisés par cellule (voir TabularModel)
+            seed: Graine du modèle
+        """
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.threshold = threshold
+        self.model = TabularModel(n_states, n_actions, n_next_samples, seed)
+        
+        self.priorities = np.zeros(n_states * n_actions)
+        self._heap: List = []
+        
+        # s' -> cellules (s * n_actions + a) ayant déjà mené à s'
+        self.predecessors: Dict[int, List[int]] = {}
+        self._edges: Set[int] = set()
+    
+    def __len__(self) -> int:
+        """Nombre de cellules en attente (priorité > seuil)"""
+        return int(np.count_nonzero(self.priorities))
+    
+    def observe(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                next_states: np.ndarray, dones: np.ndarray):
+        """Intègre des transitions réelles au modèle et à l'index des prédécesseurs"""
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        next_states = np.asarray(next_states, dtype=np.int64)
+        self.model.update(states, actions, rewards, next_states, dones)
+        
+        cells = states * self.n_actions + actions
+        for cell, next_state in zip(cells.tolist(), next_states.tolist()):
+            edge = cell * self.n_states + next_state
+            if edge not in self._edges:
+                self._edges.add(edge)
+                self.predecessors.setdefault(next_state, []).append(cell)
+    
+    def predecessor_cells(self, states: np.ndarray) -> np.ndarray:
+        """Cellules (sans doublon) ayant déjà mené à l'un des états donnés"""
+        lists = [self.predecessors[s] for s in np.unique(states).tolist() if s in self.predecessors]
+        if not lists:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(lists))
+    
+    def bellman_errors(self, q_table: np.ndarray, cells: np.ndarray, gamma: float,
+                       rewards: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Erreurs de Bellman (cible attendue - Q) des cellules sous le modèle
+        
+        Args:
+            q_table: Q-table courante
+            cells: Cellules observées (s * n_actions + a)
+            gamma: Facteur d'actualisation
+            rewards: Récompenses à utiliser à la place de la moyenne du modèle
+        """
+        model = self.model
+        states = cells // self.n_actions
+        actions = cells % self.n_actions
+        counts = model.counts[states, actions]
+        if rewards is None:
+            rewards = model.mean_rewards(states, actions)
+        
+        # Les emplacements non remplis de la fenêtre valent -1
+        samples = model.next_states[states, actions]
+        next_values = np.where(samples >= 0, q_table[samples].max(axis=2), 0.0)
+        n_samples = np.minimum(counts, model.n_next_samples)
+        continuation = 1.0 - model.terminal_counts[states, actions] / counts
+        
+        targets = rewards + gamma * continuation * next_values.sum(axis=1) / n_samples
+        return targets - q_table[states, actions]
+    
+    def push(self, cells: np.ndarray, errors: np.ndarray):
+        """Ajoute ou remonte dans le tas les cellules dont |erreur| dépasse le seuil"""
+        priorities = np.abs(errors)
+        keep = (priorities > self.threshold) & (priorities > self.priorities[cells])
+        for cell, priority in zip(cells[keep].tolist(), priorities[keep].tolist()):
+            self.priorities[cell] = priority
+            heapq.heappush(self._heap, (-priority, cell))
+    
+    def pop(self, n: int) -> np.ndarray:
+        """Retire jusqu'à n cellules de plus forte priorité"""
+        cells = []
+        heap = self._heap
+        while heap and len(cells) < n:
+            priority, cell = heapq.heappop(heap)
+            if self.priorities[cell] == -priority:
+                self.priorities[cell] = 0.0
+                cells.append(cell)
+        return np.array(cells, dtype=np.int64)
+
+
+def test_prioritized_sweeping():
+    """Vérifie l'index des prédécesseurs, l'ordre du tas et la convergence du balayage"""
+    from src.q_learning_agent import QLearningAgent
+    from src.value_iteration import value_iteration
+    
+    print("🧪 TEST DU BALAYAGE PRIORITAIRE\n")
+    
+    sweeper = PrioritizedSweeping(4, 2, threshold=0.1)
+    sweeper.observe(np.array([0, 0, 1, 2]), np.array([1, 1, 0, 1]), np.zeros(4),
+                    np.array([1, 1, 1, 3]), np.zeros(4, dtype=bool))
+    assert sweeper.predecessors == {1: [1, 2], 3: [5]}
+    assert np.array_equal(sweeper.predecessor_cells(np.array([3, 1, 1])), [1, 2, 5])
+    print("[OK] Index des prédécesseurs sans doublon")
+    
+    sweeper.push(np.array([1, 2, 5]), np.array([0.5, -2.0, 0.05]))
+    sweeper.push(np.array([1]), np.array([1.0]))
+    assert len(sweeper) == 2
+    assert np.array_equal(sweeper.pop(3), [2, 1])
+    assert len(sweeper) == 0 and len(sweeper.pop(1)) == 0
+    print("[OK] Tas par priorité décroissante (seuil, remontée, entrées périmées ignorées)")
+    
+    # Chaîne déterministe observée une fois : le balayage atteint Q*
+    n_chain = 8
+    chain_next = np.stack([np.maximum(np.arange(n_chain) - 1, 0),
+                           np.minimum(np.arange(n_chain) + 1, n_chain - 1)], axis=1)
+    chain_rewards = np.where(chain_next == n_chain - 1, 1.0, -0.1)
+    chain_terminals = chain_next == n_chain - 1
+    q_star, _ = value_iteration(chain_next, chain_rewards, chain_terminals, 0.9)
+    
+    agent = QLearningAgent(n_chain, 2, discount_factor=0.9)
+    agent.enable_sweeping(budget=0, threshold=1e-10, n_next_samples=1)
+    cells = np.arange(n_chain * 2)
+    agent.sweeper.observe(cells // 2, cells % 2, chain_rewards.ravel(),
+                          chain_next.ravel(), chain_terminals.ravel())
+    agent.sweeper.push(cells, agent._model_bellman_errors(cells))
+    n_updates = agent.sweep(10000)
+    assert n_updates < 10000 and len(agent.sweeper) == 0
+    assert np.allclose(agent.q_table, q_star, atol=1e-8)
+    print(f"[OK] Tas vidé après {n_updates} sauvegardes : Q = Q* de l'itération sur les valeurs")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_prioritized_sweeping()
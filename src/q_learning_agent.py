@@ -1,8 +1,107 @@
 import numpy as np
+import gymnasium as gym
 import matplotlib.pyplot as plt
-from typing import Tuple, List
+from typing import Tuple, List, Dict, Any, Optional, Union
 import pickle
 import os
+import time
+from src.vectorized_taxi import VectorizedTaxiEnv
+from src.q_table_checkpoint import save_q_checkpoint, load_q_checkpoint, load_training_history
+from src.value_iteration import solve_model, distance_to_optimal
+from src.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from src.tabular_model import TabularModel
+from src.prioritized_sweeping import PrioritizedSweeping
+from src.eligibility_traces import EligibilityTraces
+from src.offline_training import TransitionDataset, fitted_q_iteration
+
+
+def apply_td_targets(q_table: np.ndarray, states: np.ndarray, actions: np.ndarray,
+                     targets: np.ndarray, learning_rate,
+                     collision: str = 'sequential'):
+    """
+    Applique Q(s, a) += lr * (cible - Q(s, a)) à un lot de cellules, sur place
+    
+    Args:
+        q_table: Q-table à modifier
+        states: États discrets
+        actions: Actions
+        targets: Cibles TD (figées pour tout le lot)
+        learning_rate: Taux d'apprentissage, scalaire ou un par élément du lot
+                       (ex: lr * poids d'importance du rejeu prioritaire), dans [0, 1)
+        collision: 'sequential' (ordre du lot) ou 'sum' (accumulation np.add.at)
+    """
+    if len(states) == 0:
+        return
+    
+    if collision == 'sum':
+        td_errors = targets - q_table[states, actions]
+        np.add.at(q_table, (states, actions), np.asarray(learning_rate) * td_errors)
+        return
+    
+    if collision != 'sequential':
+        raise ValueError(f"Mode de collision inconnu: {collision}")
+    
+    # Regroupement des cellules identiques en conservant l'ordre du lot
+    n_actions = q_table.shape[1]
+    cells = states * n_actions + actions
+    order = np.argsort(cells, kind='stable')
+    sorted_cells = cells[order]
+    
+    is_first = np.ones(len(cells), dtype=bool)
+    is_first[1:] = sorted_cells[1:] != sorted_cells[:-1]
+    group = np.cumsum(is_first) - 1
+    starts = np.flatnonzero(is_first)
+    counts = np.diff(np.append(starts, len(cells)))
+    rank = np.arange(len(cells)) - starts[group]
+    
+    unique_cells = sorted_cells[starts]
+    cell_states = unique_cells // n_actions
+    cell_actions = unique_cells % n_actions
+    
+    if np.ndim(learning_rate) == 0:
+        # k mises à jour successives d'une cellule avec des cibles figées:
+        # q_k = (1-lr)^k q_0 + sum_j lr (1-lr)^(k-1-j) cible_j
+        decay = 1.0 - learning_rate
+        weights = learning_rate * decay ** (counts[group] - 1 - rank)
+        cell_decay = decay ** counts
+    else:
+        # Taux par élément: q_k = prod_j (1-lr_j) q_0 + sum_j lr_j prod_{i>j} (1-lr_i) cible_j,
+        # produits calculés par sommes cumulées de log(1 - lr) dans chaque groupe
+        rates = np.asarray(learning_rate, dtype=np.float64)[order]
+        log_decay = np.cumsum(np.log1p(-rates))
+        ends = starts + counts - 1
+        before_group = log_decay[starts] - np.log1p(-rates[starts])
+        weights = rates * np.exp(log_decay[ends][group] - log_decay)
+        cell_decay = np.exp(log_decay[ends] - before_group)
+    contributions = np.bincount(group, weights=weights * targets[order], minlength=len(starts))
+    q_table[cell_states, cell_actions] = (cell_decay * q_table[cell_states, cell_actions]
+                                          + contributions)
+
+
+def _final_observations(next_observations: np.ndarray, infos: Dict[str, Any]) -> np.ndarray:
+    """
+    Observations suivantes d'un pas de VectorEnv en autoreset "même pas"
+    
+    Les sous-environnements finis renvoient l'observation de reset ; leur vraie
+    observation finale est dans infos ("final_observation" en Gymnasium 0.29,
+    "final_obs" en 1.x), avec le masque "_final_observation" / "_final_obs".
+    
+    Args:
+        next_observations: Observations renvoyées par env.step
+        infos: Dictionnaire d'infos de env.step
+        
+    Returns:
+        Copie de next_observations où les sous-environnements finis portent
+        leur observation finale
+    """
+    for key in ("final_observation", "final_obs"):
+        if key in infos:
+            observations = np.array(next_observations, copy=True)
+            for i in np.flatnonzero(infos[f"_{key}"]):
+                observations[i] = infos[key][i]
+            return observations
+    return next_observations
+
 
 class QLearningAgent:
     """
@@ -43,6 +142,33 @@ class QLearningAgent:
         self.training_episodes = []
         self.epsilons = []
         
+        # Référence optimale (Q*) pour mesurer l'écart pendant l'entraînement
+        self.q_star: Optional[np.ndarray] = None
+        self.optimal_reference_states: Optional[np.ndarray] = None
+        self.optimality_history = []
+        
+        # Mémoire de rejeu (désactivée par défaut, voir enable_replay)
+        self.replay_buffer: Optional[ReplayBuffer] = None
+        self.replay_batch_size = 64
+        self.replay_updates = 1
+        self.replay_start = 1000
+        
+        # Planification Dyna-Q (désactivée par défaut, voir enable_dyna)
+        self.dyna_model: Optional[TabularModel] = None
+        self.planning_steps = 0
+        self.planning_updates = 0
+        self.planning_time = 0.0
+        
+        # Balayage prioritaire (désactivé par défaut, voir enable_sweeping)
+        self.sweeper: Optional[PrioritizedSweeping] = None
+        self.sweep_budget = 0
+        self.sweep_batch_size = 1
+        self.sweep_learning_rate = 1.0
+        
+        # Traces d'éligibilité Q(lambda) (désactivées par défaut, voir enable_traces)
+        self.traces: Optional[EligibilityTraces] = None
+        self.trace_lambda = 0.0
+        
     def select_action(self, state: int, training: bool = True) -> int:
         """
         Sélectionne une action selon la politique epsilon-greedy
@@ -59,7 +185,42 @@ class QLearningAgent:
             return np.random.randint(0, self.n_actions)
         else:
             # Exploitation : meilleure action selon Q-table
-            return np.argmax(self.q_table[state])
+            return np.argmax(self._q_values(state))
+    
+    def _q_values(self, states) -> np.ndarray:
+        """Valeurs Q(s, ·) d'états issus de process_state(s)"""
+        return self.q_table[states]
+    
+    def process_states(self, observations: np.ndarray) -> np.ndarray:
+        """
+        Convertit un lot d'observations en indices d'états de la Q-table
+        
+        Args:
+            observations: Observations brutes de l'environnement
+            
+        Returns:
+            Indices d'états discrets
+        """
+        return np.asarray(observations, dtype=np.int64)
+    
+    def select_actions(self, states: np.ndarray, training: bool = True) -> np.ndarray:
+        """
+        Version vectorisée de select_action pour un lot d'états
+        
+        Args:
+            states: Indices d'états discrets
+            training: Si True, utilise epsilon-greedy, sinon greedy
+            
+        Returns:
+            Actions à prendre pour chaque état
+        """
+        greedy_actions = np.argmax(self._q_values(states), axis=1)
+        if not training:
+            return greedy_actions
+        
+        explore = np.random.random(len(greedy_actions)) < self.epsilon
+        random_actions = np.random.randint(0, self.n_actions, size=len(greedy_actions))
+        return np.where(explore, random_actions, greedy_actions)
     
     def update_q_table(self, state: int, action: int, reward: float, 
                       next_state: int, done: bool):
@@ -73,6 +234,10 @@ class QLearningAgent:
             next_state: État suivant
             done: Si l'épisode est terminé
         """
+        if self.traces is not None:
+            self._update_q_lambda(state, action, reward, next_state, done)
+            return
+        
         if done:
             target = reward
         else:
@@ -81,6 +246,320 @@ class QLearningAgent:
         # Mise à jour Q-Learning
         self.q_table[state, action] += self.lr * (target - self.q_table[state, action])
     
+    def enable_traces(self, lam: float = 0.9, mode: str = 'sparse',
+                      min_trace: float = 1e-2, replacing: bool = True):
+        """
+        Active Q(lambda) de Watkins pour update_q_table (boucles d'entraînement pas à pas)
+        
+        L'erreur TD de chaque pas est appliquée à toutes les cellules de trace
+        non nulle : la récompense d'un succès remonte toute la trajectoire
+        récente au lieu d'une cellule par épisode. Les traces décroissent de
+        gamma * lambda par pas et sont coupées après une action exploratoire.
+        
+        Args:
+            lam: Paramètre lambda (0 : Q-Learning à un pas)
+            mode: 'sparse' (ensemble actif, coût borné par min_trace) ou 'dense'
+            min_trace: Seuil de troncature des traces
+            replacing: Traces de remplacement (recommandé en tabulaire)
+        """
+        self.traces = EligibilityTraces(self.q_table.shape, mode, min_trace, replacing)
+        self.trace_lambda = lam
+    
+    def disable_traces(self):
+        """Revient au Q-Learning à un pas"""
+        self.traces = None
+        self.trace_lambda = 0.0
+    
+    def _update_q_lambda(self, state: int, action: int, reward: float,
+                         next_state: int, done: bool):
+        """Un pas de Q(lambda) de Watkins (mêmes arguments que update_q_table)"""
+        traces = self.traces
+        q_values = self.q_table[state]
+        if q_values[action] < q_values.max():
+            # Action exploratoire : la suite ne suit plus la politique greedy
+            traces.reset()
+        
+        if done:
+            target = reward
+        else:
+            target = reward + self.gamma * np.max(self.q_table[next_state])
+        td_error = target - self.q_table[state, action]
+        
+        traces.visit(state, action)
+        traces.apply(self.q_table, self.lr * td_error)
+        if done:
+            traces.reset()
+        else:
+            traces.decay(self.gamma * self.trace_lambda)
+    
+    def batch_update_q_table(self, states: np.ndarray, actions: np.ndarray,
+                             rewards: np.ndarray, next_states: np.ndarray,
+                             dones: np.ndarray, collision: str = 'sequential',
+                             weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Met à jour la Q-table avec un lot de transitions (environnements parallèles)
+        
+        Les cibles r + gamma * max Q(s') sont toutes calculées sur la Q-table
+        avant la mise à jour, puis appliquées en une seule opération vectorisée.
+        
+        Args:
+            states: États discrets
+            actions: Actions prises
+            rewards: Récompenses reçues
+            next_states: États suivants discrets
+            dones: Indicateurs de fin d'épisode
+            collision: Traitement des cellules (s, a) répétées dans le lot
+                - 'sequential': équivaut à appliquer les mises à jour une par une
+                  dans l'ordre du lot (cibles figées)
+                - 'sum': somme des incréments TD via np.add.at
+            weights: Poids par transition multipliant le taux d'apprentissage
+                     (poids d'importance du rejeu prioritaire)
+        
+        Returns:
+            Erreurs TD (cible - Q(s, a)) avant la mise à jour
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        dones = np.asarray(dones, dtype=bool)
+        
+        bootstrap = np.max(self.q_table[next_states], axis=1)
+        targets = np.asarray(rewards, dtype=np.float64) + self.gamma * bootstrap * ~dones
+        td_errors = targets - self.q_table[states, actions]
+        
+        learning_rate = self.lr if weights is None else self.lr * np.asarray(weights, dtype=np.float64)
+        apply_td_targets(self.q_table, states, actions, targets, learning_rate, collision)
+        return td_errors
+    
+    def _augment_rewards(self, states: np.ndarray, actions: np.ndarray,
+                         rewards: np.ndarray) -> np.ndarray:
+        """Récompenses utilisées par les mises à jour (sans bonus pour l'agent de base)"""
+        return rewards
+    
+    def enable_replay(self, capacity: int = 50000, batch_size: int = 64,
+                      updates_per_step: int = 1, start_size: int = 1000,
+                      prioritized: bool = False, alpha: float = 0.6, beta: float = 0.4,
+                      seed: Optional[int] = None):
+        """
+        Active la mémoire de rejeu pour train (et les boucles par lots)
+        
+        Chaque transition réelle est stockée, puis updates_per_step mini-lots
+        sont tirés et appliqués par batch_update_q_table après chaque pas
+        d'environnement (chaque pas d'un lot parallèle compte pour un).
+        
+        Args:
+            capacity: Taille de la mémoire circulaire
+            batch_size: Transitions par mini-lot
+            updates_per_step: Mini-lots rejoués par pas d'environnement
+            start_size: Transitions à accumuler avant le premier rejeu
+            prioritized: Rejeu prioritaire par erreur TD (sinon uniforme)
+            alpha: Exposant des priorités (rejeu prioritaire)
+            beta: Correction d'importance (rejeu prioritaire)
+            seed: Graine de l'échantillonnage
+        """
+        if prioritized:
+            self.replay_buffer = PrioritizedReplayBuffer(capacity, alpha, beta, seed=seed)
+        else:
+            self.replay_buffer = ReplayBuffer(capacity, seed=seed)
+        self.replay_batch_size = batch_size
+        self.replay_updates = updates_per_step
+        self.replay_start = max(start_size, batch_size)
+    
+    def disable_replay(self):
+        """Désactive (et libère) la mémoire de rejeu"""
+        self.replay_buffer = None
+    
+    def replay(self, n_batches: int = 1) -> int:
+        """
+        Rejoue n_batches mini-lots de la mémoire
+        
+        Les observations sont converties par process_states au moment du rejeu.
+        
+        Returns:
+            Nombre de transitions rejouées
+        """
+        buffer = self.replay_buffer
+        if buffer is None or len(buffer) < self.replay_start:
+            return 0
+        
+        for _ in range(n_batches):
+            indices, batch, weights = buffer.sample(self.replay_batch_size)
+            observations, actions, rewards, next_observations, dones = batch
+            td_errors = self.batch_update_q_table(self.process_states(observations), actions, rewards,
+                                                  self.process_states(next_observations), dones,
+                                                  weights=weights)
+            buffer.update_priorities(indices, td_errors)
+        return n_batches * self.replay_batch_size
+    
+    def enable_dyna(self, planning_steps: int = 10, n_next_samples: int = 16,
+                    seed: Optional[int] = None):
+        """
+        Active la planification Dyna-Q pour train (et les boucles par lots)
+        
+        Un modèle tabulaire apprend (r, s', fin) de chaque transition réelle ;
+        après chaque pas réel, planning_steps cellules déjà observées sont tirées
+        et mises à jour à partir du modèle, en un seul appel vectorisé.
+        
+        Args:
+            planning_steps: Mises à jour simulées par transition réelle
+            n_next_samples: États suivants mémorisés par cellule (1 : modèle
+                            déterministe, suffisant pour Taxi ; voir TabularModel)
+            seed: Graine du tirage des cellules
+        """
+        self.dyna_model = TabularModel(self.n_states, self.n_actions, n_next_samples, seed)
+        self.planning_steps = planning_steps
+        self.planning_updates = 0
+        self.planning_time = 0.0
+    
+    def disable_dyna(self):
+        """Désactive la planification (et libère le modèle)"""
+        self.dyna_model = None
+        self.planning_steps = 0
+    
+    def plan(self, n_updates: int) -> int:
+        """
+        Applique n_updates mises à jour Q-Learning simulées par le modèle
+        
+        Returns:
+            Nombre de mises à jour effectuées
+        """
+        model = self.dyna_model
+        if model is None or model.n_observed == 0 or n_updates <= 0:
+            return 0
+        
+        start = time.perf_counter()
+        self.batch_update_q_table(*model.sample(n_updates))
+        self.planning_time += time.perf_counter() - start
+        self.planning_updates += n_updates
+        return n_updates
+    
+    def enable_sweeping(self, budget: int = 10, batch_size: int = 1,
+                        learning_rate: float = 1.0, threshold: float = 1e-4,
+                        n_next_samples: int = 16, seed: Optional[int] = None):
+        """
+        Active le balayage prioritaire pour train (et les boucles par lots)
+        
+        Chaque transition réelle met à jour un modèle tabulaire et l'index des
+        prédécesseurs ; la cellule observée entre dans le tas avec son erreur de
+        Bellman, puis au plus budget sauvegardes (par transition réelle) sont
+        appliquées aux cellules les plus prioritaires, dont les prédécesseurs
+        sont reclassés. Une récompense rare (arrivée au sommet) remonte ainsi
+        la chaîne des états qui y mènent sans attendre de nouveaux épisodes.
+        
+        Args:
+            budget: Sauvegardes maximales par transition réelle
+            batch_size: Cellules retirées du tas et mises à jour ensemble (1 :
+                        balayage strictement par priorité décroissante)
+            learning_rate: Taux des sauvegardes sur le modèle (1 : sauvegarde complète)
+            threshold: Erreur de Bellman minimale pour entrer dans le tas
+            n_next_samples: États suivants mémorisés par cellule (voir TabularModel)
+            seed: Graine du modèle
+        """
+        self.sweeper = PrioritizedSweeping(self.n_states, self.n_actions, threshold,
+                                           n_next_samples, seed)
+        self.sweep_budget = budget
+        self.sweep_batch_size = batch_size
+        self.sweep_learning_rate = learning_rate
+        self.planning_updates = 0
+        self.planning_time = 0.0
+    
+    def disable_sweeping(self):
+        """Désactive le balayage prioritaire (et libère le modèle)"""
+        self.sweeper = None
+        self.sweep_budget = 0
+    
+    def _model_bellman_errors(self, cells: np.ndarray) -> np.ndarray:
+        """Erreurs de Bellman des cellules sous le modèle du balayage"""
+        model = self.sweeper.model
+        states = cells // self.n_actions
+        actions = cells % self.n_actions
+        rewards = self._augment_rewards(states, actions, model.mean_rewards(states, actions))
+        return self.sweeper.bellman_errors(self.q_table, cells, self.gamma, rewards)
+    
+    def sweep(self, budget: int) -> int:
+        """
+        Applique au plus budget sauvegardes par ordre de priorité décroissante
+        
+        Returns:
+            Nombre de sauvegardes effectuées (moins que budget si le tas se vide)
+        """
+        sweeper = self.sweeper
+        if sweeper is None or budget <= 0:
+            return 0
+        
+        start = time.perf_counter()
+        n_updates = 0
+        while n_updates < budget:
+            cells = sweeper.pop(min(self.sweep_batch_size, budget - n_updates))
+            if len(cells) == 0:
+                break
+            states = cells // self.n_actions
+            self.q_table[states, cells % self.n_actions] += (self.sweep_learning_rate
+                                                             * self._model_bellman_errors(cells))
+            n_updates += len(cells)
+            
+            predecessors = sweeper.predecessor_cells(states)
+            if len(predecessors):
+                sweeper.push(predecessors, self._model_bellman_errors(predecessors))
+        
+        self.planning_time += time.perf_counter() - start
+        self.planning_updates += n_updates
+        return n_updates
+    
+    @property
+    def planning_rate(self) -> float:
+        """Mises à jour de planification par seconde (0 avant la première)"""
+        return self.planning_updates / self.planning_time if self.planning_time > 0 else 0.0
+    
+    @property
+    def uses_planning(self) -> bool:
+        """True si Dyna-Q ou le balayage prioritaire est activé"""
+        return self.dyna_model is not None or self.sweeper is not None
+    
+    def planning_report(self) -> str:
+        """Résumé de la planification (Dyna-Q et/ou balayage prioritaire)"""
+        methods = []
+        n_cells = 0
+        if self.dyna_model is not None:
+            methods.append("Dyna-Q")
+            n_cells = self.dyna_model.n_observed
+        if self.sweeper is not None:
+            methods.append("balayage prioritaire")
+            n_cells = max(n_cells, self.sweeper.model.n_observed)
+        return (f"[INFO] Planification {' + '.join(methods)}: {self.planning_updates} mises à jour "
+                f"simulées ({self.planning_rate:,.0f}/s), {n_cells} cellules (s, a) modélisées")
+    
+    @property
+    def observes_transitions(self) -> bool:
+        """True si les transitions réelles alimentent une mémoire de rejeu ou un modèle"""
+        return self.replay_buffer is not None or self.uses_planning
+    
+    def _observe_transitions(self, observations, actions, rewards, next_observations, dones):
+        """
+        Transmet des transitions réelles (déjà appliquées à la Q-table) à la mémoire
+        de rejeu et aux modèles (Dyna-Q, balayage prioritaire), puis rejoue / planifie
+        
+        dones ne doit marquer que les fins réelles (terminated) : une troncature
+        par limite de temps enregistrée comme état terminal créerait, dans le
+        modèle, des cellules absorbantes à récompense -1 plus attractives que
+        la vraie valeur de l'état.
+        """
+        if self.replay_buffer is not None:
+            self.replay_buffer.add_batch(observations, actions, rewards, next_observations, dones)
+            self.replay(self.replay_updates)
+        
+        if not self.uses_planning:
+            return
+        states = self.process_states(np.asarray(observations))
+        next_states = self.process_states(np.asarray(next_observations))
+        if self.dyna_model is not None:
+            self.dyna_model.update(states, actions, rewards, next_states, dones)
+            self.plan(self.planning_steps * len(states))
+        if self.sweeper is not None:
+            self.sweeper.observe(states, actions, rewards, next_states, dones)
+            cells = np.unique(states * self.n_actions + np.asarray(actions, dtype=np.int64))
+            self.sweeper.push(cells, self._model_bellman_errors(cells))
+            self.sweep(self.sweep_budget * len(states))
+    
     def decay_epsilon(self):
         """Réduit epsilon après chaque épisode"""
         self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
@@ -97,6 +576,18 @@ class QLearningAgent:
         Returns:
             Liste des récompenses par épisode
         """
+        if isinstance(env, VectorizedTaxiEnv):
+            episode_rewards, _, _ = self._run_batched_episodes(
+                env, episodes, max_steps, training=True, report_every=1000
+            )
+            self.training_rewards = episode_rewards
+            return episode_rewards
+        
+        if isinstance(env, gym.vector.VectorEnv):
+            episode_rewards, _, _ = self._run_vector_env_episodes(env, episodes, report_every=1000)
+            self.training_rewards = episode_rewards
+            return episode_rewards
+        
         episode_rewards = []
         
         for episode in range(episodes):
@@ -112,6 +603,8 @@ class QLearningAgent:
                 
                 # Mise à jour de la Q-table
                 self.update_q_table(state, action, reward, next_state, done)
+                if self.observes_transitions:
+                    self._observe_transitions([state], [action], [reward], [next_state], [terminated])
                 
                 state = next_state
                 total_reward += reward
@@ -131,11 +624,289 @@ class QLearningAgent:
                 avg_reward = np.mean(episode_rewards[-100:])
                 print(f"Épisode {episode + 1}/{episodes}, "
                       f"Récompense moyenne (100 derniers): {avg_reward:.2f}, "
-                      f"Epsilon: {self.epsilon:.3f}")
+                      f"Epsilon: {self.epsilon:.3f}{self._optimality_report(episode + 1)}")
         
         self.training_rewards = episode_rewards
+        if self.uses_planning:
+            print(self.planning_report())
         return episode_rewards
     
+    def _run_batched_episodes(self, env, episodes: int, max_steps: int,
+                              training: bool, report_every: int = 1000,
+                              verbose: bool = True) -> Tuple[List[float], List[int], int]:
+        """
+        Joue des épisodes par lots sur un moteur vectorisé (VectorizedTaxiEnv...)
+        
+        Les épisodes d'un même lot avancent en parallèle avec le même epsilon,
+        qui est ensuite décru une fois par épisode terminé.
+        
+        Args:
+            env: Moteur vectorisé (reset(n_envs) / step(actions))
+            episodes: Nombre total d'épisodes
+            max_steps: Nombre maximum de pas par épisode
+            training: Si True, exploration epsilon-greedy et mise à jour de la Q-table
+            report_every: Fréquence d'affichage du progrès (en épisodes)
+            verbose: Afficher le progrès
+            
+        Returns:
+            Tuple (récompenses par épisode, longueurs des épisodes, nombre de succès)
+        """
+        episode_rewards = []
+        episode_lengths = []
+        success_count = 0
+        batch_size = env.n_envs
+        
+        while len(episode_rewards) < episodes:
+            n = min(batch_size, episodes - len(episode_rewards))
+            observations = env.reset(n)
+            states = self.process_states(observations)
+            
+            total_rewards = np.zeros(n)
+            lengths = np.zeros(n, dtype=np.int64)
+            active = np.ones(n, dtype=bool)
+            
+            for _ in range(max_steps):
+                actions = np.zeros(n, dtype=np.int64)
+                actions[active] = self.select_actions(states[active], training=training)
+                
+                next_observations, rewards, terminated, truncated = env.step(actions)
+                next_states = self.process_states(next_observations)
+                done = terminated | truncated
+                
+                if training:
+                    self.batch_update_q_table(states[active], actions[active], rewards[active],
+                                              next_states[active], done[active])
+                    if self.observes_transitions:
+                        self._observe_transitions(observations[active], actions[active], rewards[active],
+                                                  next_observations[active], terminated[active])
+                
+                total_rewards += rewards
+                lengths += active
+                success_count += int(np.count_nonzero(terminated))
+                
+                active &= ~done
+                states = next_states
+                observations = next_observations
+                
+                if not active.any():
+                    break
+            
+            reported = len(episode_rewards) // report_every
+            episode_rewards.extend(total_rewards.tolist())
+            episode_lengths.extend(lengths.tolist())
+            
+            if training:
+                self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay ** n)
+                
+                if verbose and len(episode_rewards) // report_every > reported:
+                    self._print_batched_progress(episode_rewards, episodes, success_count)
+        
+        return episode_rewards, episode_lengths, success_count
+    
+    def _run_vector_env_episodes(self, env: gym.vector.VectorEnv, episodes: int,
+                                 report_every: int = 1000,
+                                 verbose: bool = True) -> Tuple[List[float], List[int], int]:
+        """
+        Entraîne l'agent sur un gymnasium.vector.VectorEnv (SyncVectorEnv, AsyncVectorEnv)
+        
+        Chaque sous-environnement a sa propre comptabilité d'épisode; epsilon est
+        décru à chaque épisode terminé. La durée des épisodes est bornée par le
+        TimeLimit des sous-environnements. Les deux modes d'autoreset de Gymnasium
+        sont gérés: même pas (0.29, l'état suivant d'un épisode fini est lu dans
+        infos["final_observation"]) et pas suivant (1.x, transition de reset ignorée).
+        
+        Args:
+            env: Environnement vectorisé Gymnasium
+            episodes: Nombre d'épisodes terminés à atteindre
+            report_every: Fréquence d'affichage du progrès (en épisodes)
+            verbose: Afficher le progrès
+            
+        Returns:
+            Tuple (récompenses par épisode, longueurs des épisodes, nombre de succès)
+        """
+        autoreset_mode = env.metadata.get("autoreset_mode")
+        autoreset_mode = getattr(autoreset_mode, "value", autoreset_mode)
+        if autoreset_mode not in (None, "NextStep", "SameStep"):
+            raise ValueError(f"Mode d'autoreset non supporté: {autoreset_mode}")
+        next_step_reset = autoreset_mode == "NextStep"
+        
+        n_envs = env.num_envs
+        observations, _ = env.reset()
+        states = self.process_states(observations)
+        
+        total_rewards = np.zeros(n_envs)
+        lengths = np.zeros(n_envs, dtype=np.int64)
+        resetting = np.zeros(n_envs, dtype=bool)
+        
+        episode_rewards = []
+        episode_lengths = []
+        success_count = 0
+        
+        while len(episode_rewards) < episodes:
+            actions = self.select_actions(states, training=True)
+            next_observations, rewards, terminated, truncated, infos = env.step(actions)
+            next_states = self.process_states(next_observations)
+            dones = np.logical_or(terminated, truncated)
+            
+            # En mode "même pas", next_observations contient déjà le reset des
+            # sous-environnements finis : la transition se termine sur l'observation finale
+            final_observations, final_states = next_observations, next_states
+            if not next_step_reset and dones.any():
+                final_observations = _final_observations(next_observations, infos)
+                final_states = self.process_states(final_observations)
+            
+            # En mode "pas suivant", le pas qui suit une fin d'épisode n'est qu'un reset
+            valid = ~resetting
+            self.batch_update_q_table(states[valid], actions[valid], rewards[valid],
+                                      final_states[valid], dones[valid])
+            if self.observes_transitions:
+                self._observe_transitions(observations[valid], actions[valid], rewards[valid],
+                                          final_observations[valid], terminated[valid])
+            
+            total_rewards[valid] += rewards[valid]
+            lengths[valid] += 1
+            
+            for i in np.flatnonzero(dones & valid):
+                episode_rewards.append(float(total_rewards[i]))
+                episode_lengths.append(int(lengths[i]))
+                success_count += int(terminated[i])
+                total_rewards[i] = 0
+                lengths[i] = 0
+                
+                self.decay_epsilon()
+                
+                if verbose and len(episode_rewards) % report_every == 0:
+                    self._print_batched_progress(episode_rewards, episodes, success_count)
+                
+                if len(episode_rewards) >= episodes:
+                    break
+            
+            resetting = dones & valid if next_step_reset else resetting
+            states = next_states
+            observations = next_observations
+        
+        return episode_rewards, episode_lengths, success_count
+    
+    def _print_batched_progress(self, episode_rewards: List[float], episodes: int,
+                                success_count: int):
+        """Affiche le progrès d'un entraînement par lots"""
+        avg_reward = np.mean(episode_rewards[-100:])
+        success_rate = (success_count / len(episode_rewards)) * 100
+        print(f"Épisode {len(episode_rewards)}/{episodes}, "
+              f"Récompense moyenne (100 derniers): {avg_reward:.2f}, "
+              f"Epsilon: {self.epsilon:.3f}, "
+              f"Succès: {success_rate:.1f}%{self._optimality_report(len(episode_rewards))}")
+    
+    def _optimality_report(self, episode: int) -> str:
+        """Enregistre l'écart à Q* (si une référence est définie) et le formate pour l'affichage"""
+        if self.q_star is None:
+            return ""
+        
+        distance = self.distance_to_optimal()
+        self.optimality_history.append((episode, distance))
+        return (f", Écart à Q*: {distance['max_q_error']:.3f}, "
+                f"Actions optimales: {distance['policy_agreement']*100:.1f}%")
+    
+    def warm_start(self, q_table: np.ndarray):
+        """
+        Initialise la Q-table à partir d'une table existante (ex: Q* ou un autre agent)
+        
+        Args:
+            q_table: Q-table de forme (n_states, n_actions)
+        """
+        q_table = np.asarray(q_table, dtype=np.float64)
+        if q_table.shape != self.q_table.shape:
+            raise ValueError(f"Q-table de forme {q_table.shape} incompatible avec l'agent "
+                             f"{self.q_table.shape}")
+        self.q_table = q_table.copy()
+        print(f"[OK] Q-table initialisée (warm start)")
+    
+    def warm_start_from_model(self, env=None, method: str = 'value') -> np.ndarray:
+        """
+        Calcule Q* à partir de la table de transitions de Taxi-v3 et l'utilise
+        comme initialisation et comme référence d'optimalité
+        
+        Args:
+            env: VectorizedTaxiEnv ou environnement Taxi-v3 (créé si None)
+            method: 'value' (itération sur les valeurs) ou 'policy' (itération sur les politiques)
+            
+        Returns:
+            Q* calculée
+        """
+        engine = env if isinstance(env, VectorizedTaxiEnv) else VectorizedTaxiEnv(env)
+        q_star = solve_model(engine, self.gamma, method)
+        
+        self.warm_start(q_star)
+        self.set_optimal_reference(q_star, engine.reachable_states())
+        return q_star
+    
+    def fit_offline(self, trajectories: Union[str, list, TransitionDataset],
+                    time_limit: Optional[int] = 200, tol: float = 1e-6,
+                    max_iterations: int = 1000) -> int:
+        """
+        Remplace la Q-table par l'itération Q hors ligne sur des trajectoires déjà collectées
+        
+        Les observations continues sont discrétisées par process_states et la
+        récompense est complétée par _augment_rewards (r̂ des agents PbRL
+        lorsqu'un modèle de récompense a été ajusté). La Q-table courante sert
+        de point de départ et de valeur des états absents du jeu.
+        
+        Args:
+            trajectories: Chemin d'un pickle de trajectoires, liste de trajectoires
+                          ou TransitionDataset déjà chargé
+            time_limit: Longueur maximale d'épisode (fins à ce pas = troncatures)
+            tol: Critère d'arrêt sur la variation maximale de Q
+            max_iterations: Nombre maximum d'itérations
+            
+        Returns:
+            Nombre d'itérations effectuées
+        """
+        if isinstance(trajectories, TransitionDataset):
+            dataset = trajectories
+        elif isinstance(trajectories, str):
+            dataset = TransitionDataset.load(trajectories, self.process_states, time_limit)
+        else:
+            dataset = TransitionDataset.from_trajectories(trajectories, self.process_states, time_limit)
+        
+        reward_bonus = self._augment_rewards(np.arange(self.n_states)[:, None],
+                                             np.arange(self.n_actions)[None, :],
+                                             np.zeros(self.q_table.shape))
+        self.q_table, n_iterations = fitted_q_iteration(dataset, self.n_states, self.n_actions,
+                                                        self.gamma, reward_bonus, self.q_table,
+                                                        tol, max_iterations)
+        
+        n_cells = len(np.unique(dataset.states * self.n_actions + dataset.actions))
+        print(f"[OK] Itération Q hors ligne: {len(dataset)} transitions ({dataset.n_episodes} épisodes), "
+              f"{n_cells} cellules (s, a), {n_iterations} itérations")
+        return n_iterations
+    
+    def set_optimal_reference(self, q_star: np.ndarray, states: Optional[np.ndarray] = None):
+        """
+        Définit Q* comme référence : l'écart est alors affiché pendant l'entraînement
+        
+        Args:
+            q_star: Q-table optimale
+            states: États sur lesquels mesurer l'écart (tous si None)
+        """
+        self.q_star = np.asarray(q_star, dtype=np.float64)
+        self.optimal_reference_states = states
+    
+    def distance_to_optimal(self, q_star: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Écart entre la Q-table courante et Q* (voir value_iteration.distance_to_optimal)
+        
+        Args:
+            q_star: Q-table optimale (référence définie par set_optimal_reference si None)
+            
+        Returns:
+            Dict (max_q_error, mean_q_error, policy_agreement, value_loss)
+        """
+        if q_star is None:
+            if self.q_star is None:
+                raise ValueError("Aucune référence Q* définie (voir set_optimal_reference)")
+            return distance_to_optimal(self.q_table, self.q_star, self.optimal_reference_states)
+        return distance_to_optimal(self.q_table, q_star)
+    
     def evaluate(self, env, episodes: int = 100, max_steps: int = 200, 
                 render: bool = False) -> Tuple[float, List[float]]:
         """
@@ -152,26 +923,31 @@ class QLearningAgent:
         """
         evaluation_rewards = []
         
-        for episode in range(episodes):
-            state, _ = env.reset()
-            total_reward = 0
-            steps = 0
-            
-            while steps < max_steps:
-                action = self.select_action(state, training=False)
-                state, reward, terminated, truncated, _ = env.step(action)
-                done = terminated or truncated
-                
-                total_reward += reward
-                steps += 1
+        if isinstance(env, VectorizedTaxiEnv):
+            evaluation_rewards, _, _ = self._run_batched_episodes(
+                env, episodes, max_steps, training=False
+            )
+        else:
+            for episode in range(episodes):
+                state, _ = env.reset()
+                total_reward = 0
+                steps = 0
                 
-                if render and episode < 5:  # Affiche seulement les 5 premiers épisodes
-                    env.render()
+                while steps < max_steps:
+                    action = self.select_action(state, training=False)
+                    state, reward, terminated, truncated, _ = env.step(action)
+                    done = terminated or truncated
+                    
+                    total_reward += reward
+                    steps += 1
+                    
+                    if render and episode < 5:  # Affiche seulement les 5 premiers épisodes
+                        env.render()
+                    
+                    if done:
+                        break
                 
-                if done:
-                    break
-            
-            evaluation_rewards.append(total_reward)
+                evaluation_rewards.append(total_reward)
         
         avg_reward = np.mean(evaluation_rewards)
         print(f"Évaluation sur {episodes} épisodes:")
@@ -181,6 +957,35 @@ class QLearningAgent:
         
         return avg_reward, evaluation_rewards
     
+    def evaluate_exact(self, env=None, max_steps: int = 200, verbose: bool = True) -> Dict[str, Any]:
+        """
+        Évaluation exacte et sans bruit de la politique greedy sur Taxi-v3
+        
+        Tous les états initiaux sont suivis en parallèle sur la table de transitions
+        (voir VectorizedTaxiEnv.evaluate_policy) au lieu d'échantillonner des épisodes.
+        
+        Args:
+            env: VectorizedTaxiEnv ou environnement Taxi-v3 (créé si None)
+            max_steps: Nombre maximum de pas par épisode
+            verbose: Si True, affiche le résumé
+            
+        Returns:
+            Dict (mean_reward, success_rate, mean_length, returns, lengths,
+            length_histogram, n_loops, looping_states)
+        """
+        engine = env if isinstance(env, VectorizedTaxiEnv) else VectorizedTaxiEnv(env)
+        report = engine.evaluate_policy(np.argmax(self.q_table, axis=1), max_steps)
+        
+        if verbose:
+            print(f"Évaluation exacte sur {len(report['start_states'])} états initiaux:")
+            print(f"Récompense moyenne: {report['mean_reward']:.2f}")
+            print(f"Taux de succès: {report['success_rate']*100:.1f}%")
+            print(f"Longueur moyenne: {report['mean_length']:.2f} pas")
+            if report['n_loops'] > 0:
+                print(f"[WARN] Politique en boucle depuis {report['n_loops']} états initiaux")
+        
+        return report
+    
     def plot_training_progress(self, save_path: str = None):
         """
         Trace les courbes d'apprentissage
@@ -254,4 +1059,115 @@ class QLearningAgent:
         self.q_table = save_data['q_table']
         self.training_rewards = save_data.get('training_rewards', [])
         
-        print(f"Agent chargé: {filepath}")
\ No newline at end of file
+        print(f"Agent chargé: {filepath}")
+    
+    def _checkpoint_metadata(self) -> Dict[str, Any]:
+        """Métadonnées écrites dans l'en-tête du checkpoint binaire"""
+        return {
+            'agent': type(self).__name__,
+            'hyperparameters': {
+                'lr': self.lr,
+                'gamma': self.gamma,
+                'epsilon': self.epsilon,
+                'epsilon_decay': self.epsilon_decay,
+                'epsilon_min': self.epsilon_min
+            }
+        }
+    
+    def _restore_checkpoint_metadata(self, metadata: Dict[str, Any]):
+        """Restaure l'état de l'agent à partir des métadonnées d'un checkpoint"""
+        hyperparameters = metadata.get('hyperparameters', {})
+        self.lr = hyperparameters.get('lr', self.lr)
+        self.gamma = hyperparameters.get('gamma', self.gamma)
+        self.epsilon = hyperparameters.get('epsilon', self.epsilon)
+        self.epsilon_decay = hyperparameters.get('epsilon_decay', self.epsilon_decay)
+        self.epsilon_min = hyperparameters.get('epsilon_min', self.epsilon_min)
+    
+    def save_checkpoint(self, filepath: str, save_history: bool = True):
+        """
+        Sauvegarde l'agent au format binaire compact (voir q_table_checkpoint)
+        
+        Args:
+            filepath: Chemin du checkpoint
+            save_history: Si True, écrit aussi training_rewards dans un fichier annexe
+                          (False pour des checkpoints fréquents en cours d'entraînement)
+        """
+        save_q_checkpoint(filepath, self.q_table, self._checkpoint_metadata(),
+                          self.training_rewards if save_history else None)
+        print(f"Checkpoint sauvegardé: {filepath}")
+    
+    def load_checkpoint(self, filepath: str, mmap_mode: Optional[str] = None, load_history: bool = False):
+        """
+        Charge un checkpoint binaire
+        
+        Args:
+            filepath: Chemin du checkpoint
+            mmap_mode: None (défaut) pour une Q-table en mémoire, modifiable par l'entraînement
+                       et les préférences ; 'c' pour une projection copie-sur-écriture ;
+                       'r' (sur demande) pour une projection en lecture seule sans copie,
+                       réservée aux rollouts greedy
+            load_history: Si True, charge aussi l'historique d'entraînement
+        """
+        q_table, metadata = load_q_checkpoint(filepath, mmap_mode)
+        self._restore_checkpoint_metadata(metadata)
+        
+        if q_table.shape != self.q_table.shape:
+            raise ValueError(f"Q-table de forme {q_table.shape} incompatible avec l'agent "
+                             f"{self.q_table.shape}")
+        
+        self.q_table = q_table
+        if load_history:
+            self.training_rewards = load_training_history(filepath)
+        
+        print(f"Checkpoint chargé: {filepath}")
+
+def test_apply_td_targets():
+    """Vérifie les mises à jour par lot contre la boucle transition par transition"""
+    print("🧪 TEST DES MISES À JOUR Q PAR LOT\n")
+    
+    rng = np.random.default_rng(0)
+    n_states, n_actions, batch = 6, 3, 200
+    q_initial = rng.normal(size=(n_states, n_actions))
+    # Peu de cellules pour un lot de 200 : nombreuses collisions
+    states = rng.integers(0, n_states, batch)
+    actions = rng.integers(0, n_actions, batch)
+    targets = rng.normal(size=batch)
+    
+    for learning_rate in (0.3, rng.uniform(0.05, 0.9, batch)):
+        rates = np.broadcast_to(learning_rate, (batch,))
+        expected = q_initial.copy()
+        for state, action, target, rate in zip(states, actions, targets, rates):
+            expected[state, action] += rate * (target - expected[state, action])
+        
+        q_table = q_initial.copy()
+        apply_td_targets(q_table, states, actions, targets, learning_rate, 'sequential')
+        assert np.allclose(q_table, expected)
+        
+        expected_sum = q_initial.copy()
+        for state, action, target, rate in zip(states, actions, targets, rates):
+            expected_sum[state, action] += rate * (target - q_initial[state, action])
+        q_table = q_initial.copy()
+        apply_td_targets(q_table, states, actions, targets, learning_rate, 'sum')
+        assert np.allclose(q_table, expected_sum)
+    print("[OK] 'sequential' identique à la boucle, 'sum' identique à l'accumulation")
+    
+    # batch_update_q_table : cibles figées sur la Q-table d'avant le lot
+    agent = QLearningAgent(n_states, n_actions, learning_rate=0.2, discount_factor=0.9)
+    agent.q_table = q_initial.copy()
+    next_states = rng.integers(0, n_states, batch)
+    rewards = rng.normal(size=batch)
+    dones = rng.random(batch) < 0.2
+    frozen = rewards + 0.9 * q_initial.max(axis=1)[next_states] * ~dones
+    expected = q_initial.copy()
+    for state, action, target in zip(states, actions, frozen):
+        expected[state, action] += 0.2 * (target - expected[state, action])
+    td_errors = agent.batch_update_q_table(states, actions, rewards, next_states, dones)
+    assert np.allclose(agent.q_table, expected)
+    assert np.allclose(td_errors, frozen - q_initial[states, actions])
+    print("[OK] batch_update_q_table conforme aux mises à jour successives à cibles figées")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_apply_td_targets()
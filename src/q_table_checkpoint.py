@@ -0,0 +1,125 @@
+"""
+Format de checkpoint binaire compact pour les Q-tables
+Un en-tête JSON court suivi du tableau brut, chargeable via np.memmap sans copie
+"""
+
+import json
+import os
+import struct
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"QTABLE01"
+HEADER_ALIGNMENT = 64
+HISTORY_SUFFIX = ".history.npy"
+
+
+def save_q_checkpoint(filepath: str, q_table: np.ndarray,
+                      metadata: Optional[Dict[str, Any]] = None,
+                      training_rewards: Optional[List[float]] = None):
+    """
+    Écrit une Q-table au format binaire (écriture atomique)
+    
+    Disposition du fichier:
+        MAGIC (8 octets) | taille de l'en-tête (uint32 LE) | en-tête JSON | données brutes
+    Les données commencent à un offset aligné sur 64 octets.
+    
+    Args:
+        filepath: Chemin du checkpoint
+        q_table: Q-table à sauvegarder
+        metadata: Paramètres du discrétiseur, hyperparamètres, etc. (sérialisables JSON)
+        training_rewards: Historique d'entraînement, écrit dans un fichier annexe
+    """
+    directory = os.path.dirname(filepath)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    q_table = np.ascontiguousarray(q_table)
+    header = {
+        'dtype': q_table.dtype.str,
+        'shape': list(q_table.shape),
+        'metadata': metadata or {}
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    
+    # Remplissage pour aligner le début des données
+    prefix_size = len(MAGIC) + 4 + len(header_bytes)
+    padding = (-prefix_size) % HEADER_ALIGNMENT
+    header_bytes += b" " * padding
+    
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(q_table.tobytes(order='C'))
+    os.replace(tmp_path, filepath)
+    
+    if training_rewards is not None:
+        history_tmp = filepath + ".history.tmp.npy"
+        np.save(history_tmp, np.asarray(training_rewards, dtype=np.float64))
+        os.replace(history_tmp, filepath + HISTORY_SUFFIX)
+
+
+def read_checkpoint_header(filepath: str) -> Dict[str, Any]:
+    """
+    Lit uniquement l'en-tête d'un checkpoint
+    
+    Args:
+        filepath: Chemin du checkpoint
+    
+    Returns:
+        Dictionnaire (dtype, shape, metadata, data_offset)
+    """
+    with open(filepath, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            raise ValueError(f"Format de checkpoint inconnu: {filepath}")
+        (header_size,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_size).decode('utf-8'))
+    
+    header['data_offset'] = len(MAGIC) + 4 + header_size
+    return header
+
+
+def load_q_checkpoint(filepath: str, mmap_mode: Optional[str] = 'r') -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Charge une Q-table depuis un checkpoint binaire
+    
+    Args:
+        filepath: Chemin du checkpoint
+        mmap_mode: Mode np.memmap ('r' lecture seule sans copie, 'r+', 'c'),
+                   ou None pour charger une copie en mémoire
+    
+    Returns:
+        Tuple (Q-table, métadonnées)
+    """
+    header = read_checkpoint_header(filepath)
+    dtype = np.dtype(header['dtype'])
+    shape = tuple(header['shape'])
+    
+    if mmap_mode is None:
+        with open(filepath, 'rb') as f:
+            f.seek(header['data_offset'])
+            q_table = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+    else:
+        q_table = np.memmap(filepath, dtype=dtype, mode=mmap_mode,
+                            offset=header['data_offset'], shape=shape)
+    
+    return q_table, header['metadata']
+
+
+def load_training_history(filepath: str) -> List[float]:
+    """
+    Charge l'historique d'entraînement associé à un checkpoint
+    
+    Args:
+        filepath: Chemin du checkpoint (pas du fichier annexe)
+    
+    Returns:
+        Liste des récompenses d'entraînement (vide si absente)
+    """
+    history_path = filepath + HISTORY_SUFFIX
+    if not os.path.exists(history_path):
+        return []
+    return np.load(history_path).tolist()
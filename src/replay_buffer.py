@@ -0,0 +1,241 @@
+"""
+Mémoire de rejeu (experience replay) en anneau sur tableaux NumPy préalloués
+Échantillonnage uniforme ou prioritaire (arbre de sommes vectorisé) de
+mini-lots appliqués par QLearningAgent.batch_update_q_table
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+Batch = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+class ReplayBuffer:
+    """
+    Mémoire circulaire de transitions (s, a, r, s', done)
+    
+    Les observations sont stockées brutes (indices Taxi, ou [position, vitesse]
+    continues pour MountainCar) : elles sont discrétisées au moment du rejeu,
+    ce qui garde la mémoire valide si la discrétisation change. Les tableaux
+    sont alloués au premier ajout, d'après la forme et le type des observations.
+    """
+    
+    def __init__(self, capacity: int, seed: Optional[int] = None):
+        """
+        Args:
+            capacity: Nombre maximal de transitions (les plus anciennes sont écrasées)
+            seed: Graine de l'échantillonnage
+        """
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+        self.size = 0
+        
+        self.observations = None
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float64)
+        self.next_observations = None
+        self.dones = np.zeros(capacity, dtype=bool)
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def _allocate(self, observations: np.ndarray):
+        shape = (self.capacity,) + observations.shape[1:]
+        dtype = np.float64 if np.issubdtype(observations.dtype, np.floating) else np.int64
+        self.observations = np.zeros(shape, dtype=dtype)
+        self.next_observations = np.zeros(shape, dtype=dtype)
+    
+    def add(self, observation, action: int, reward: float, next_observation, done: bool):
+        """Ajoute une transition"""
+        self.add_batch(np.asarray(observation)[None], np.array([action]), np.array([reward]),
+                       np.asarray(next_observation)[None], np.array([done]))
+    
+    def add_batch(self, observations: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                  next_observations: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        """
+        Ajoute un lot de transitions (environnements parallèles) en une écriture
+        
+        Returns:
+            Positions écrites dans la mémoire
+        """
+        observations = np.asarray(observations)
+        n = len(observations)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        if self.observations is None:
+            self._allocate(observations)
+        if n > self.capacity:
+            # Seules les dernières transitions tiennent dans la mémoire
+            keep = slice(n - self.capacity, n)
+            return self.add_batch(observations[keep], np.asarray(actions)[keep], np.asarray(rewards)[keep],
+                                  np.asarray(next_observations)[keep], np.asarray(dones)[keep])
+        
+        indices = (self.position + np.arange(n)) % self.capacity
+        self.observations[indices] = observations
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_observations[indices] = next_observations
+        self.dones[indices] = dones
+        
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return indices
+    
+    def _batch(self, indices: np.ndarray) -> Batch:
+        return (self.observations[indices], self.actions[indices], self.rewards[indices],
+                self.next_observations[indices], self.dones[indices])
+    
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, Batch, Optional[np.ndarray]]:
+        """
+        Tire un mini-lot uniformément (avec remise)
+        
+        Returns:
+            (positions, (observations, actions, récompenses, observations suivantes,
+            fins d'épisode), poids d'importance ou None)
+        """
+        indices = self.rng.integers(0, self.size, size=batch_size)
+        return indices, self._batch(indices), None
+    
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        """Sans effet pour l'échantillonnage uniforme"""
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Rejeu prioritaire proportionnel (Schaul et al., 2016)
+    
+    P(i) = p_i^alpha / somme_j p_j^alpha avec p_i = |erreur TD| + epsilon.
+    Les priorités sont tenues dans un arbre de sommes à plat : mise à jour
+    et tirage d'un lot en O(batch * log capacity), niveau par niveau en NumPy.
+    Les nouvelles transitions reçoivent la priorité maximale observée.
+    """
+    
+    def __init__(self, capacity: int, alpha: float = 0.6, beta: float = 0.4,
+                 epsilon: float = 1e-3, seed: Optional[int] = None):
+        """
+        Args:
+            capacity: Nombre maximal de transitions
+            alpha: Exposant des priorités (0 : uniforme)
+            beta: Exposant de correction d'importance (1 : correction complète)
+            epsilon: Priorité minimale ajoutée à |erreur TD|
+            seed: Graine de l'échantillonnage
+        """
+        super().__init__(capacity, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        
+        self.depth = max(int(np.ceil(np.log2(capacity))), 0)
+        self.n_leaves = 2 ** self.depth
+        # tree[1] est la racine ; les feuilles occupent tree[n_leaves:]
+        self.tree = np.zeros(2 * self.n_leaves)
+    
+    def _set_leaves(self, indices: np.ndarray, values: np.ndarray):
+        tree = self.tree
+        if len(indices) == 1:
+            # Cas d'un seul ajout par pas : remontée en scalaires, plus rapide que NumPy
+            node = int(indices[0]) + self.n_leaves
+            tree[node] = values[0]
+            for _ in range(self.depth):
+                node //= 2
+                tree[node] = tree[2 * node] + tree[2 * node + 1]
+            return
+        
+        nodes = np.asarray(indices, dtype=np.int64) + self.n_leaves
+        tree[nodes] = values
+        for _ in range(self.depth):
+            # Les parents en double reçoivent la même somme : pas besoin de np.unique
+            nodes = nodes // 2
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+    
+    def add_batch(self, observations: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                  next_observations: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        indices = super().add_batch(observations, actions, rewards, next_observations, dones)
+        if len(indices):
+            self._set_leaves(indices, np.full(len(indices), self.max_priority ** self.alpha))
+        return indices
+    
+    def sample(self, batch_size: int) -> Tuple[np.ndarray, Batch, Optional[np.ndarray]]:
+        """
+        Tire un mini-lot proportionnellement aux priorités (tirage stratifié)
+        
+        Returns:
+            (positions, transitions, poids d'importance normalisés par leur maximum)
+        """
+        total = self.tree[1]
+        # Une valeur par strate de [0, total) : lot mieux réparti qu'un tirage libre
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        
+        nodes = np.ones(batch_size, dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sums = self.tree[left]
+            go_right = values >= left_sums
+            values = np.where(go_right, values - left_sums, values)
+            nodes = left + go_right
+        indices = np.minimum(nodes - self.n_leaves, self.size - 1)
+        
+        probabilities = self.tree[indices + self.n_leaves] / total
+        weights = (self.size * np.maximum(probabilities, 1e-12)) ** -self.beta
+        weights /= weights.max()
+        return indices, self._batch(indices), weights
+    
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        """Priorités p = |erreur TD| + epsilon des transitions rejouées"""
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max(initial=0.0)))
+        # Une position tirée plusieurs fois garde sa dernière erreur
+        indices, last = np.unique(np.asarray(indices)[::-1], return_index=True)
+        self._set_leaves(indices, priorities[::-1][last] ** self.alpha)
+
+
+def test_replay_buffer():
+    """Vérifie l'anneau de la mémoire et l'arbre de sommes du rejeu prioritaire"""
+    print("🧪 TEST DE LA MÉMOIRE DE REJEU\n")
+    
+    # Anneau : seules les 10 dernières transitions restent, à leur position modulo 10
+    buffer = ReplayBuffer(capacity=10, seed=0)
+    buffer.add(np.array([0.0, 0.0]), 0, 0.0, np.array([0.0, 0.0]), False)
+    for start in (1, 4, 20):
+        steps = np.arange(start, start + (3 if start < 20 else 15))
+        buffer.add_batch(np.stack([steps, -steps], axis=1).astype(float), steps % 3,
+                         steps.astype(float), np.stack([steps + 1, -steps], axis=1).astype(float),
+                         steps % 5 == 0)
+    assert len(buffer) == 10
+    assert sorted(buffer.rewards.tolist()) == list(range(25, 35))
+    assert np.array_equal(buffer.observations[:, 0], buffer.rewards)
+    _, (observations, _, rewards, _, _), weights = buffer.sample(64)
+    assert weights is None and np.array_equal(observations[:, 0], rewards)
+    print("[OK] Anneau : 10 dernières transitions conservées, lots cohérents")
+    
+    # Arbre de sommes (capacité non puissance de 2) et priorités
+    prioritized = PrioritizedReplayBuffer(capacity=6, alpha=0.7, beta=0.5, seed=0)
+    prioritized.add_batch(np.arange(6), np.zeros(6), np.zeros(6), np.arange(6), np.zeros(6, dtype=bool))
+    td_errors = np.array([0.5, 3.0, 0.0, 1.0, 2.0, 0.1])
+    # Position 1 tirée deux fois : la dernière erreur l'emporte
+    prioritized.update_priorities(np.array([0, 1, 2, 3, 4, 5, 1]), np.append(td_errors, 3.0))
+    expected = (np.abs(td_errors) + prioritized.epsilon) ** 0.7
+    leaves = prioritized.tree[prioritized.n_leaves:]
+    assert np.allclose(leaves[:6], expected) and np.all(leaves[6:] == 0)
+    internal = np.arange(1, prioritized.n_leaves)
+    assert np.allclose(prioritized.tree[internal],
+                       prioritized.tree[2 * internal] + prioritized.tree[2 * internal + 1])
+    
+    counts = np.zeros(6)
+    for _ in range(200):
+        indices, _, weights = prioritized.sample(100)
+        counts += np.bincount(indices, minlength=6)
+    probabilities = expected / expected.sum()
+    assert np.allclose(counts / counts.sum(), probabilities, atol=0.01)
+    expected_weights = (6 * probabilities[indices]) ** -0.5
+    assert np.allclose(weights, expected_weights / expected_weights.max())
+    print(f"[OK] Fréquences de tirage {np.round(counts / counts.sum(), 3)} "
+          f"conformes à p^alpha ({np.round(probabilities, 3)})")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_replay_buffer()
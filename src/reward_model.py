@@ -0,0 +1,418 @@
+"""
+Modèle de récompense appris à partir des préférences (Bradley-Terry)
+r̂(s, a) est ajusté par régression logistique sur toutes les paires à la fois
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from src.preference_updates import preference_key
+
+
+class TrajectoryCounts:
+    """
+    Matrice creuse (trajectoires x paires état-action) des nombres de visites
+    
+    Format COO : l'entrée k indique que la trajectoire rows[k] a visité la paire
+    linéarisée indices[k] data[k] fois. Le retour prédit d'une trajectoire est
+    alors la somme des r̂(s, a) pondérée par ces comptes.
+    """
+    
+    def __init__(self, n_features: int):
+        """
+        Args:
+            n_features: Nombre de colonnes (n_states * n_actions)
+        """
+        self.n_features = n_features
+        self.n_trajectories = 0
+        self._chunks: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._compacted = 0
+        self.indices = np.zeros(0, dtype=np.int64)
+        self.data = np.zeros(0, dtype=np.float64)
+        self.rows = np.zeros(0, dtype=np.int64)
+    
+    def add(self, states: np.ndarray, actions: np.ndarray, n_actions: int) -> int:
+        """
+        Ajoute une trajectoire
+        
+        Args:
+            states: États discrets visités
+            actions: Actions prises
+            n_actions: Nombre d'actions (pour linéariser (s, a))
+        
+        Returns:
+            Index de la ligne ajoutée
+        """
+        features = np.asarray(states, dtype=np.int64) * n_actions + np.asarray(actions, dtype=np.int64)
+        columns, counts = np.unique(features, return_counts=True)
+        self._chunks.append((columns, counts.astype(np.float64)))
+        self.n_trajectories += 1
+        return self.n_trajectories - 1
+    
+    def _compact(self):
+        """Concatène les trajectoires ajoutées depuis le dernier calcul"""
+        if self._compacted == len(self._chunks):
+            return
+        new_chunks = self._chunks[self._compacted:]
+        self.indices = np.concatenate([self.indices] + [columns for columns, _ in new_chunks])
+        self.data = np.concatenate([self.data] + [counts for _, counts in new_chunks])
+        self.rows = np.concatenate([self.rows] + [np.full(len(columns), self._compacted + i, dtype=np.int64)
+                                                  for i, (columns, _) in enumerate(new_chunks)])
+        self._compacted = len(self._chunks)
+    
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """Retours prédits de toutes les trajectoires : C @ weights"""
+        self._compact()
+        return np.bincount(self.rows, weights=self.data * weights[self.indices],
+                           minlength=self.n_trajectories)
+    
+    def transpose_dot(self, coefficients: np.ndarray) -> np.ndarray:
+        """Gradient par rapport aux poids : C^T @ coefficients"""
+        self._compact()
+        return np.bincount(self.indices, weights=self.data * coefficients[self.rows],
+                           minlength=self.n_features)
+
+
+class BradleyTerryRewardModel:
+    """
+    Modèle de récompense tabulaire r̂(s, a) ajusté selon Bradley-Terry
+    
+    P(A préférée à B) = sigmoid(R̂(A) - R̂(B)), avec R̂(τ) = somme des r̂(s, a) de τ.
+    Le gradient de la log-vraisemblance sur toutes les paires se calcule avec
+    deux produits creux (C @ r̂ puis C^T @ coefficients), sans boucle sur les pas.
+    Avec une matrice de caractéristiques, r̂(s, a) = phi(s, a) · theta (modèle linéaire).
+    """
+    
+    def __init__(self, n_states: int, n_actions: int,
+                 features: Optional[np.ndarray] = None,
+                 l2: float = 1e-3,
+                 learning_rate: float = 0.05,
+                 n_iterations: int = 300):
+        """
+        Args:
+            n_states: Nombre d'états discrets
+            n_actions: Nombre d'actions
+            features: Caractéristiques phi de forme (n_states * n_actions, k), None = tabulaire
+            l2: Régularisation L2 (fixe l'échelle de r̂, sinon indéterminée)
+            learning_rate: Pas d'Adam
+            n_iterations: Nombre d'itérations par ajustement
+        """
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.features = features
+        self.l2 = l2
+        self.learning_rate = learning_rate
+        self.n_iterations = n_iterations
+        
+        n_params = n_states * n_actions if features is None else features.shape[1]
+        self.theta = np.zeros(n_params, dtype=np.float64)
+        self.counts = TrajectoryCounts(n_states * n_actions)
+        self.loss_history: List[float] = []
+        
+        # Paires accumulées au fil des préférences reçues
+        self.index_a = np.zeros(0, dtype=np.int64)
+        self.index_b = np.zeros(0, dtype=np.int64)
+        self.labels = np.zeros(0, dtype=np.float64)
+        self.weights = np.zeros(0, dtype=np.float64)
+        
+        # Trajectoires enregistrées (par identité) et index de paire de chaque préférence
+        self._rows: Dict[int, Tuple[object, int]] = {}
+        self._preference_pairs: Dict[str, int] = {}
+    
+    @property
+    def reward_table(self) -> np.ndarray:
+        """r̂ sous forme de table (n_states, n_actions)"""
+        rewards = self.theta if self.features is None else self.features @ self.theta
+        return rewards.reshape(self.n_states, self.n_actions)
+    
+    @property
+    def n_pairs(self) -> int:
+        return len(self.labels)
+    
+    def add_trajectory(self, states: np.ndarray, actions: np.ndarray) -> int:
+        """
+        Enregistre les comptes (s, a) d'une trajectoire
+        
+        Returns:
+            Index de la trajectoire dans le modèle
+        """
+        return self.counts.add(states, actions, self.n_actions)
+    
+    def trajectory_row(self, trajectory, states: np.ndarray, actions: np.ndarray) -> int:
+        """
+        Index d'une trajectoire dans le modèle (enregistrée au premier appel)
+        
+        Args:
+            trajectory: Objet trajectoire (clé d'identité)
+            states: États discrets de la trajectoire
+            actions: Actions de la trajectoire
+        
+        Returns:
+            Index de la trajectoire
+        """
+        entry = self._rows.get(id(trajectory))
+        if entry is None or entry[0] is not trajectory:
+            entry = (trajectory, self.add_trajectory(states, actions))
+            self._rows[id(trajectory)] = entry
+        return entry[1]
+    
+    def add_preferences(self, preferences: List[Dict], trajectory_index: Dict[int, int]) -> int:
+        """
+        Ajoute des préférences (format PreferenceInterface) non encore vues
+        
+        Args:
+            preferences: Liste de préférences
+            trajectory_index: episode_id -> index de la trajectoire dans le modèle
+        
+        Returns:
+            Nombre de paires ajoutées
+        """
+        new_preferences = []
+        for pref in preferences:
+            key = preference_key(pref)
+            if key in self._preference_pairs:
+                continue
+            if pref['trajectory_a_id'] in trajectory_index and pref['trajectory_b_id'] in trajectory_index:
+                self._preference_pairs[key] = self.n_pairs + len(new_preferences)
+                new_preferences.append(pref)
+        
+        index_a, index_b, labels = preference_labels(new_preferences, trajectory_index)
+        self.add_pairs(index_a, index_b, labels)
+        return len(labels)
+    
+    def add_pairs(self, index_a: np.ndarray, index_b: np.ndarray, labels: np.ndarray,
+                  weights: Optional[np.ndarray] = None):
+        """
+        Ajoute des paires de préférences à l'ensemble d'apprentissage
+        
+        Args:
+            index_a: Index des trajectoires A (voir add_trajectory)
+            index_b: Index des trajectoires B
+            labels: 1 si A préférée, 0 si B préférée, 0.5 en cas d'égalité
+            weights: Poids des paires dans la vraisemblance (1 si None)
+        """
+        labels = np.asarray(labels, dtype=np.float64)
+        if weights is None:
+            weights = np.ones(len(labels))
+        self.index_a = np.concatenate([self.index_a, np.asarray(index_a, dtype=np.int64)])
+        self.index_b = np.concatenate([self.index_b, np.asarray(index_b, dtype=np.int64)])
+        self.labels = np.concatenate([self.labels, labels])
+        self.weights = np.concatenate([self.weights, np.asarray(weights, dtype=np.float64)])
+    
+    def set_preference_weights(self, preferences: List[Dict], weights) -> int:
+        """
+        Change le poids de préférences déjà ajoutées (sans les ré-ajouter)
+        
+        Args:
+            preferences: Préférences concernées (format PreferenceInterface)
+            weights: Nouveau poids (scalaire ou un par préférence)
+        
+        Returns:
+            Nombre de paires modifiées (les préférences inconnues sont ignorées)
+        """
+        weights = np.broadcast_to(np.asarray(weights, dtype=np.float64), (len(preferences),))
+        updated = 0
+        for pref, weight in zip(preferences, weights):
+            pair = self._preference_pairs.get(preference_key(pref))
+            if pair is not None:
+                self.weights[pair] = weight
+                updated += 1
+        return updated
+    
+    def _trajectory_returns(self, theta: Optional[np.ndarray] = None) -> np.ndarray:
+        theta = self.theta if theta is None else theta
+        if self.features is None:
+            return self.counts.dot(theta)
+        return self.counts.dot(self.features @ theta)
+    
+    def _parameter_gradient(self, coefficients: np.ndarray) -> np.ndarray:
+        gradient = self.counts.transpose_dot(coefficients)
+        return gradient if self.features is None else self.features.T @ gradient
+    
+    def _optimize(self, theta: np.ndarray, index_a: np.ndarray, index_b: np.ndarray,
+                  labels: np.ndarray, weights: np.ndarray, n_iterations: int) -> np.ndarray:
+        """Descente de gradient Adam en lot complet à partir de theta (modifié en place)"""
+        total_weight = weights.sum()
+        if total_weight <= 0:
+            return theta
+        n_trajectories = self.counts.n_trajectories
+        first_moment = np.zeros_like(theta)
+        second_moment = np.zeros_like(theta)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        
+        for iteration in range(1, n_iterations + 1):
+            returns = self._trajectory_returns(theta)
+            margins = returns[index_a] - returns[index_b]
+            errors = (1.0 / (1.0 + np.exp(-margins)) - labels) * weights
+            
+            # Coefficient par trajectoire : +erreur quand elle est A, -erreur quand elle est B
+            coefficients = (np.bincount(index_a, weights=errors, minlength=n_trajectories)
+                            - np.bincount(index_b, weights=errors, minlength=n_trajectories))
+            gradient = self._parameter_gradient(coefficients) / total_weight + self.l2 * theta
+            
+            first_moment = beta1 * first_moment + (1 - beta1) * gradient
+            second_moment = beta2 * second_moment + (1 - beta2) * gradient ** 2
+            corrected_first = first_moment / (1 - beta1 ** iteration)
+            corrected_second = second_moment / (1 - beta2 ** iteration)
+            theta -= self.learning_rate * corrected_first / (np.sqrt(corrected_second) + eps)
+        
+        return theta
+    
+    def fit(self, n_iterations: Optional[int] = None, warm_start: bool = True) -> float:
+        """
+        Ajuste r̂ sur toutes les paires accumulées (descente de gradient Adam en lot complet)
+        
+        Args:
+            n_iterations: Nombre d'itérations (self.n_iterations si None)
+            warm_start: Si True, repart des paramètres courants (ajustement incrémental
+                        quand de nouvelles préférences arrivent)
+        
+        Returns:
+            Perte finale (log-vraisemblance négative moyenne)
+        """
+        index_a, index_b, labels = self.index_a, self.index_b, self.labels
+        if len(labels) == 0:
+            return 0.0
+        
+        if not warm_start:
+            self.theta = np.zeros_like(self.theta)
+        if n_iterations is None:
+            n_iterations = self.n_iterations
+        
+        self.theta = self._optimize(self.theta, index_a, index_b, labels, self.weights, n_iterations)
+        
+        loss = self.loss(index_a, index_b, labels, self.weights)
+        self.loss_history.append(loss)
+        return loss
+    
+    def ensemble_returns(self, n_members: int = 8, n_iterations: int = 100,
+                         prior_scale: float = 1.0, seed: Optional[int] = None) -> np.ndarray:
+        """
+        Retours prédits par un ensemble de modèles (bootstrap à prior aléatoire)
+        
+        Chaque membre part des paramètres courants perturbés par un bruit gaussien,
+        puis est ajusté sur un rééchantillonnage avec remise des paires. Sans
+        préférence, les membres sont de simples tirages du prior : ils divergent
+        d'autant plus que les trajectoires visitent des paires (s, a) différentes.
+        
+        Args:
+            n_members: Nombre de membres de l'ensemble
+            n_iterations: Itérations d'Adam par membre
+            prior_scale: Écart-type du bruit initial sur les paramètres
+            seed: Graine du générateur aléatoire
+        
+        Returns:
+            Tableau (n_members, n_trajectories) des retours prédits
+        """
+        rng = np.random.default_rng(seed)
+        n_pairs = len(self.labels)
+        returns = np.empty((n_members, self.counts.n_trajectories))
+        
+        for member in range(n_members):
+            theta = self.theta + rng.normal(0.0, prior_scale, size=self.theta.shape)
+            if n_pairs > 0:
+                sample = rng.integers(0, n_pairs, size=n_pairs)
+                theta = self._optimize(theta, self.index_a[sample], self.index_b[sample],
+                                       self.labels[sample], self.weights[sample], n_iterations)
+            returns[member] = self._trajectory_returns(theta)
+        
+        return returns
+    
+    def loss(self, index_a: np.ndarray, index_b: np.ndarray, labels: np.ndarray,
+             weights: Optional[np.ndarray] = None) -> float:
+        """Log-vraisemblance négative moyenne (pondérée) des paires, sans régularisation"""
+        returns = self._trajectory_returns()
+        margins = returns[index_a] - returns[index_b]
+        # log(sigmoid(x)) = -log(1 + exp(-x)), stable numériquement
+        log_p_a = -np.logaddexp(0.0, -margins)
+        log_p_b = -np.logaddexp(0.0, margins)
+        log_likelihood = labels * log_p_a + (1 - labels) * log_p_b
+        if weights is None or weights.sum() <= 0:
+            return float(-np.mean(log_likelihood))
+        return float(-np.average(log_likelihood, weights=weights))
+    
+    def predict_preference(self, index_a: np.ndarray, index_b: np.ndarray) -> np.ndarray:
+        """Probabilité que A soit préférée à B selon le modèle"""
+        returns = self._trajectory_returns()
+        return 1.0 / (1.0 + np.exp(-(returns[index_a] - returns[index_b])))
+
+
+def preference_labels(preferences: List[Dict], trajectory_index: Dict[int, int]
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Convertit des préférences (format PreferenceInterface) en paires indexées
+    
+    Args:
+        preferences: Dicts avec trajectory_a_id, trajectory_b_id et choice (0, 1 ou 2)
+        trajectory_index: episode_id -> index de la trajectoire dans le modèle
+    
+    Returns:
+        Tuple (index A, index B, labels) ; les préférences dont une trajectoire
+        est inconnue sont ignorées, les égalités reçoivent le label 0.5
+    """
+    index_a, index_b, labels = [], [], []
+    for pref in preferences:
+        a = trajectory_index.get(pref['trajectory_a_id'])
+        b = trajectory_index.get(pref['trajectory_b_id'])
+        if a is None or b is None:
+            continue
+        index_a.append(a)
+        index_b.append(b)
+        labels.append({0: 0.5, 1: 1.0, 2: 0.0}[pref['choice']])
+    return (np.asarray(index_a, dtype=np.int64), np.asarray(index_b, dtype=np.int64),
+            np.asarray(labels, dtype=np.float64))
+
+
+def test_reward_model():
+    """Vérifie les produits creux, l'ajustement et la déduplication des préférences"""
+    print("🧪 TEST DU MODÈLE DE RÉCOMPENSE BRADLEY-TERRY\n")
+    
+    rng = np.random.default_rng(0)
+    n_states, n_actions, n_trajectories = 12, 3, 40
+    true_rewards = rng.normal(size=(n_states, n_actions))
+    
+    model = BradleyTerryRewardModel(n_states, n_actions, n_iterations=500)
+    dense_counts = np.zeros((n_trajectories, n_states * n_actions))
+    true_returns = np.zeros(n_trajectories)
+    for row in range(n_trajectories):
+        length = rng.integers(5, 30)
+        states = rng.integers(0, n_states, length)
+        actions = rng.integers(0, n_actions, length)
+        assert model.add_trajectory(states, actions) == row
+        np.add.at(dense_counts[row], states * n_actions + actions, 1.0)
+        true_returns[row] = true_rewards[states, actions].sum()
+    
+    # Produits creux identiques aux produits denses
+    theta = rng.normal(size=n_states * n_actions)
+    coefficients = rng.normal(size=n_trajectories)
+    assert np.allclose(model.counts.dot(theta), dense_counts @ theta)
+    assert np.allclose(model.counts.transpose_dot(coefficients), dense_counts.T @ coefficients)
+    print("[OK] Produits creux C @ r̂ et C^T @ c identiques aux produits denses")
+    
+    # Préférences tirées du vrai retour : r̂ doit retrouver l'ordre des trajectoires
+    pairs = rng.integers(0, n_trajectories, size=(300, 2))
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    train, held_out = pairs[:200], pairs[200:]
+    preferences = [{'preference_id': f"test:{k}", 'trajectory_a_id': int(a), 'trajectory_b_id': int(b),
+                    'choice': 1 if true_returns[a] > true_returns[b] else 2}
+                   for k, (a, b) in enumerate(train)]
+    trajectory_index = {row: row for row in range(n_trajectories)}
+    assert model.add_preferences(preferences, trajectory_index) == len(preferences)
+    loss = model.fit()
+    
+    predicted = model.predict_preference(held_out[:, 0], held_out[:, 1]) > 0.5
+    accuracy = np.mean(predicted == (true_returns[held_out[:, 0]] > true_returns[held_out[:, 1]]))
+    assert accuracy > 0.85, accuracy
+    print(f"[OK] Perte {loss:.4f}, ordre retrouvé sur {accuracy:.0%} des paires non vues")
+    
+    # Préférences déjà vues ignorées, poids modifiables sans ré-ajout
+    assert model.add_preferences(preferences, trajectory_index) == 0
+    assert model.set_preference_weights(preferences[:10], 0.0) == 10
+    assert model.n_pairs == len(preferences) and np.all(model.weights[:10] == 0.0)
+    print("[OK] Déduplication et repondération des préférences")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_reward_model()
@@ -0,0 +1,182 @@
+"""
+Modèle tabulaire de l'environnement appris à partir des transitions réelles
+(comptes, récompense moyenne, derniers états suivants observés par cellule (s, a)),
+utilisé pour la planification Dyna-Q et le balayage prioritaire
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+ModelBatch = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+
+class TabularModel:
+    """
+    Modèle (s, a) -> (r moyen, s', fin d'épisode) sur tableaux (n_states, n_actions)
+    
+    Chaque cellule garde ses n_next_samples derniers états suivants et en tire
+    un au hasard lors de la simulation. Avec n_next_samples=1 on retrouve
+    l'hypothèse déterministe de Dyna-Q, exacte pour Taxi ; sur la grille
+    MountainCar, une même cellule mène à plusieurs cellules voisines (la
+    vitesse exacte est perdue) et un seul état suivant crée de fausses boucles.
+    La récompense est la moyenne observée et la fin d'épisode la décision majoritaire.
+    """
+    
+    def __init__(self, n_states: int, n_actions: int, n_next_samples: int = 16,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            n_states: Nombre d'états discrets
+            n_actions: Nombre d'actions
+            n_next_samples: États suivants conservés par cellule (fenêtre glissante)
+            seed: Graine du tirage des cellules à planifier
+        """
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.n_next_samples = n_next_samples
+        self.rng = np.random.default_rng(seed)
+        
+        self.counts = np.zeros((n_states, n_actions), dtype=np.int64)
+        self.reward_sums = np.zeros((n_states, n_actions))
+        self.terminal_counts = np.zeros((n_states, n_actions), dtype=np.int64)
+        self.next_states = np.full((n_states, n_actions, n_next_samples), -1, dtype=np.int64)
+        
+        # Cellules déjà observées (indices s * n_actions + a), dans l'ordre de découverte
+        self._observed = np.zeros(1024, dtype=np.int64)
+        self.n_observed = 0
+    
+    def update(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+               next_states: np.ndarray, dones: np.ndarray) -> np.ndarray:
+        """
+        Intègre un lot de transitions réelles
+        
+        Returns:
+            Cellules (s * n_actions + a) observées pour la première fois
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        cells = states * self.n_actions + actions
+        
+        flat_counts = self.counts.reshape(-1)
+        previous_counts = flat_counts[cells]
+        new_cells = np.unique(cells[previous_counts == 0])
+        
+        # Emplacement dans la fenêtre des états suivants (rang dans le lot pour les doublons)
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        is_first = np.ones(len(cells), dtype=bool)
+        is_first[1:] = sorted_cells[1:] != sorted_cells[:-1]
+        starts = np.flatnonzero(is_first)
+        rank = np.empty(len(cells), dtype=np.int64)
+        rank[order] = np.arange(len(cells)) - starts[np.cumsum(is_first) - 1]
+        slots = (previous_counts + rank) % self.n_next_samples
+        self.next_states[states, actions, slots] = next_states
+        
+        np.add.at(flat_counts, cells, 1)
+        np.add.at(self.reward_sums.reshape(-1), cells, np.asarray(rewards, dtype=np.float64))
+        np.add.at(self.terminal_counts.reshape(-1), cells, np.asarray(dones, dtype=np.int64))
+        
+        if len(new_cells):
+            end = self.n_observed + len(new_cells)
+            if end > len(self._observed):
+                grown = np.zeros(max(2 * len(self._observed), end), dtype=np.int64)
+                grown[:self.n_observed] = self._observed[:self.n_observed]
+                self._observed = grown
+            self._observed[self.n_observed:end] = new_cells
+            self.n_observed = end
+        return new_cells
+    
+    @property
+    def observed_cells(self) -> np.ndarray:
+        return self._observed[:self.n_observed]
+    
+    def mean_rewards(self, states: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """Récompenses moyennes observées (0 pour une cellule jamais vue)"""
+        return self.reward_sums[states, actions] / np.maximum(self.counts[states, actions], 1)
+    
+    def predict(self, states: np.ndarray, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Prédictions du modèle pour des cellules déjà observées
+        
+        Returns:
+            (récompenses moyennes, états suivants tirés dans la fenêtre, fins d'épisode)
+        """
+        counts = np.maximum(self.counts[states, actions], 1)
+        rewards = self.mean_rewards(states, actions)
+        dones = 2 * self.terminal_counts[states, actions] >= counts
+        slots = self.rng.integers(0, np.minimum(counts, self.n_next_samples))
+        return rewards, self.next_states[states, actions, slots], dones
+    
+    def sample(self, n: int) -> ModelBatch:
+        """
+        Tire n cellules observées uniformément et les simule
+        
+        Returns:
+            (états, actions, récompenses, états suivants, fins d'épisode)
+        """
+        cells = self.observed_cells[self.rng.integers(0, self.n_observed, size=n)]
+        states = cells // self.n_actions
+        actions = cells % self.n_actions
+        rewards, next_states, dones = self.predict(states, actions)
+        return states, actions, rewards, next_states, dones
+
+
+def test_tabular_model():
+    """Vérifie les mises à jour par lot du modèle et la planification Dyna-Q"""
+    from src.q_learning_agent import QLearningAgent
+    from src.value_iteration import value_iteration
+    
+    print("🧪 TEST DU MODÈLE TABULAIRE (DYNA-Q)\n")
+    
+    # Lot avec doublons = mêmes transitions intégrées une par une
+    rng = np.random.default_rng(0)
+    n_states, n_actions, batch = 5, 2, 300
+    states = rng.integers(0, n_states, batch)
+    actions = rng.integers(0, n_actions, batch)
+    rewards = rng.normal(size=batch)
+    next_states = rng.integers(0, n_states, batch)
+    dones = rng.random(batch) < 0.3
+    
+    batched = TabularModel(n_states, n_actions, n_next_samples=4)
+    batched.update(states, actions, rewards, next_states, dones)
+    single = TabularModel(n_states, n_actions, n_next_samples=4)
+    for transition in zip(states, actions, rewards, next_states, dones):
+        single.update(*(np.array([value]) for value in transition))
+    assert np.array_equal(batched.counts, single.counts)
+    assert np.allclose(batched.reward_sums, single.reward_sums)
+    assert np.array_equal(batched.terminal_counts, single.terminal_counts)
+    assert np.array_equal(batched.next_states, single.next_states)
+    # Le lot enregistre ses nouvelles cellules triées, l'ensemble est le même
+    assert np.array_equal(np.sort(batched.observed_cells), np.sort(single.observed_cells))
+    print("[OK] Mise à jour par lot identique aux mises à jour successives")
+    
+    sampled_states, sampled_actions, sampled_rewards, sampled_next, _ = batched.sample(500)
+    assert np.all(batched.counts[sampled_states, sampled_actions] > 0)
+    assert np.allclose(sampled_rewards, batched.mean_rewards(sampled_states, sampled_actions))
+    window = batched.next_states[sampled_states, sampled_actions]
+    assert np.all((window == sampled_next[:, None]).any(axis=1))
+    print("[OK] Simulation limitée aux cellules observées et à leurs états suivants")
+    
+    # Chaîne déterministe : la planification seule converge vers Q*
+    n_chain = 8
+    chain_next = np.stack([np.maximum(np.arange(n_chain) - 1, 0),
+                           np.minimum(np.arange(n_chain) + 1, n_chain - 1)], axis=1)
+    chain_rewards = np.where(chain_next == n_chain - 1, 1.0, -0.1)
+    chain_terminals = chain_next == n_chain - 1
+    q_star, _ = value_iteration(chain_next, chain_rewards, chain_terminals, 0.9)
+    
+    agent = QLearningAgent(n_chain, 2, learning_rate=0.5, discount_factor=0.9)
+    agent.enable_dyna(n_next_samples=1, seed=0)
+    cells = np.arange(n_chain * 2)
+    agent.dyna_model.update(cells // 2, cells % 2, chain_rewards.ravel(),
+                            chain_next.ravel(), chain_terminals.ravel())
+    for _ in range(200):
+        agent.plan(50)
+    assert np.allclose(agent.q_table, q_star, atol=1e-6)
+    print(f"[OK] {agent.planning_updates} mises à jour simulées : Q = Q* de l'itération sur les valeurs")
+    
+    print("[OK] Tests terminés!")
+
+
+if __name__ == "__main__":
+    test_tabular_model()
@@ -0,0 +1,89 @@
+"""
+Codage en tuiles (tile coding) pour états continus
+Plusieurs grilles décalées recouvrent l'espace : un état active une tuile par
+grille, et une fonction linéaire sur les tuiles généralise entre états voisins
+tout en gardant une résolution fine (largeur de tuile / nombre de grilles)
+"""
+
+import numpy as np
+from typing import Sequence
+
+
+class TileCoder:
+    """
+    Encodeur en n_tilings grilles de n_tiles x n_tiles tuiles décalées
+    
+    Les décalages suivent les déplacements asymétriques (1, 3, 5, ...) de
+    Sutton & Barto (2018, §9.5.4) : la grille t est décalée de
+    t * (2d + 1) / n_tilings largeur de tuile sur la dimension d, ce qui évite
+    les alignements diagonaux des décalages uniformes. Chaque grille a une tuile
+    de plus par dimension pour couvrir la partie décalée.
+    """
+    
+    def __init__(self, low: Sequence[float], high: Sequence[float],
+                 n_tilings: int = 8, n_tiles: int = 8):
+        """
+        Args:
+            low: Bornes basses de chaque dimension
+            high: Bornes hautes de chaque dimension
+            n_tilings: Nombre de grilles (= tuiles actives par état)
+            n_tiles: Tuiles par dimension dans chaque grille
+        """
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.n_dims = len(self.low)
+        self.n_tilings = n_tilings
+        self.n_tiles = n_tiles
+        
+        self.scale = n_tiles / (self.high - self.low)
+        displacements = 2 * np.arange(self.n_dims) + 1
+        # Décalage de chaque grille, en largeurs de tuile dans [0, 1)
+        self.offsets = (np.arange(n_tilings)[:, None] * displacements[None, :] / n_tilings) % 1.0
+        
+        tiles_per_dim = n_tiles + 1
+        self.strides = tiles_per_dim ** np.arange(self.n_dims)
+        self.tiles_per_tiling = tiles_per_dim ** self.n_dims
+        self.tiling_bases = np.arange(n_tilings) * self.tiles_per_tiling
+        self.n_features = n_tilings * self.tiles_per_tiling
+        
+        # Copies en listes pour encode (chemin scalaire de la boucle d'interaction)
+        self._low = self.low.tolist()
+        self._scale = self.scale.tolist()
+        self._strides = self.strides.tolist()
+        self._tilings = list(zip(self.tiling_bases.tolist(), self.offsets.tolist()))
+    
+    def encode_batch(self, states: np.ndarray) -> np.ndarray:
+        """
+        Indices des tuiles actives d'un lot d'états
+        
+        Args:
+            states: États continus de forme (N, n_dims)
+        
+        Returns:
+            Indices de forme (N, n_tilings), dans [0, n_features)
+        """
+        scaled = (np.asarray(states, dtype=np.float64) - self.low) * self.scale
+        coords = np.floor(scaled[:, None, :] + self.offsets[None, :, :]).astype(np.int64)
+        np.clip(coords, 0, self.n_tiles, out=coords)
+        return coords @ self.strides + self.tiling_bases
+    
+    def encode(self, state: np.ndarray) -> np.ndarray:
+        """
+        Indices des tuiles actives d'un état, de forme (n_tilings,)
+        
+        Même résultat que encode_batch, calculé en Python sur des flottants :
+        pour un seul état, les appels NumPy coûtent plus que le calcul.
+        """
+        values = state.tolist() if isinstance(state, np.ndarray) else state
+        scaled = [(x - low) * scale for x, low, scale in zip(values, self._low, self._scale)]
+        strides = self._strides
+        n_tiles = self.n_tiles
+        indices = []
+        for base, offsets in self._tilings:
+            index = base
+            for x, offset, stride in zip(scaled, offsets, strides):
+                # int() tronque vers 0 : identique à floor une fois borné à [0, n_tiles]
+                coord = int(x + offset)
+                index += stride * (0 if coord < 0 else n_tiles if coord > n_tiles else coord)
+            indices.append(index)
+        return np.array(indices, dtype=np.int64)
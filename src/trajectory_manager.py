@@ -1,5 +1,6 @@
 import numpy as np
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
+from collections.abc import Sequence
 import pickle
 import os
 from dataclasses import dataclass
@@ -32,6 +33,178 @@ class Trajectory:
             self.total_reward = sum(step.reward for step in self.steps)
             self.episode_length = len(self.steps)
 
+class TrajectoryStepView:
+    """
+    Vue légère (sans copie) sur un pas d'une ColumnarTrajectory
+    
+    Expose les mêmes attributs que TrajectoryStep ; continuous_state et
+    continuous_next_state n'existent que si la trajectoire stocke des
+    observations continues (hasattr() reste donc utilisable).
+    """
+    __slots__ = ('_trajectory', '_index')
+    
+    def __init__(self, trajectory: 'ColumnarTrajectory', index: int):
+        self._trajectory = trajectory
+        self._index = index
+    
+    @property
+    def state(self) -> int:
+        return int(self._trajectory.states[self._index])
+    
+    @property
+    def action(self) -> int:
+        return int(self._trajectory.actions[self._index])
+    
+    @property
+    def reward(self) -> float:
+        return float(self._trajectory.rewards[self._index])
+    
+    @property
+    def next_state(self) -> int:
+        return int(self._trajectory.next_states[self._index])
+    
+    @property
+    def done(self) -> bool:
+        return bool(self._trajectory.dones[self._index])
+    
+    @property
+    def step_number(self) -> int:
+        return self._index
+    
+    @property
+    def continuous_state(self) -> Tuple[float, ...]:
+        if self._trajectory.continuous_states is None:
+            raise AttributeError("continuous_state")
+        return tuple(self._trajectory.continuous_states[self._index])
+    
+    @property
+    def continuous_next_state(self) -> Tuple[float, ...]:
+        if self._trajectory.continuous_next_states is None:
+            raise AttributeError("continuous_next_state")
+        return tuple(self._trajectory.continuous_next_states[self._index])
+    
+    def __repr__(self) -> str:
+        return (f"TrajectoryStepView(state={self.state}, action={self.action}, "
+                f"reward={self.reward}, next_state={self.next_state}, "
+                f"done={self.done}, step_number={self.step_number})")
+
+class TrajectorySteps(Sequence):
+    """Séquence de vues sur les pas d'une ColumnarTrajectory (remplace la liste de TrajectoryStep)"""
+    __slots__ = ('_trajectory',)
+    
+    def __init__(self, trajectory: 'ColumnarTrajectory'):
+        self._trajectory = trajectory
+    
+    def __len__(self) -> int:
+        return len(self._trajectory.actions)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TrajectoryStepView(self._trajectory, i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index de pas hors limites")
+        return TrajectoryStepView(self._trajectory, index)
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield TrajectoryStepView(self._trajectory, i)
+    
+    def __repr__(self) -> str:
+        return f"TrajectorySteps({len(self)} pas)"
+
+class ColumnarTrajectory(Trajectory):
+    """
+    Trajectoire stockée en colonnes (tableaux NumPy contigus)
+    
+    Remplace la liste d'objets TrajectoryStep par un tableau par champ :
+    ~20 octets par pas au lieu de plusieurs centaines, et des statistiques
+    (total_reward, résumés, mises à jour par préférences) calculées en vectoriel.
+    L'attribut steps reste itérable et indexable grâce à des vues légères.
+    """
+    
+    def __init__(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                 next_states: np.ndarray, dones: np.ndarray, episode_id: int,
+                 continuous_states: Optional[np.ndarray] = None,
+                 continuous_next_states: Optional[np.ndarray] = None):
+        """
+        Args:
+            states: États discrets (int32)
+            actions: Actions (int8)
+            rewards: Récompenses (float64)
+            next_states: États discrets suivants (int32)
+            dones: Fins d'épisode (bool)
+            episode_id: Identifiant de l'épisode
+            continuous_states: Observations continues de forme (T, d), optionnelles
+            continuous_next_states: Observations continues suivantes, optionnelles
+        """
+        self.states = np.ascontiguousarray(states, dtype=np.int32)
+        self.actions = np.ascontiguousarray(actions, dtype=np.int8)
+        self.rewards = np.ascontiguousarray(rewards, dtype=np.float64)
+        self.next_states = np.ascontiguousarray(next_states, dtype=np.int32)
+        self.dones = np.ascontiguousarray(dones, dtype=bool)
+        self.continuous_states = (None if continuous_states is None
+                                  else np.ascontiguousarray(continuous_states, dtype=np.float32))
+        self.continuous_next_states = (None if continuous_next_states is None
+                                       else np.ascontiguousarray(continuous_next_states, dtype=np.float32))
+        self.episode_id = episode_id
+        self.total_reward = float(self.rewards.sum())
+        self.episode_length = len(self.actions)
+    
+    @property
+    def steps(self) -> TrajectorySteps:
+        return TrajectorySteps(self)
+    
+    @classmethod
+    def from_steps(cls, steps: List[TrajectoryStep], episode_id: int) -> 'ColumnarTrajectory':
+        """
+        Convertit une liste de TrajectoryStep (ancien format) en colonnes
+        
+        Args:
+            steps: Pas de la trajectoire
+            episode_id: Identifiant de l'épisode
+        
+        Returns:
+            ColumnarTrajectory équivalente
+        """
+        continuous = bool(steps) and all(hasattr(step, 'continuous_state') for step in steps)
+        return cls(
+            states=[step.state for step in steps],
+            actions=[step.action for step in steps],
+            rewards=[step.reward for step in steps],
+            next_states=[step.next_state for step in steps],
+            dones=[step.done for step in steps],
+            episode_id=episode_id,
+            continuous_states=[step.continuous_state for step in steps] if continuous else None,
+            continuous_next_states=[step.continuous_next_state for step in steps] if continuous else None
+        )
+
+class ColumnarMountainCarTrajectory(ColumnarTrajectory):
+    """MountainCarTrajectory stockée en colonnes, métriques calculées sur les observations continues"""
+    def __init__(self, states, actions, rewards, next_states, dones, episode_id,
+                 continuous_states, continuous_next_states):
+        super().__init__(states, actions, rewards, next_states, dones, episode_id,
+                         continuous_states, continuous_next_states)
+        self.max_position = float(max(self.continuous_states[0, 0],
+                                      self.continuous_next_states[:, 0].max()))
+        self.max_velocity = float(np.abs(self.continuous_next_states[:, 1]).max())
+        self.success = self.max_position >= 0.5
+
+def as_columnar(trajectory: Trajectory) -> ColumnarTrajectory:
+    """
+    Retourne la vue en colonnes d'une trajectoire (sans conversion si elle l'est déjà)
+    
+    Args:
+        trajectory: Trajectoire au format liste ou colonnes
+    
+    Returns:
+        ColumnarTrajectory
+    """
+    if isinstance(trajectory, ColumnarTrajectory):
+        return trajectory
+    return ColumnarTrajectory.from_steps(trajectory.steps, trajectory.episode_id)
+
 class TrajectoryManager:
     """
     Gère la collecte, le stockage et la comparaison de trajectoires
@@ -42,7 +215,7 @@ class TrajectoryManager:
         self.trajectory_counter = 0
         
     def collect_trajectory(self, env, agent, max_steps: int = 200, 
-                          render: bool = False) -> Trajectory:
+                          render: bool = False, columnar: bool = False) -> Trajectory:
         """
         Collecte une trajectoire complète en faisant jouer l'agent
         
@@ -51,10 +224,15 @@ class TrajectoryManager:
             agent: Agent Q-Learning
             max_steps: Nombre maximum de pas
             render: Si True, affiche l'environnement
+            columnar: Si True, stocke la trajectoire en colonnes (ColumnarTrajectory) ;
+                      par défaut, liste de TrajectoryStep (états bruts de l'environnement)
             
         Returns:
             Trajectory: Trajectoire complète
         """
+        if columnar:
+            return self._collect_columnar_trajectory(env, agent, max_steps, render)
+        
         steps = []
         state, _ = env.reset()
         total_reward = 0
@@ -102,6 +280,106 @@ class TrajectoryManager:
         
         return trajectory
     
+    def collect_trajectories_parallel(self, env_id: str, agent, n_trajectories: int,
+                                      seed: Optional[int] = None, n_workers: Optional[int] = None,
+                                      max_steps: int = 200) -> List[ColumnarTrajectory]:
+        """
+        Collecte des trajectoires greedy en parallèle (voir parallel_collection)
+        
+        Args:
+            env_id: Identifiant Gymnasium de l'environnement
+            agent: Agent dont la Q-table (et le discrétiseur éventuel) est figée
+            n_trajectories: Nombre de trajectoires
+            seed: Première graine (trajectoire i -> seed + i) ; par défaut le compteur
+                  de trajectoires, pour que des appels successifs jouent des épisodes
+                  différents tout en restant reproductibles
+            n_workers: Nombre de processus (tous les cœurs si None)
+            max_steps: Nombre maximum de pas par épisode
+            
+        Returns:
+            Liste des trajectoires collectées, avec des identifiants consécutifs
+        """
+        from src.parallel_collection import collect_trajectories_parallel
+        
+        if getattr(agent, 'tile_coder', None) is not None:
+            # Les workers jouent la Q-table : en codage en tuiles, ce n'est que la projection sur la grille
+            raise ValueError("La collecte parallèle rejoue la Q-table de la grille : "
+                             "appeler disable_tile_coding() d'abord")
+        if seed is None:
+            seed = self.trajectory_counter
+        
+        trajectories = collect_trajectories_parallel(
+            env_id, agent.q_table, n_trajectories, seed=seed,
+            discretizer=getattr(agent, 'discretizer', None), n_workers=n_workers,
+            max_steps=max_steps, first_episode_id=self.trajectory_counter
+        )
+        
+        self.trajectory_counter += len(trajectories)
+        self.trajectories.extend(trajectories)
+        
+        return trajectories
+    
+    def _collect_columnar_trajectory(self, env, agent, max_steps: int,
+                                     render: bool) -> ColumnarTrajectory:
+        """Collecte une trajectoire directement dans des tableaux préalloués"""
+        state, _ = env.reset()
+        continuous = np.ndim(state) > 0
+        
+        actions = np.zeros(max_steps, dtype=np.int8)
+        rewards = np.zeros(max_steps, dtype=np.float64)
+        dones = np.zeros(max_steps, dtype=bool)
+        if continuous:
+            # Observations continues : états discrets calculés en lot à la fin
+            observations = np.zeros((max_steps + 1, np.size(state)), dtype=np.float32)
+            observations[0] = state
+        else:
+            observations = np.zeros(max_steps + 1, dtype=np.int32)
+            observations[0] = state
+        
+        n_steps = 0
+        while n_steps < max_steps:
+            action = agent.select_action(state, training=False)
+            next_state, reward, terminated, truncated, _ = env.step(action)
+            done = terminated or truncated
+            
+            actions[n_steps] = action
+            rewards[n_steps] = reward
+            dones[n_steps] = done
+            observations[n_steps + 1] = next_state
+            
+            state = next_state
+            n_steps += 1
+            
+            if render:
+                env.render()
+            
+            if done:
+                break
+        
+        observations = observations[:n_steps + 1]
+        if continuous:
+            # États de la grille, y compris pour un agent en codage en tuiles
+            discretizer = getattr(agent, 'discretizer', None)
+            discrete = (discretizer.discretize_batch(observations) if discretizer is not None
+                        else agent.process_states(observations))
+            trajectory = ColumnarTrajectory(
+                states=discrete[:-1], actions=actions[:n_steps].copy(),
+                rewards=rewards[:n_steps].copy(), next_states=discrete[1:],
+                dones=dones[:n_steps].copy(), episode_id=self.trajectory_counter,
+                continuous_states=observations[:-1], continuous_next_states=observations[1:]
+            )
+        else:
+            trajectory = ColumnarTrajectory(
+                states=observations[:-1], actions=actions[:n_steps].copy(),
+                rewards=rewards[:n_steps].copy(), next_states=observations[1:],
+                dones=dones[:n_steps].copy(), episode_id=self.trajectory_counter
+            )
+        
+        self.trajectory_counter += 1
+        self.trajectories.append(trajectory)
+        
+        return trajectory
+    
     def get_trajectory_summary(self, trajectory: Trajectory) -> Dict[str, Any]:
         """
         Génère un résumé lisible d'une trajectoire
@@ -114,26 +392,28 @@ class TrajectoryManager:
         """
         actions_names = ["Sud", "Nord", "Est", "Ouest", "Prendre", "Déposer"]
         
+        columns = as_columnar(trajectory)
+        
         # Statistiques de base
         summary = {
             'episode_id': trajectory.episode_id,
             'total_reward': trajectory.total_reward,
             'episode_length': trajectory.episode_length,
-            'actions_taken': [actions_names[step.action] for step in trajectory.steps],
+            'actions_taken': [actions_names[action] for action in columns.actions],
             'action_counts': {},
             'rewards_distribution': {},
             'success': trajectory.total_reward > 0  # Heuristique: >0 = succès
         }
         
         # Comptage des actions
-        for action_name in actions_names:
-            summary['action_counts'][action_name] = summary['actions_taken'].count(action_name)
+        counts = np.bincount(columns.actions, minlength=len(actions_names))
+        for action, action_name in enumerate(actions_names):
+            summary['action_counts'][action_name] = int(counts[action])
         
         # Distribution des récompenses
-        rewards = [step.reward for step in trajectory.steps]
-        unique_rewards = list(set(rewards))
-        for reward in unique_rewards:
-            summary['rewards_distribution'][reward] = rewards.count(reward)
+        unique_rewards, reward_counts = np.unique(columns.rewards, return_counts=True)
+        for reward, count in zip(unique_rewards, reward_counts):
+            summary['rewards_distribution'][float(reward)] = int(count)
         
         # Efficacité (récompense par pas)
         summary['efficiency'] = trajectory.total_reward / trajectory.episode_length if trajectory.episode_length > 0 else 0
@@ -0,0 +1,311 @@
+"""
+Classement en ligne des trajectoires à partir des préférences (type Elo / TrueSkill)
+Chaque trajectoire porte une note gaussienne (moyenne, variance) sur l'échelle Elo :
+P(A > B) = sigmoid((mu_A - mu_B) / scale). Une préférence met à jour les deux
+notes en O(1) ; un réajustement par lot (MAP, Newton diagonal) est disponible
+"""
+
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+ELO_SCALE = 400.0 / np.log(10.0)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class TrajectoryRatings:
+    """
+    Notes des trajectoires (moyenne, variance, nombre de comparaisons)
+    
+    Mise à jour en ligne : approximation gaussienne (Laplace) d'une observation
+    de Bradley-Terry, comme Glicko / TrueSkill. La moyenne se déplace de
+    variance * (score - P) / scale et la variance diminue avec l'information
+    P(1 - P) / scale² apportée par la comparaison. Une égalité compte pour un
+    score de 0.5. refit() résout le même modèle exactement sur tout l'historique.
+    """
+    
+    def __init__(self, initial_rating: float = 1500.0, initial_sigma: float = 350.0,
+                 scale: float = ELO_SCALE, min_sigma: float = 25.0, capacity: int = 1024):
+        """
+        Args:
+            initial_rating: Note a priori d'une nouvelle trajectoire
+            initial_sigma: Écart-type a priori
+            scale: Échelle de la sigmoïde (400 / ln 10 : échelle Elo)
+            min_sigma: Écart-type plancher (les notes restent adaptables)
+            capacity: Capacité initiale des tableaux (doublée si nécessaire)
+        """
+        self.initial_rating = initial_rating
+        self.initial_sigma = initial_sigma
+        self.scale = scale
+        self.min_sigma = min_sigma
+        
+        self.ids: List[int] = []
+        self._index: Dict[int, int] = {}
+        self._mu = np.full(capacity, initial_rating)
+        self._variance = np.full(capacity, initial_sigma ** 2)
+        self._n_comparisons = np.zeros(capacity, dtype=np.int64)
+        self.n_updates = 0
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def __contains__(self, trajectory_id) -> bool:
+        return int(trajectory_id) in self._index
+    
+    @property
+    def mu(self) -> np.ndarray:
+        return self._mu[:len(self.ids)]
+    
+    @property
+    def variance(self) -> np.ndarray:
+        return self._variance[:len(self.ids)]
+    
+    @property
+    def n_comparisons(self) -> np.ndarray:
+        return self._n_comparisons[:len(self.ids)]
+    
+    def _row(self, trajectory_id) -> int:
+        """Index de la trajectoire (ajoutée avec la note a priori si inconnue)"""
+        trajectory_id = int(trajectory_id)
+        row = self._index.get(trajectory_id)
+        if row is not None:
+            return row
+        
+        row = len(self.ids)
+        if row == len(self._mu):
+            extra = len(self._mu)
+            self._mu = np.concatenate([self._mu, np.full(extra, self.initial_rating)])
+            self._variance = np.concatenate([self._variance, np.full(extra, self.initial_sigma ** 2)])
+            self._n_comparisons = np.concatenate([self._n_comparisons, np.zeros(extra, dtype=np.int64)])
+        self._index[trajectory_id] = row
+        self.ids.append(trajectory_id)
+        return row
+    
+    def rating(self, trajectory_id) -> Tuple[float, float]:
+        """(moyenne, écart-type) d'une trajectoire (a priori si inconnue)"""
+        row = self._index.get(int(trajectory_id))
+        if row is None:
+            return self.initial_rating, self.initial_sigma
+        return float(self._mu[row]), float(np.sqrt(self._variance[row]))
+    
+    def update(self, winner_id, loser_id, score: float = 1.0) -> float:
+        """
+        Met à jour les deux notes après une comparaison (O(1))
+        
+        Args:
+            winner_id: Trajectoire préférée (ou première trajectoire d'une égalité)
+            loser_id: Trajectoire moins préférée
+            score: 1.0 pour une préférence, 0.5 pour une égalité
+        
+        Returns:
+            P(winner > loser) prédite avant la mise à jour
+        """
+        winner = self._row(winner_id)
+        loser = self._row(loser_id)
+        scale = self.scale
+        p = 1.0 / (1.0 + np.exp(-(self._mu[winner] - self._mu[loser]) / scale))
+        gradient = (score - p) / scale
+        information = p * (1.0 - p) / scale ** 2
+        
+        variance_w = self._variance[winner]
+        variance_l = self._variance[loser]
+        self._mu[winner] += variance_w * gradient
+        self._mu[loser] -= variance_l * gradient
+        min_variance = self.min_sigma ** 2
+        self._variance[winner] = max(1.0 / (1.0 / variance_w + information), min_variance)
+        self._variance[loser] = max(1.0 / (1.0 / variance_l + information), min_variance)
+        self._n_comparisons[winner] += 1
+        self._n_comparisons[loser] += 1
+        self.n_updates += 1
+        return float(p)
+    
+    def update_preference(self, preference: Dict[str, Any]):
+        """Met à jour les notes avec une préférence (choix 1, 2 ou 0 pour égalité)"""
+        a, b = preference['trajectory_a_id'], preference['trajectory_b_id']
+        choice = preference['choice']
+        if choice == 1:
+            self.update(a, b)
+        elif choice == 2:
+            self.update(b, a)
+        else:
+            self.update(a, b, 0.5)
+    
+    def update_preferences(self, preferences: List[Dict[str, Any]]):
+        """Applique une suite de préférences dans l'ordre"""
+        for pref in preferences:
+            self.update_preference(pref)
+    
+    def refit(self, preferences: List[Dict[str, Any]], n_iterations: int = 100,
+              tolerance: float = 1e-2) -> int:
+        """
+        Réajuste toutes les notes sur un historique complet (MAP par lot)
+        
+        Maximise la vraisemblance de Bradley-Terry avec l'a priori gaussien
+        N(initial_rating, initial_sigma²) par pas de Newton diagonaux, tous les
+        gradients étant agrégés par bincount. Les variances deviennent l'inverse
+        de la courbure (approximation de Laplace). Le résultat ne dépend pas de
+        l'ordre des préférences, contrairement aux mises à jour en ligne.
+        
+        Args:
+            preferences: Historique complet des préférences
+            n_iterations: Nombre maximal de pas de Newton
+            tolerance: Arrêt quand le plus grand déplacement de note est inférieur
+        
+        Returns:
+            Nombre de pas effectués
+        """
+        rows_a = np.array([self._row(pref['trajectory_a_id']) for pref in preferences], dtype=np.int64)
+        rows_b = np.array([self._row(pref['trajectory_b_id']) for pref in preferences], dtype=np.int64)
+        choices = np.array([pref['choice'] for pref in preferences])
+        scores = np.where(choices == 1, 1.0, np.where(choices == 2, 0.0, 0.5))
+        
+        n_ratings = len(self.ids)
+        prior_precision = 1.0 / self.initial_sigma ** 2
+        mu = np.full(n_ratings, self.initial_rating)
+        information = np.zeros(n_ratings)
+        iteration = 0
+        for iteration in range(1, n_iterations + 1):
+            p = _sigmoid((mu[rows_a] - mu[rows_b]) / self.scale)
+            residual = (scores - p) / self.scale
+            curvature = p * (1.0 - p) / self.scale ** 2
+            gradient = (np.bincount(rows_a, weights=residual, minlength=n_ratings)
+                        - np.bincount(rows_b, weights=residual, minlength=n_ratings)
+                        - (mu - self.initial_rating) * prior_precision)
+            information = (np.bincount(rows_a, weights=curvature, minlength=n_ratings)
+                           + np.bincount(rows_b, weights=curvature, minlength=n_ratings))
+            # Pas amorti : Newton diagonal surestime le pas quand les notes sont couplées
+            step = 0.5 * gradient / (information + prior_precision)
+            mu += step
+            if np.abs(step).max(initial=0.0) < tolerance:
+                break
+        
+        self._mu[:n_ratings] = mu
+        self._variance[:n_ratings] = np.maximum(1.0 / (information + prior_precision), self.min_sigma ** 2)
+        self._n_comparisons[:n_ratings] = (np.bincount(rows_a, minlength=n_ratings)
+                                           + np.bincount(rows_b, minlength=n_ratings))
+        self.n_updates = len(preferences)
+        return iteration
+    
+    def win_probability(self, a_id, b_id) -> float:
+        """
+        P(A préférée à B), incertitude des notes incluse
+        
+        La marge est réduite par sqrt(1 + pi (var_A + var_B) / (8 scale²))
+        (approximation probit de l'espérance de la sigmoïde).
+        """
+        mu_a, sigma_a = self.rating(a_id)
+        mu_b, sigma_b = self.rating(b_id)
+        shrink = np.sqrt(1.0 + np.pi * (sigma_a ** 2 + sigma_b ** 2) / (8.0 * self.scale ** 2))
+        return float(_sigmoid((mu_a - mu_b) / (self.scale * shrink)))
+    
+    def preference_strength(self, preferred_id, less_preferred_id, max_strength: float = 2.5) -> float:
+        """
+        Force d'application d'une préférence déduite des notes
+        
+        1.0 quand les notes ne départagent pas les trajectoires (ou la contredisent),
+        jusqu'à max_strength quand la préférée l'emporte avec une probabilité proche de 1.
+        """
+        p = self.win_probability(preferred_id, less_preferred_id)
+        return 1.0 + (max_strength - 1.0) * max(2.0 * p - 1.0, 0.0)
+    
+    def select_pairs(self, candidate_ids: List[int], n_pairs: int) -> List[Tuple[int, int, float]]:
+        """
+        Paires de candidats les plus informatives à comparer
+        
+        Les candidats sont triés par note : seules les paires voisines dans ce
+        classement sont évaluées (O(N log N)), avec le score
+        (var_A + var_B) * P(1 - P) — notes proches et incertaines d'abord.
+        
+        Args:
+            candidate_ids: Identifiants de trajectoires candidates
+            n_pairs: Nombre de paires
+        
+        Returns:
+            Liste de (id A, id B, score) triée par score décroissant
+        """
+        if len(candidate_ids) < 2 or n_pairs <= 0:
+            return []
+        
+        ratings = np.array([self.rating(trajectory_id) for trajectory_id in candidate_ids])
+        order = np.argsort(ratings[:, 0], kind='stable')
+        mu = ratings[order, 0]
+        variance = ratings[order, 1] ** 2
+        p = _sigmoid((mu[1:] - mu[:-1]) / self.scale)
+        scores = (variance[1:] + variance[:-1]) * p * (1.0 - p)
+        
+        top = np.argsort(-scores, kind='stable')[:n_pairs]
+        return [(candidate_ids[order[i]], candidate_ids[order[i + 1]], float(scores[i])) for i in top]
+    
+    def top(self, n: int = 10) -> List[Tuple[int, float, float]]:
+        """Les n trajectoires les mieux notées : (id, moyenne, écart-type)"""
+        order = np.argsort(-self.mu, kind='stable')[:n]
+        return [(self.ids[i], float(self._mu[i]), float(np.sqrt(self._variance[i]))) for i in order]
+    
+    def summary(self, n_top: int = 5) -> Dict[str, Any]:
+        """Résumé des notes (pour get_preference_statistics)"""
+        if not self.ids:
+            return {'rated_trajectories': 0}
+        return {
+            'rated_trajectories': len(self.ids),
+            'comparisons': self.n_updates,
+            'rating_mean': float(self.mu.mean()),
+            'rating_spread': float(self.mu.std()),
+            'mean_sigma': float(np.sqrt(self.variance).mean()),
+            'top_trajectories': self.top(n_top)
+        }
+    
+    def rows(self) -> List[Tuple[int, float, float, int]]:
+        """Lignes (id, moyenne, variance, comparaisons) pour la persistance"""
+        return [(trajectory_id, float(self._mu[i]), float(self._variance[i]), int(self._n_comparisons[i]))
+                for i, trajectory_id in enumerate(self.ids)]
+    
+    def save(self, store, name: str = 'ratings', preference_id: Optional[int] = None,
+             trajectory_ids: Optional[List[int]] = None):
+        """
+        Enregistre les notes dans la base de préférences
+        
+        Args:
+            store: PreferenceStore
+            name: Nom du système de notes (et de son point de contrôle)
+            preference_id: Dernière préférence prise en compte (la plus récente si None)
+            trajectory_ids: Notes à écrire (toutes si None)
+        """
+        if trajectory_ids is None:
+            rows = self.rows()
+        else:
+            rows = []
+            for trajectory_id in trajectory_ids:
+                i = self._index[int(trajectory_id)]
+                rows.append((int(trajectory_id), float(self._mu[i]), float(self._variance[i]),
+                             int(self._n_comparisons[i])))
+        store.save_ratings(name, rows, preference_id)
+    
+    @classmethod
+    def load(cls, store, name: str = 'ratings', **kwargs) -> 'TrajectoryRatings':
+        """
+        Recharge les notes enregistrées puis applique les préférences arrivées depuis
+        
+        Args:
+            store: PreferenceStore
+            name: Nom du système de notes
+            **kwargs: Paramètres du constructeur
+        
+        Returns:
+            Notes à jour (les nouvelles préférences sont aussi enregistrées)
+        """
+        ratings = cls(**kwargs)
+        for trajectory_id, mu, variance, n_comparisons in store.load_ratings(name):
+            row = ratings._row(trajectory_id)
+            ratings._mu[row] = mu
+            ratings._variance[row] = variance
+            ratings._n_comparisons[row] = n_comparisons
+        ratings.n_updates = int(ratings.n_comparisons.sum() // 2)
+        
+        new_preferences = store.unapplied(name)
+        if new_preferences:
+            ratings.update_preferences(new_preferences)
+            touched = {pref[f"trajectory_{side}_id"] for pref in new_preferences for side in 'ab'}
+            ratings.save(store, name, new_preferences[-1]['preference_id'], sorted(touched))
+        return ratings
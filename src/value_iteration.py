@@ -0,0 +1,145 @@
+"""
+Résolution exacte des environnements tabulaires à modèle connu
+Itération sur les valeurs / les politiques, vectorisées sur les tables de transition
+"""
+
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+
+def value_iteration(next_states: np.ndarray, rewards: np.ndarray, terminals: np.ndarray,
+                    gamma: float, tol: float = 1e-10,
+                    max_iterations: int = 10000) -> Tuple[np.ndarray, int]:
+    """
+    Calcule Q* par itération sur les valeurs
+    
+    Q(s, a) <- r(s, a) + gamma * (1 - fin(s, a)) * max_a' Q(s', a')
+    
+    Un modèle échantillonné (tables de forme (n_states, n_actions, n_samples),
+    ex: MountainCarGridModel) donne des successeurs équiprobables : le terme
+    amorcé est alors moyenné sur le dernier axe.
+    
+    Args:
+        next_states: États suivants, de forme (n_states, n_actions[, n_samples])
+        rewards: Récompenses, de forme (n_states, n_actions)
+        terminals: Transitions terminales, de même forme que next_states
+        gamma: Facteur de réduction
+        tol: Critère d'arrêt sur la variation maximale de Q
+        max_iterations: Nombre maximum d'itérations
+    
+    Returns:
+        Tuple (Q*, nombre d'itérations)
+    """
+    continuation = gamma * (1.0 - terminals.astype(np.float64))
+    q_table = np.zeros(rewards.shape, dtype=np.float64)
+    
+    for iteration in range(1, max_iterations + 1):
+        bootstrap = continuation * q_table.max(axis=1)[next_states]
+        if bootstrap.ndim == 3:
+            bootstrap = bootstrap.mean(axis=2)
+        new_q_table = rewards + bootstrap
+        delta = np.abs(new_q_table - q_table).max()
+        q_table = new_q_table
+        if delta < tol:
+            break
+    
+    return q_table, iteration
+
+
+def policy_iteration(next_states: np.ndarray, rewards: np.ndarray, terminals: np.ndarray,
+                     gamma: float, max_iterations: int = 1000) -> Tuple[np.ndarray, int]:
+    """
+    Calcule Q* par itération sur les politiques (modèle déterministe)
+    
+    Chaque évaluation de politique est exacte : résolution du système linéaire
+    (I - gamma * P_pi) V = r_pi.
+    
+    Args:
+        next_states: États suivants, de forme (n_states, n_actions)
+        rewards: Récompenses, de forme (n_states, n_actions)
+        terminals: Transitions terminales, de forme (n_states, n_actions)
+        gamma: Facteur de réduction
+        max_iterations: Nombre maximum d'améliorations de politique
+    
+    Returns:
+        Tuple (Q*, nombre d'itérations)
+    """
+    n_states = rewards.shape[0]
+    all_states = np.arange(n_states)
+    continuation = gamma * (1.0 - terminals.astype(np.float64))
+    policy = np.zeros(n_states, dtype=np.int64)
+    
+    for iteration in range(1, max_iterations + 1):
+        # Évaluation exacte de la politique courante
+        transition_matrix = np.zeros((n_states, n_states))
+        np.add.at(transition_matrix, (all_states, next_states[all_states, policy]),
+                  continuation[all_states, policy])
+        values = np.linalg.solve(np.eye(n_states) - transition_matrix, rewards[all_states, policy])
+        
+        # Amélioration (on garde l'action courante en cas d'égalité pour éviter les oscillations)
+        q_table = rewards + continuation * values[next_states]
+        best = q_table.max(axis=1)
+        keep = q_table[all_states, policy] >= best - 1e-12
+        new_policy = np.where(keep, policy, q_table.argmax(axis=1))
+        if np.array_equal(new_policy, policy):
+            break
+        policy = new_policy
+    
+    return q_table, iteration
+
+
+def solve_model(model, gamma: float, method: str = 'value') -> np.ndarray:
+    """
+    Calcule Q* pour un modèle tabulaire
+    
+    Args:
+        model: Objet exposant next_states, rewards et terminals (ex: VectorizedTaxiEnv,
+               MountainCarGridModel)
+        gamma: Facteur de réduction
+        method: 'value' (itération sur les valeurs) ou 'policy' (itération sur les politiques)
+    
+    Returns:
+        Q*, de forme (n_states, n_actions)
+    """
+    if method == 'value':
+        q_star, _ = value_iteration(model.next_states, model.rewards, model.terminals, gamma)
+    elif method == 'policy':
+        if np.ndim(model.next_states) != 2:
+            raise ValueError("L'itération sur les politiques requiert un modèle déterministe")
+        q_star, _ = policy_iteration(model.next_states, model.rewards, model.terminals, gamma)
+    else:
+        raise ValueError(f"Méthode inconnue: {method} (attendu 'value' ou 'policy')")
+    return q_star
+
+
+def distance_to_optimal(q_table: np.ndarray, q_star: np.ndarray,
+                        states: Optional[np.ndarray] = None,
+                        tol: float = 1e-6) -> Dict[str, Any]:
+    """
+    Mesure l'écart entre une Q-table et Q*
+    
+    Args:
+        q_table: Q-table apprise
+        q_star: Q-table optimale
+        states: États pris en compte (tous si None, ex: états atteignables)
+        tol: Tolérance pour considérer une action comme optimale
+    
+    Returns:
+        Dict avec l'erreur max/moyenne sur Q, la proportion d'états où l'action
+        greedy est optimale et la perte de valeur moyenne de la politique greedy
+    """
+    if states is not None:
+        q_table = q_table[states]
+        q_star = q_star[states]
+    
+    greedy_actions = np.argmax(q_table, axis=1)
+    optimal_values = q_star.max(axis=1)
+    greedy_values = q_star[np.arange(len(q_star)), greedy_actions]
+    errors = np.abs(q_table - q_star)
+    
+    return {
+        'max_q_error': float(errors.max()),
+        'mean_q_error': float(errors.mean()),
+        'policy_agreement': float(np.mean(greedy_values >= optimal_values - tol)),
+        'value_loss': float(np.mean(optimal_values - greedy_values))
+    }
@@ -0,0 +1,188 @@
+"""
+Moteur MountainCar-v0 vectorisé en NumPy pur
+Réimplémente la dynamique de Gymnasium pour N voitures simulées en parallèle
+"""
+
+import numpy as np
+from typing import List, Optional, Sequence, Tuple, Union
+
+
+class VectorizedMountainCarEnv:
+    """
+    Simulateur MountainCar-v0 par lots
+    
+    Reproduit exactement les calculs de MountainCarEnv (état interne en float64,
+    observations en float32) : pour une même graine, chaque voiture suit
+    bit à bit la trajectoire de gym.make('MountainCar-v0').
+    Les épisodes terminés restent figés jusqu'au prochain reset().
+    """
+    
+    def __init__(self, n_envs: int = 256,
+                 max_episode_steps: int = 200,
+                 goal_velocity: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        Initialise le moteur vectorisé
+        
+        Args:
+            n_envs: Nombre de voitures simulées en parallèle par défaut
+            max_episode_steps: Nombre de pas avant troncature (200 pour MountainCar-v0)
+            goal_velocity: Vitesse minimale au but (0 pour MountainCar-v0)
+            seed: Graine de départ (la voiture i utilise seed + i)
+        """
+        # Constantes physiques de MountainCarEnv
+        self.min_position = -1.2
+        self.max_position = 0.6
+        self.max_speed = 0.07
+        self.goal_position = 0.5
+        self.goal_velocity = goal_velocity
+        self.force = 0.001
+        self.gravity = 0.0025
+        
+        self.n_envs = n_envs
+        self.max_episode_steps = max_episode_steps
+        self.n_actions = 3
+        
+        self._seed_sequence = np.random.SeedSequence(seed)
+        self._rngs: List[np.random.Generator] = []
+        if seed is not None:
+            self._seed_rngs(seed, n_envs)
+        
+        # État courant du lot (float64 comme dans Gymnasium)
+        self.positions = np.zeros(n_envs, dtype=np.float64)
+        self.velocities = np.zeros(n_envs, dtype=np.float64)
+        self.elapsed_steps = np.zeros(n_envs, dtype=np.int64)
+        self.finished = np.ones(n_envs, dtype=bool)
+    
+    def _seed_rngs(self, seed: Union[int, Sequence[int]], n_envs: int):
+        """Crée un générateur par voiture, identique à env.reset(seed=...) de Gymnasium"""
+        if np.isscalar(seed):
+            seeds = [int(seed) + i for i in range(n_envs)]
+        else:
+            seeds = [int(s) for s in seed]
+            if len(seeds) != n_envs:
+                raise ValueError(f"{len(seeds)} graines fournies pour {n_envs} voitures")
+        self._rngs = [np.random.default_rng(s) for s in seeds]
+    
+    def reset(self, n_envs: Optional[int] = None,
+              seed: Optional[Union[int, Sequence[int]]] = None) -> np.ndarray:
+        """
+        Démarre un nouveau lot d'épisodes
+        
+        Args:
+            n_envs: Taille du lot (conserve la taille courante si None)
+            seed: Graine de base (voiture i -> seed + i) ou liste de graines
+        
+        Returns:
+            Observations initiales [position, vitesse] de forme (n_envs, 2), en float32
+        """
+        if n_envs is not None:
+            self.n_envs = n_envs
+        
+        if seed is not None:
+            self._seed_rngs(seed, self.n_envs)
+        elif len(self._rngs) < self.n_envs:
+            # Générateurs indépendants pour les voitures sans graine explicite
+            missing = self.n_envs - len(self._rngs)
+            self._rngs.extend(np.random.default_rng(s)
+                              for s in self._seed_sequence.spawn(missing))
+        
+        # Même tirage que MountainCarEnv.reset: uniform(-0.6, -0.4), vitesse nulle
+        self.positions = np.array([rng.uniform(low=-0.6, high=-0.4)
+                                   for rng in self._rngs[:self.n_envs]], dtype=np.float64)
+        self.velocities = np.zeros(self.n_envs, dtype=np.float64)
+        self.elapsed_steps = np.zeros(self.n_envs, dtype=np.int64)
+        self.finished = np.zeros(self.n_envs, dtype=bool)
+        
+        return self._observations()
+    
+    def dynamics(self, positions: np.ndarray, velocities: np.ndarray,
+                 actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Applique un pas de la physique MountainCar à des tableaux d'états
+        
+        Args:
+            positions: Positions (float64)
+            velocities: Vitesses (float64)
+            actions: Actions (0=gauche, 1=rien, 2=droite)
+        
+        Returns:
+            Tuple (nouvelles positions, nouvelles vitesses, but atteint)
+        """
+        velocities = velocities + ((actions - 1) * self.force
+                                   + np.cos(3 * positions) * (-self.gravity))
+        velocities = np.clip(velocities, -self.max_speed, self.max_speed)
+        positions = np.clip(positions + velocities, self.min_position, self.max_position)
+        velocities = np.where((positions == self.min_position) & (velocities < 0),
+                              0.0, velocities)
+        
+        terminated = (positions >= self.goal_position) & (velocities >= self.goal_velocity)
+        return positions, velocities, terminated
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fait avancer toutes les voitures actives d'un pas
+        
+        Args:
+            actions: Action de chaque voiture du lot
+        
+        Returns:
+            Tuple (observations, récompenses, terminés, tronqués).
+            Les voitures déjà arrivées ne bougent plus et reçoivent une récompense nulle.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        active = ~self.finished
+        
+        positions, velocities, goal_reached = self.dynamics(self.positions, self.velocities, actions)
+        
+        self.positions = np.where(active, positions, self.positions)
+        self.velocities = np.where(active, velocities, self.velocities)
+        terminated = active & goal_reached
+        rewards = np.where(active, -1.0, 0.0)
+        
+        self.elapsed_steps += active
+        truncated = active & ~terminated & (self.elapsed_steps >= self.max_episode_steps)
+        self.finished |= terminated | truncated
+        
+        return self._observations(), rewards, terminated, truncated
+    
+    def _observations(self) -> np.ndarray:
+        """Observations du lot, converties en float32 comme dans Gymnasium"""
+        return np.stack([self.positions, self.velocities], axis=1).astype(np.float32)
+
+
+def test_vectorized_mountain_car():
+    """Vérifie la compatibilité bit à bit avec Gymnasium"""
+    import gymnasium as gym
+    
+    print("🧪 TEST DU MOTEUR MOUNTAINCAR VECTORISÉ\n")
+    
+    n_envs = 8
+    engine = VectorizedMountainCarEnv(n_envs=n_envs)
+    observations = engine.reset(seed=42)
+    
+    envs = [gym.make('MountainCar-v0') for _ in range(n_envs)]
+    gym_observations = np.array([env.reset(seed=42 + i)[0] for i, env in enumerate(envs)])
+    assert np.array_equal(observations, gym_observations)
+    
+    rng = np.random.default_rng(0)
+    done = np.zeros(n_envs, dtype=bool)
+    for _ in range(200):
+        actions = rng.integers(0, 3, size=n_envs)
+        observations, _, terminated, truncated = engine.step(actions)
+        for i, env in enumerate(envs):
+            if done[i]:
+                continue
+            obs, _, term, trunc, _ = env.step(int(actions[i]))
+            assert np.array_equal(obs, observations[i])
+            assert term == terminated[i] and trunc == truncated[i]
+            done[i] = term or trunc
+    
+    for env in envs:
+        env.close()
+    
+    print("[OK] Trajectoires identiques à Gymnasium sur 200 pas")
+
+
+if __name__ == "__main__":
+    test_vectorized_mountain_car()
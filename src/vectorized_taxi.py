@@ -0,0 +1,201 @@
+"""
+Moteur Taxi-v3 vectorisé en NumPy pur
+Simule des milliers d'épisodes indépendants en parallèle à partir de la table P
+"""
+
+import numpy as np
+import gymnasium as gym
+from typing import Any, Dict, Optional, Tuple
+
+
+class VectorizedTaxiEnv:
+    """
+    Simulateur Taxi-v3 par lots construit à partir de la table de transitions P
+    
+    Chaque appel à step() fait avancer tous les épisodes du lot d'un pas grâce
+    à de simples lectures de tableaux (état suivant, récompense, terminaison).
+    Les épisodes terminés restent figés jusqu'au prochain reset().
+    """
+    
+    def __init__(self, env: Optional[gym.Env] = None,
+                 n_envs: int = 256,
+                 max_episode_steps: int = 200,
+                 seed: Optional[int] = None):
+        """
+        Initialise le moteur vectorisé
+        
+        Args:
+            env: Environnement Taxi-v3 source de la table P (créé si None)
+            n_envs: Nombre d'épisodes simulés en parallèle par défaut
+            max_episode_steps: Nombre de pas avant troncature
+            seed: Graine du générateur des états initiaux
+        """
+        owns_env = env is None
+        if owns_env:
+            env = gym.make("Taxi-v3")
+        
+        unwrapped = env.unwrapped
+        self.n_states = unwrapped.observation_space.n
+        self.n_actions = unwrapped.action_space.n
+        self.n_envs = n_envs
+        self.max_episode_steps = max_episode_steps
+        
+        # Tables de transition (état, action) -> état suivant / récompense / fin
+        self.next_states = np.zeros((self.n_states, self.n_actions), dtype=np.int64)
+        self.rewards = np.zeros((self.n_states, self.n_actions), dtype=np.float64)
+        self.terminals = np.zeros((self.n_states, self.n_actions), dtype=bool)
+        
+        for state in range(self.n_states):
+            for action in range(self.n_actions):
+                transitions = unwrapped.P[state][action]
+                if len(transitions) != 1:
+                    raise ValueError(
+                        f"Transition stochastique non supportée pour (s={state}, a={action})"
+                    )
+                _, next_state, reward, terminated = transitions[0]
+                self.next_states[state, action] = next_state
+                self.rewards[state, action] = reward
+                self.terminals[state, action] = terminated
+        
+        self.initial_state_distrib = np.asarray(unwrapped.initial_state_distrib, dtype=np.float64)
+        self.initial_states = np.flatnonzero(self.initial_state_distrib > 0)
+        
+        if owns_env:
+            env.close()
+        
+        self.rng = np.random.default_rng(seed)
+        
+        # État courant du lot
+        self.states = np.zeros(n_envs, dtype=np.int64)
+        self.elapsed_steps = np.zeros(n_envs, dtype=np.int64)
+        self.finished = np.ones(n_envs, dtype=bool)
+    
+    def reset(self, n_envs: Optional[int] = None, seed: Optional[int] = None) -> np.ndarray:
+        """
+        Démarre un nouveau lot d'épisodes
+        
+        Args:
+            n_envs: Taille du lot (conserve la taille courante si None)
+            seed: Nouvelle graine du générateur (optionnelle)
+        
+        Returns:
+            États initiaux du lot
+        """
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        if n_envs is not None:
+            self.n_envs = n_envs
+        
+        self.states = self.rng.choice(self.n_states, size=self.n_envs,
+                                      p=self.initial_state_distrib)
+        self.elapsed_steps = np.zeros(self.n_envs, dtype=np.int64)
+        self.finished = np.zeros(self.n_envs, dtype=bool)
+        
+        return self.states.copy()
+    
+    def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fait avancer tous les épisodes actifs d'un pas
+        
+        Args:
+            actions: Action de chaque épisode du lot
+        
+        Returns:
+            Tuple (états suivants, récompenses, terminés, tronqués).
+            Les épisodes déjà finis ne bougent pas et reçoivent une récompense nulle.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        active = ~self.finished
+        
+        next_states = np.where(active, self.next_states[self.states, actions], self.states)
+        rewards = np.where(active, self.rewards[self.states, actions], 0.0)
+        terminated = active & self.terminals[self.states, actions]
+        
+        self.elapsed_steps += active
+        truncated = active & ~terminated & (self.elapsed_steps >= self.max_episode_steps)
+        
+        self.states = next_states
+        self.finished |= terminated | truncated
+        
+        return next_states.copy(), rewards, terminated, truncated
+    
+    def reachable_states(self) -> np.ndarray:
+        """
+        États atteignables depuis les états initiaux (parcours en largeur sur la table)
+        
+        Returns:
+            Indices triés des états atteignables
+        """
+        reachable = np.zeros(self.n_states, dtype=bool)
+        frontier = self.initial_states
+        reachable[frontier] = True
+        
+        while len(frontier) > 0:
+            # Pas de successeur après une transition terminale
+            successors = self.next_states[frontier][~self.terminals[frontier]]
+            frontier = np.unique(successors[~reachable[successors]])
+            reachable[frontier] = True
+        
+        return np.flatnonzero(reachable)
+    
+    def evaluate_policy(self, policy: np.ndarray, max_steps: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Évaluation exacte d'une politique déterministe depuis tous les états initiaux
+        
+        La dynamique étant déterministe, chaque état initial donne un unique épisode :
+        on les suit tous en parallèle au lieu d'échantillonner des épisodes.
+        Un épisode qui ne se termine pas en n_states pas repasse forcément par
+        un état déjà visité : la politique y boucle indéfiniment.
+        
+        Args:
+            policy: Action choisie dans chaque état, de forme (n_states,)
+            max_steps: Pas avant troncature (max_episode_steps si None)
+        
+        Returns:
+            Dict avec la récompense moyenne exacte, le taux de succès, la distribution
+            des longueurs d'épisode et les états initiaux qui bouclent
+        """
+        if max_steps is None:
+            max_steps = self.max_episode_steps
+        policy = np.asarray(policy, dtype=np.int64)
+        
+        # Transitions de la politique : une seule lecture par état et par pas
+        policy_next = self.next_states[np.arange(self.n_states), policy]
+        policy_rewards = self.rewards[np.arange(self.n_states), policy]
+        policy_terminals = self.terminals[np.arange(self.n_states), policy]
+        
+        starts = self.initial_states
+        weights = self.initial_state_distrib[starts] / self.initial_state_distrib[starts].sum()
+        
+        states = starts.copy()
+        returns = np.zeros(len(starts), dtype=np.float64)
+        lengths = np.zeros(len(starts), dtype=np.int64)
+        terminated_at = np.full(len(starts), -1, dtype=np.int64)
+        active = np.ones(len(starts), dtype=bool)
+        
+        for step in range(max(max_steps, self.n_states)):
+            if not active.any():
+                break
+            in_episode = active & (step < max_steps)
+            returns += np.where(in_episode, policy_rewards[states], 0.0)
+            lengths += in_episode
+            
+            done = active & policy_terminals[states]
+            terminated_at[done] = step + 1
+            active &= ~done
+            states = policy_next[states]
+        
+        success = (terminated_at > 0) & (terminated_at <= max_steps)
+        looping = terminated_at < 0
+        
+        return {
+            'mean_reward': float(weights @ returns),
+            'success_rate': float(weights @ success),
+            'mean_length': float(weights @ lengths),
+            'returns': returns,
+            'lengths': lengths,
+            'start_states': starts,
+            'length_histogram': np.bincount(lengths, minlength=max_steps + 1),
+            'n_loops': int(looping.sum()),
+            'looping_states': starts[looping]
+        }
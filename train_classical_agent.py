@@ -2,6 +2,8 @@ import gymnasium as gym
 import numpy as np
 import matplotlib.pyplot as plt
 from src.q_learning_agent import QLearningAgent
+from src.vectorized_taxi import VectorizedTaxiEnv
+from src.value_iteration import solve_model
 import os
 
 def main():
@@ -31,10 +33,23 @@ def main():
         epsilon_min=0.01
     )
     
+    # Backend d'entraînement: "gym" (un pas à la fois) ou "numpy" (moteur vectorisé)
+    backend = "gym"
+    train_env = VectorizedTaxiEnv(env, n_envs=256) if backend == "numpy" else env
+    
+    # Q* calculée par itération sur les valeurs : référence pour suivre l'écart à l'optimum
+    # (warm_start = True initialise directement la Q-table avec Q*)
+    warm_start = False
+    model = VectorizedTaxiEnv(env)
+    if warm_start:
+        agent.warm_start_from_model(model)
+    else:
+        agent.set_optimal_reference(solve_model(model, agent.gamma), model.reachable_states())
+    
     # Entraînement
     print("\n--- Début de l'entraînement ---")
     episodes = 15000
-    training_rewards = agent.train(env, episodes=episodes)
+    training_rewards = agent.train(train_env, episodes=episodes)
     
     # Sauvegarde de l'agent
     results_dir = "results"
@@ -43,7 +58,7 @@ def main():
     
     # Évaluation
     print("\n--- Évaluation de l'agent entraîné ---")
-    avg_reward, eval_rewards = agent.evaluate(env, episodes=100)
+    avg_reward, eval_rewards = agent.evaluate(train_env, episodes=100)
     
     # Création de graphiques
     print("\n--- Génération des graphiques ---")
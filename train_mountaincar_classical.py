@@ -10,6 +10,7 @@ import pickle
 import os
 from datetime import datetime
 from src.mountain_car_agent import MountainCarAgent
+from src.vectorized_mountain_car import VectorizedMountainCarEnv
 
 
 def plot_training_results(agent: MountainCarAgent, save_path: str = None):
@@ -131,6 +132,11 @@ def main():
     LEARNING_RATE = 0.1
     DISCOUNT_FACTOR = 0.99
     EPSILON_DECAY = 0.999
+    BACKEND = "gym"  # "numpy" pour le moteur MountainCar vectorisé
+    MODEL_WARM_START = False  # Q initialisée par itération sur les valeurs sur la grille
+    REFINE_EPISODES = 500  # Épisodes d'affinage en ligne après le warm start
+    TILE_CODING = False  # Q linéaire sur 8 grilles de tuiles décalées au lieu de la Q-table
+    TILE_EPISODES = 1000  # La généralisation entre états voisins demande moins d'épisodes
     
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
@@ -148,6 +154,7 @@ def main():
     # Création de l'environnement
     print("[ENV] Création de l'environnement MountainCar-v0...")
     env = gym.make('MountainCar-v0')
+    train_env = VectorizedMountainCarEnv(n_envs=64) if BACKEND == "numpy" else env
     print("[OK] Environnement créé")
     print(f"   - Espace d'états: Position [-1.2, 0.6], Vitesse [-0.07, 0.07]")
     print(f"   - Actions: 3 (0=gauche, 1=rien, 2=droite)")
@@ -165,6 +172,17 @@ def main():
         epsilon_decay=EPSILON_DECAY,
         epsilon_min=0.01
     )
+    if MODEL_WARM_START:
+        # La physique étant connue, l'exploration se réduit à l'affinage de Q
+        agent.warm_start_from_model()
+        agent.epsilon = agent.epsilon_min
+        TRAIN_EPISODES = REFINE_EPISODES
+    elif TILE_CODING:
+        # Poids initiaux nuls (optimistes) : l'exploration epsilon peut décroître vite
+        agent.enable_tile_coding()
+        agent.epsilon_decay = 0.98
+        agent.epsilon_min = 0.0
+        TRAIN_EPISODES = TILE_EPISODES
     print()
     
     # Entraînement
@@ -173,7 +191,7 @@ def main():
     start_time = datetime.now()
     
     training_rewards = agent.train(
-        env=env,
+        env=train_env,
         episodes=TRAIN_EPISODES,
         max_steps=200,
         verbose=True
@@ -198,6 +216,10 @@ def main():
     print(f"[SAVE] Sauvegarde de l'agent...")
     agent.save_agent(agent_path)
     
+    # Checkpoint binaire compact (chargeable en mmap par les scripts de collecte)
+    checkpoint_path = os.path.join(results_dir, "mountain_car_agent_classical.qtab")
+    agent.save_checkpoint(checkpoint_path)
+    
     # Visualisation de la politique apprise
     print("\n[MAP]  POLITIQUE APPRISE")
     print("-" * 80)
@@ -12,6 +12,9 @@ import os
 from datetime import datetime
 from src.mountain_car_pbrl_agent import MountainCarPbRLAgent
 from src.mountain_car_agent import MountainCarAgent
+from src.vectorized_mountain_car import VectorizedMountainCarEnv
+from src.preference_store import PreferenceStore
+from src.trajectory_ratings import TrajectoryRatings
 from collect_mountaincar_preferences import MountainCarTrajectory
 
 
@@ -90,6 +93,11 @@ def main():
     # Configuration pour comparaison équitable
     PBRL_EPISODES = 6000  # Même nombre que classical
     EVAL_EPISODES = 200
+    BACKEND = "gym"  # "numpy" pour le moteur MountainCar vectorisé
+    # Désactivés par défaut : la comparaison avec l'agent classique reste à armes égales
+    MAX_DERIVED = None  # Préférences dérivées par transitivité (ex. 2000 ; None : liste brute)
+    OFFLINE_PRETRAIN = False  # Itération Q hors ligne sur les trajectoires collectées
+    USE_RATINGS = False  # Forces issues du classement persisté (sinon forces heuristiques)
     
     results_dir = "results"
     os.makedirs(results_dir, exist_ok=True)
@@ -118,9 +126,21 @@ def main():
     print("[LOAD] CHARGEMENT DES DONNÉES")
     print("-" * 80)
     
-    with open(preferences_path, 'r') as f:
-        preferences = json.load(f)
-    print(f"[OK] {len(preferences)} préférences chargées")
+    store_path = os.path.join(results_dir, "mountaincar_preferences.sqlite")
+    ratings = None
+    if os.path.exists(store_path):
+        with PreferenceStore(store_path) as store:
+            preferences = store.preferences()
+            if USE_RATINGS:
+                # Notes persistées : seules les préférences arrivées depuis sont appliquées
+                ratings = TrajectoryRatings.load(store)
+        print(f"[OK] {len(preferences)} préférences chargées (base {store_path})")
+        if ratings is not None:
+            print(f"[OK] {len(ratings)} trajectoires notées")
+    else:
+        with open(preferences_path, 'r') as f:
+            preferences = json.load(f)
+        print(f"[OK] {len(preferences)} préférences chargées")
     
     with open(trajectories_path, 'rb') as f:
         trajectories = pickle.load(f)
@@ -135,6 +155,7 @@ def main():
     # Création de l'environnement
     print("[ENV] Création de l'environnement...")
     env = gym.make('MountainCar-v0')
+    train_env = VectorizedMountainCarEnv(n_envs=64) if BACKEND == "numpy" else env
     print("[OK] Environnement créé\n")
     
     # Création de l'agent PBRL avec paramètres ÉQUILIBRÉS
@@ -150,6 +171,10 @@ def main():
         epsilon_min=0.01,
         preference_weight=0.6      # Modéré pour éviter sur-apprentissage
     )
+    agent_pbrl.ratings = ratings
+    if OFFLINE_PRETRAIN:
+        # Les rollouts déjà collectés initialisent la Q-table avant les épisodes en ligne
+        agent_pbrl.fit_offline(trajectories)
     print()
     
     # Entraînement PBRL
@@ -158,10 +183,11 @@ def main():
     start_time = datetime.now()
     
     pbrl_rewards = agent_pbrl.train_with_preferences(
-        env=env,
+        env=train_env,
         trajectories=trajectories,
         preferences=preferences,
-        episodes=PBRL_EPISODES
+        episodes=PBRL_EPISODES,
+        max_derived=MAX_DERIVED
     )
     
     training_time = (datetime.now() - start_time).total_seconds()
@@ -3,6 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from src.pbrl_agent import PreferenceBasedQLearning
 from src.q_learning_agent import QLearningAgent
+from src.vectorized_taxi import VectorizedTaxiEnv
 from src.trajectory_manager import TrajectoryManager
 from src.preference_interface import PreferenceInterface
 import pickle
@@ -92,9 +93,9 @@ def main():
             print("[ERROR] Pas assez de données de préférences. Génération de trajectoires...")
             # Générer quelques trajectoires avec l'agent classique
             print("Génération de 20 trajectoires avec l'agent classique...")
-            for i in range(20):
-                traj = trajectory_manager.collect_trajectory(env, classical_agent)
-                demo_trajectories.append(traj)
+            demo_trajectories.extend(
+                trajectory_manager.collect_trajectories_parallel("Taxi-v3", classical_agent, 20)
+            )
             
             print("Collecte rapide de quelques préférences...")
             # Sélectionner quelques paires pour une démonstration rapide
@@ -151,12 +152,16 @@ def main():
     
     print("\n4 Évaluation et comparaison des agents...")
     
-    # Évaluation des deux agents
+    # Évaluation exacte des deux agents (tous les états initiaux, sans échantillonnage)
+    evaluation_engine = VectorizedTaxiEnv(env)
+    
     print("Évaluation de l'agent classique...")
-    classical_avg, classical_eval = classical_agent.evaluate(env, episodes=100)
+    classical_report = classical_agent.evaluate_exact(evaluation_engine)
+    classical_avg, classical_eval = classical_report['mean_reward'], classical_report['returns'].tolist()
     
     print("Évaluation de l'agent PbRL...")
-    pbrl_avg, pbrl_eval = pbrl_agent.evaluate(env, episodes=100)
+    pbrl_report = pbrl_agent.evaluate_exact(evaluation_engine)
+    pbrl_avg, pbrl_eval = pbrl_report['mean_reward'], pbrl_report['returns'].tolist()
     
     # Sauvegarde de l'agent PbRL
     pbrl_agent.save_pbrl_agent(f"{results_dir}/pbrl_agent.pkl")
@@ -177,8 +182,10 @@ def main():
     print("\n" + "="*80)
     print("[DONE] COMPARAISON AGENT CLASSIQUE vs AGENT PbRL")
     print("="*80)
-    print(f"Agent Classique - Récompense moyenne: {classical_avg:.2f}")
-    print(f"Agent PbRL      - Récompense moyenne: {pbrl_avg:.2f}")
+    print(f"Agent Classique - Récompense moyenne: {classical_avg:.2f} | "
+          f"Succès: {classical_report['success_rate']*100:.1f}% | Boucles: {classical_report['n_loops']}")
+    print(f"Agent PbRL      - Récompense moyenne: {pbrl_avg:.2f} | "
+          f"Succès: {pbrl_report['success_rate']*100:.1f}% | Boucles: {pbrl_report['n_loops']}")
     
     improvement = ((pbrl_avg - classical_avg) / abs(classical_avg)) * 100 if classical_avg != 0 else 0
     if improvement > 0: